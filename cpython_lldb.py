@@ -1,1112 +1,7033 @@
 import abc
+import ast
 import argparse
+import array
+import bisect
 import collections
+import ctypes
+import errno
+import fnmatch
+import functools
 import io
+import itertools
+import json
+import mmap
+import os
 import re
 import shlex
 import struct
+import sys
+import threading
+import time
 
-import lldb
+try:
+    import lldb
+except ImportError:
+    # the standalone mode (python -m cpython_lldb) does not require LLDB
+    lldb = None
 
 
 ENCODING_RE = re.compile(r"^[ \t\f]*#.*?coding[:=][ \t]*([-_.a-zA-Z0-9]+)")
 
+# the number of identical consecutive frames shown in full before the rest
+# of them are collapsed (the same value is used by the traceback module)
+RECURSIVE_CUTOFF = 3
 
-# Objects
-
-
-class PyObject(object):
-    def __init__(self, lldb_value):
-        self.lldb_value = lldb_value
+PAGE_SIZE = 4096
 
-    def __repr__(self):
-        return repr(self.value)
+# the size of a single read when scanning memory regions
+SCAN_CHUNK_SIZE = 4 * 1024 * 1024
 
-    def __hash__(self):
-        return hash(self.value)
 
-    def __eq__(self, other):
-        assert isinstance(other, PyObject)
+# Memory
 
-        return self.value == other.value
 
-    def child(self, name):
-        return self.lldb_value.GetChildMemberWithName(name)
+class MemoryReadError(Exception):
+    """Raised when the memory of the process under debug can not be read."""
 
-    @classmethod
-    def from_value(cls, v):
-        subclasses = {c.typename: c for c in cls.__subclasses__()}
-        typename = cls.typename_of(v)
-        return subclasses.get(typename, cls)(v)
 
-    @staticmethod
-    def typename_of(v):
-        try:
-            addr = (
-                v.GetChildMemberWithName("ob_type")
-                .GetChildMemberWithName("tp_name")
-                .unsigned
-            )
-            if not addr:
-                return
+class MemoryReader(metaclass=abc.ABCMeta):
+    """Interface for reading the memory of a process under debug.
 
-            process = v.GetProcess()
-            return process.ReadCStringFromMemory(addr, 256, lldb.SBError())
-        except Exception:
-            # if we fail to read tp_name, then it's likely not a PyObject
-            pass
+    Decoders that work with raw memory rather than with LLDB values are
+    written against this interface, so that the very same logic can be used
+    both within LLDB and by standalone tools that read the memory of a live
+    process or a core file directly.
+    """
 
-    @property
-    def typename(self):
-        return self.typename_of(self.lldb_value)
+    pointer_size = 8
+    byteorder = "little"
 
-    @property
-    def value(self):
-        return str(self.lldb_value.addr)
+    @abc.abstractmethod
+    def read(self, addr, size):
+        """Return `size` bytes of memory starting at `addr`.
 
-    @property
-    def target(self):
-        return self.lldb_value.GetTarget()
+        Raises MemoryReadError if the memory can not be read.
+        """
 
-    @property
-    def process(self):
-        return self.lldb_value.GetProcess()
+    def read_int(self, addr, size, signed=False):
+        return int.from_bytes(self.read(addr, size), self.byteorder, signed=signed)
 
+    def read_pointer(self, addr):
+        return self.read_int(addr, self.pointer_size)
 
-class PyLongObject(PyObject):
-    typename = "int"
-    cpython_struct = "PyLongObject"
+    def read_pointers(self, addr, count, stride=None):
+        """Read an array of `count` pointers located `stride` bytes apart.
 
-    @property
-    def value(self):
+        The memory is read at once and returned as array.array. `stride` must
+        be a multiple of the pointer size (which is also the default).
         """
 
-        The absolute value of a number is equal to:
+        stride = stride or self.pointer_size
+        pointers = array.array("Q" if self.pointer_size == 8 else "I")
+        if count <= 0:
+            return pointers
 
-            SUM(for i=0 through abs(ob_size)-1) ob_digit[i] * 2**(SHIFT*i)
+        pointers.frombytes(self.read(addr, (count - 1) * stride + self.pointer_size))
+        if self.byteorder != sys.byteorder:
+            pointers.byteswap()
 
-        Negative numbers are represented with ob_size < 0;
-        zero is represented by ob_size == 0.
+        return pointers[:: stride // self.pointer_size]
 
-        where SHIFT can be either:
-            #define PyLong_SHIFT        30
-        or:
-            #define PyLong_SHIFT        15
+    def buffer(self, addr, size):
+        """Return (buffer, offset) such that buffer[offset:offset + size] is the
+        memory at addr.
 
+        The buffer supports slicing and find(), like bytes. Readers that can
+        access memory w/o copying it (e.g. memory mapped core files) return
+        a buffer shared by many ranges, which is what makes scanning large
+        amounts of memory fast.
         """
 
-        long_type = self.target.FindFirstType(self.cpython_struct)
-        digit_type = self.target.FindFirstType("digit")
+        return self.read(addr, size), 0
 
-        shift = 15 if digit_type.size == 2 else 30
-        value = self.lldb_value.Cast(long_type.GetPointerType())
-        size = (
-            value.GetChildMemberWithName("ob_base")
-            .GetChildMemberWithName("ob_size")
-            .signed
-        )
-        if not size:
-            return 0
+    def read_many(self, requests, max_gap=PAGE_SIZE, max_size=1024 * 1024):
+        """Read multiple ranges of memory given as tuples of (addr, size).
 
-        digits = value.GetChildMemberWithName("ob_digit")
-        abs_value = sum(
-            digits.GetChildAtIndex(i, 0, True).unsigned * 2 ** (shift * i)
-            for i in range(0, abs(size))
-        )
-        return abs_value if size > 0 else -abs_value
+        Ranges that are at most max_gap bytes apart are read at once, as long
+        as the combined read does not exceed max_size bytes, which makes a big
+        difference when many small structs are read. Returns a list of bytes
+        in the order of requests.
+        """
 
+        results = [None] * len(requests)
 
-class PyBoolObject(PyObject):
-    typename = "bool"
+        def read_group(group):
+            start = requests[group[0]][0]
+            end = max(addr + size for addr, size in (requests[i] for i in group))
+            try:
+                data = self.read(start, end - start)
+            except MemoryReadError:
+                if len(group) == 1:
+                    raise
 
-    @property
-    def value(self):
-        long_type = self.target.FindFirstType("PyLongObject")
+                # the gaps are not necessarily readable
+                for i in group:
+                    results[i] = self.read(*requests[i])
+                return
 
-        value = self.lldb_value.Cast(long_type.GetPointerType())
-        digits = value.GetChildMemberWithName("ob_digit")
-        return bool(digits.GetChildAtIndex(0).unsigned)
+            for i in group:
+                addr, size = requests[i]
+                results[i] = data[addr - start : addr - start + size]
+
+        group = []
+        group_end = None
+        for i in sorted(range(len(requests)), key=lambda i: requests[i][0]):
+            addr, size = requests[i]
+            if group and (
+                addr - group_end > max_gap
+                or addr + size - requests[group[0]][0] > max_size
+            ):
+                read_group(group)
+                group = []
+
+            if not group:
+                group_end = addr + size
+            group.append(i)
+            group_end = max(group_end, addr + size)
+        if group:
+            read_group(group)
+
+        return results
+
+    def read_cstring(self, addr, max_size=256):
+        chunks = []
+        while max_size > 0:
+            # never read past the end of a page, as the next one might not be mapped
+            size = min(max_size, PAGE_SIZE - addr % PAGE_SIZE)
+            chunk = self.read(addr, size)
+
+            end = chunk.find(b"\0")
+            if end != -1:
+                chunks.append(chunk[:end])
+                break
 
+            chunks.append(chunk)
+            addr += size
+            max_size -= size
 
-class PyFloatObject(PyObject):
-    typename = "float"
-    cpython_struct = "PyFloatObject"
+        return b"".join(chunks).decode("utf-8", "replace")
 
-    @property
-    def value(self):
-        float_type = self.target.FindFirstType(self.cpython_struct)
+    def mapped_files(self):
+        """Return a list of (start, end, file offset, path) of memory mapped files."""
 
-        value = self.lldb_value.Cast(float_type.GetPointerType())
-        fval = value.GetChildMemberWithName("ob_fval")
-        return float(fval.GetValue())
+        return []
 
+    def close(self):
+        pass
 
-class PyBytesObject(PyObject):
-    typename = "bytes"
-    cpython_struct = "PyBytesObject"
+    def __enter__(self):
+        return self
 
-    @property
-    def value(self):
-        bytes_type = self.target.FindFirstType(self.cpython_struct)
+    def __exit__(self, *exc_info):
+        self.close()
 
-        value = self.lldb_value.Cast(bytes_type.GetPointerType())
-        size = (
-            value.GetChildMemberWithName("ob_base")
-            .GetChildMemberWithName("ob_size")
-            .unsigned
-        )
-        addr = value.GetChildMemberWithName("ob_sval").GetLoadAddress()
 
-        if size:
-            return bytes(self.process.ReadMemory(addr, size, lldb.SBError()))
-        else:
+class LLDBMemoryReader(MemoryReader):
+    """Read the memory of a process via LLDB."""
+
+    def __init__(self, process):
+        self.process = process
+        self.pointer_size = process.GetAddressByteSize()
+        if process.GetByteOrder() == lldb.eByteOrderBig:
+            self.byteorder = "big"
+
+    def read(self, addr, size):
+        if not size:
             return b""
 
+        if not is_readable(self.process, addr, size):
+            raise MemoryReadError(
+                "Failed to read {} bytes at {:#x}: not in a readable memory "
+                "region".format(size, addr)
+            )
 
-class PyUnicodeObject(PyObject):
-    typename = "str"
-    cpython_struct = "PyUnicodeObject"
+        error = lldb.SBError()
+        data = self.process.ReadMemory(addr, size, error)
+        if not error.Success() or len(data) != size:
+            raise MemoryReadError(
+                "Failed to read {} bytes at {:#x}: {}".format(
+                    size, addr, error.GetCString() or "partial read"
+                )
+            )
 
-    U_WCHAR_KIND = 0
-    U_1BYTE_KIND = 1
-    U_2BYTE_KIND = 2
-    U_4BYTE_KIND = 4
+        return bytes(data)
 
-    @staticmethod
-    def _get_encoding(kind):
-        if kind == PyUnicodeObject.U_1BYTE_KIND:
-            return "latin-1"
-        elif kind == PyUnicodeObject.U_2BYTE_KIND:
-            return "utf-16"
-        elif kind == PyUnicodeObject.U_4BYTE_KIND:
-            return "utf-32"
-        else:
-            raise ValueError("Unsupported PyUnicodeObject kind: {}".format(kind))
+    def read_cstring(self, addr, max_size=256):
+        if not is_readable(self.process, addr):
+            raise MemoryReadError(
+                "Failed to read a string at {:#x}: not in a readable memory "
+                "region".format(addr)
+            )
 
-    @staticmethod
-    def _read_string_from_memory(process, addr, length, kind):
-        if not length:
-            return ""
+        error = lldb.SBError()
+        rv = self.process.ReadCStringFromMemory(addr, max_size, error)
+        if not error.Success():
+            raise MemoryReadError(
+                "Failed to read a string at {:#x}: {}".format(addr, error.GetCString())
+            )
 
-        rv = process.ReadMemory(addr, length * kind, lldb.SBError())
-        return rv.decode(PyUnicodeObject._get_encoding(kind))
+        return rv
 
-    @property
-    def value(self):
-        ascii_type = self.target.FindFirstType("PyASCIIObject")
-        value = self.lldb_value.Cast(ascii_type.GetPointerType())
 
-        length = value.GetChildMemberWithName("length").unsigned
-        state = value.GetChildMemberWithName("state")
+class CachingMemoryReader(MemoryReader):
+    """A read-through cache of memory pages in front of another MemoryReader.
 
-        compact = bool(state.GetChildMemberWithName("compact").unsigned)
-        is_ascii = bool(state.GetChildMemberWithName("ascii").unsigned)
-        kind = state.GetChildMemberWithName("kind").unsigned
-        ready = bool(state.GetChildMemberWithName("ready").unsigned)
+    Memory is fetched in aligned blocks of `page_size` bytes, and all reads
+    within a block that has already been fetched are served locally. When
+    consecutive pages are missed (e.g. while reading a large array), the next
+    `readahead` pages are fetched along with the missed one. This matters the
+    most when each read is expensive, e.g. for remote targets and core files.
 
-        # Reference: PEP 393 and Include/cpython/unicodeobject.h.
-        if is_ascii and compact and ready:
-            # content is stored right after the data structure in memory
-            addr = value.unsigned + ascii_type.size
-        elif compact and ready:
-            # content is stored right after the data structure in memory
-            compact_type = self.target.FindFirstType("PyCompactUnicodeObject")
+    The cache is dropped whenever the value returned by `generation` changes
+    (e.g. when the process under debug is resumed and stopped again), or
+    explicitly by calling clear() (e.g. after memory was modified by LLDB).
+    """
 
-            value = self.lldb_value.Cast(compact_type.GetPointerType())
-            addr = value.unsigned + compact_type.size
-        elif ready:
-            # legacy string, "ready" (content is stored in the `data.any` field)
-            str_type = self.target.FindFirstType("PyUnicodeObject")
+    # defaults; within LLDB, readers are created with MEMORY_CACHE_SETTINGS
+    page_size = 16 * 1024
+    readahead = 4
+    max_pages = 4096
 
-            value = self.lldb_value.Cast(str_type.GetPointerType())
-            addr = (
-                value.GetChildMemberWithName("data")
-                .GetChildMemberWithName("any")
-                .unsigned
-            )
-        else:
-            # legacy string, "not ready" (content is stored in the `wstr` field)
-            str_type = self.target.FindFirstType("PyUnicodeObject")
-            wchar_type = self.target.FindFirstType("wchar_t")
+    def __init__(
+        self, reader, page_size=None, readahead=None, max_pages=None, generation=None
+    ):
+        self.reader = reader
+        self.pointer_size = reader.pointer_size
+        self.byteorder = reader.byteorder
 
-            value = self.lldb_value.Cast(str_type.GetPointerType())
-            addr = (
-                value.GetChildMemberWithName("_base")
-                .GetChildMemberWithName("_base")
-                .GetChildMemberWithName("wstr")
-            ).unsigned
-            length = (
-                value.GetChildMemberWithName("_base")
-                .GetChildMemberWithName("wstr_length")
-                .unsigned
-            )
-            kind = wchar_type.GetByteSize()
+        self.page_size = page_size or self.page_size
+        self.readahead = self.readahead if readahead is None else readahead
+        self.max_pages = max_pages or self.max_pages
+        if self.page_size & (self.page_size - 1):
+            raise ValueError("Page size must be a power of 2")
 
-        return PyUnicodeObject._read_string_from_memory(
-            self.process, addr, length, kind
-        )
+        self.generation = generation
+        self.stats = collections.Counter()
 
+        self._pages = {}
+        self._last_generation = None
+        self._last_miss = None
 
-class PyNoneObject(PyObject):
-    typename = "NoneType"
-    value = None
+    def read(self, addr, size):
+        if not size:
+            return b""
+
+        if self.generation is not None:
+            generation = self.generation()
+            if generation != self._last_generation:
+                self.clear()
+                self._last_generation = generation
+
+        first = addr // self.page_size
+        last = (addr + size - 1) // self.page_size
+        if last - first > self.readahead:
+            # large reads would just evict everything else from the cache
+            self.stats["bypassed"] += 1
+            return self.reader.read(addr, size)
+
+        chunks = []
+        for page in range(first, last + 1):
+            data = self._pages.get(page)
+            if data is not None:
+                self.stats["hits"] += 1
+            else:
+                data = self._fetch(page)
+                if data is None:
+                    # some of the pages are not entirely readable, so only
+                    # the exact range can be read
+                    self.stats["bypassed"] += 1
+                    return self.reader.read(addr, size)
+
+            chunks.append(data)
+
+        offset = addr - first * self.page_size
+        if len(chunks) == 1:
+            return chunks[0][offset : offset + size]
+        else:
+            return b"".join(chunks)[offset : offset + size]
 
+    def mapped_files(self):
+        return self.reader.mapped_files()
 
-class _PySequence(object):
     @property
-    def value(self):
-        value = self.lldb_value.Cast(self.lldb_type.GetPointerType())
-        size = (
-            value.GetChildMemberWithName("ob_base")
-            .GetChildMemberWithName("ob_size")
-            .signed
-        )
-        items = value.GetChildMemberWithName("ob_item")
+    def cached_pages(self):
+        return len(self._pages)
 
-        return self.python_type(
-            PyObject.from_value(items.GetChildAtIndex(i, 0, True)) for i in range(size)
-        )
+    def clear(self):
+        self._pages.clear()
+        self._last_miss = None
 
+    def _fetch(self, page):
+        self.stats["misses"] += 1
 
-class PyListObject(_PySequence, PyObject):
-    python_type = list
-    typename = "list"
-    cpython_struct = "PyListObject"
+        count = 1
+        if self._last_miss is not None and self._last_miss == page - 1:
+            count += self.readahead
 
-    @property
-    def lldb_type(self):
-        return self.target.FindFirstType(self.cpython_struct)
+        while True:
+            try:
+                data = self.reader.read(page * self.page_size, count * self.page_size)
+                break
+            except MemoryReadError:
+                if count == 1:
+                    self.stats["errors"] += 1
+                    return None
 
+                # pages that were read ahead might not be mapped
+                count = 1
 
-class PyTupleObject(_PySequence, PyObject):
-    python_type = tuple
-    typename = "tuple"
-    cpython_struct = "PyTupleObject"
+        self.stats["reads"] += 1
+        self.stats["bytes"] += len(data)
 
-    @property
-    def lldb_type(self):
-        return self.target.FindFirstType(self.cpython_struct)
+        if len(self._pages) + count > self.max_pages:
+            self.clear()
+        for i in range(count):
+            self._pages[page + i] = data[i * self.page_size : (i + 1) * self.page_size]
+        self._last_miss = page + count - 1
 
+        return self._pages[page]
 
-class _PySetObject(object):
-    cpython_struct = "PySetObject"
+    def close(self):
+        self.clear()
+        self.reader.close()
 
-    @property
-    def value(self):
-        set_type = self.target.FindFirstType(self.cpython_struct)
 
-        value = self.lldb_value.Cast(set_type.GetPointerType())
-        size = value.GetChildMemberWithName("mask").unsigned + 1
-        table = value.GetChildMemberWithName("table")
-        array = table.Cast(
-            table.type.GetPointeeType().GetArrayType(size).GetPointerType()
-        )
+class _IOVec(ctypes.Structure):
+    _fields_ = [("iov_base", ctypes.c_void_p), ("iov_len", ctypes.c_size_t)]
 
-        rv = set()
-        for i in range(size):
-            entry = array.GetChildAtIndex(i)
-            key = entry.GetChildMemberWithName("key")
-            hash_ = entry.GetChildMemberWithName("hash").signed
 
-            # filter out 'dummy' and 'unused' slots
-            if hash_ != -1 and (hash_ != 0 or key.unsigned != 0):
-                rv.add(PyObject.from_value(key))
+class ProcessMemoryReader(MemoryReader):
+    """Read the memory of a live Linux process w/o attaching a debugger.
 
-        return rv
+    process_vm_readv(2) is used if available; /proc/<pid>/mem is used
+    otherwise (e.g. when the system call is blocked by seccomp). Either way,
+    the process keeps running, so the data structures being read might be
+    modified concurrently.
+    """
 
+    def __init__(self, pid):
+        self.pid = pid
+        self._mem = None
 
-class PySetObject(_PySetObject, PyObject):
-    typename = "set"
+        try:
+            libc = ctypes.CDLL(None, use_errno=True)
+            self._process_vm_readv = libc.process_vm_readv
+            self._process_vm_readv.restype = ctypes.c_ssize_t
+        except (AttributeError, OSError):
+            self._process_vm_readv = None
 
+    def read(self, addr, size):
+        if not size:
+            return b""
 
-class PyFrozenSetObject(_PySetObject, PyObject):
-    typename = "frozenset"
+        if self._process_vm_readv is not None:
+            buf = ctypes.create_string_buffer(size)
+            local = _IOVec(ctypes.addressof(buf), size)
+            remote = _IOVec(addr, size)
+            rv = self._process_vm_readv(
+                self.pid, ctypes.byref(local), 1, ctypes.byref(remote), 1, 0
+            )
+            if rv == size:
+                return buf.raw
 
-    @property
-    def value(self):
-        return frozenset(super(PyFrozenSetObject, self).value)
+            error = ctypes.get_errno()
+            if rv >= 0 or error not in (errno.ENOSYS, errno.EPERM):
+                raise MemoryReadError(
+                    "Failed to read {} bytes at {:#x}: {}".format(
+                        size, addr, os.strerror(error) if rv < 0 else "partial read"
+                    )
+                )
 
+            # fall back to /proc/<pid>/mem
+            self._process_vm_readv = None
 
-class _PyDictObject(object):
-    DICT_KEYS_GENERAL = 0
-    DICT_KEYS_UNICODE = 1
-    DICT_KEYS_SPLIT = 2
+        try:
+            if self._mem is None:
+                self._mem = os.open("/proc/{}/mem".format(self.pid), os.O_RDONLY)
 
-    @staticmethod
-    def _get_table_size(ma_keys):
-        dk_log2_size = ma_keys.GetChildMemberWithName("dk_log2_size")
-        if dk_log2_size.IsValid():
-            # CPython version >= 3.11
-            table_size = 1 << dk_log2_size.unsigned
-        else:
-            table_size = ma_keys.GetChildMemberWithName("dk_size").unsigned
+            data = os.pread(self._mem, size, addr)
+        except OSError as e:
+            raise MemoryReadError(
+                "Failed to read {} bytes at {:#x}: {}".format(size, addr, e)
+            )
+        if len(data) != size:
+            raise MemoryReadError(
+                "Failed to read {} bytes at {:#x}: partial read".format(size, addr)
+            )
 
-        return table_size
+        return data
 
-    @staticmethod
-    def _get_dictentry_type(target, ma_keys):
-        dk_kind = ma_keys.GetChildMemberWithName("dk_kind")
-        if dk_kind.IsValid():
-            # CPython version >= 3.11
-            kind = dk_kind.unsigned
-        else:
-            kind = _PyDictObject.DICT_KEYS_GENERAL
+    def mapped_files(self):
+        rv = []
+        with io.open("/proc/{}/maps".format(self.pid), "rt") as f:
+            for line in f:
+                fields = line.split(None, 5)
+                if len(fields) < 6 or not fields[5].startswith("/"):
+                    continue
 
-        if kind == _PyDictObject.DICT_KEYS_GENERAL:
-            return target.FindFirstType("PyDictKeyEntry")
-        else:
-            return target.FindFirstType("PyDictUnicodeEntry")
+                start, end = (int(i, 16) for i in fields[0].split("-"))
+                rv.append((start, end, int(fields[2], 16), fields[5].rstrip("\n")))
 
-    @property
-    def value(self):
-        dict_type = self.target.FindFirstType("PyDictObject")
-        object_type = self.target.FindFirstType("PyObject")
+        return rv
 
-        value = self.lldb_value.Cast(dict_type.GetPointerType()).deref
+    def close(self):
+        if self._mem is not None:
+            os.close(self._mem)
+            self._mem = None
 
-        ma_keys = value.GetChildMemberWithName("ma_keys")
-        num_entries = ma_keys.GetChildMemberWithName("dk_nentries").unsigned
 
-        table_size = _PyDictObject._get_table_size(ma_keys)
-        dictentry_type = _PyDictObject._get_dictentry_type(self.target, ma_keys)
+class CoreFileMemoryReader(MemoryReader):
+    """Read the memory of a process from an ELF core file.
 
-        # hash table effectively stores indexes of entries in the key/value
-        # pairs array; the size of an index varies, so that all possible
-        # array positions can be addressed
-        if table_size < 0xFF:
-            index_size = 1
-        elif table_size < 0xFFFF:
-            index_size = 2
-        elif table_size < 0xFFFFFFF:
-            index_size = 4
-        else:
-            index_size = 8
-        shift = table_size * index_size
+    The core file is memory mapped once, and the PT_LOAD segments are indexed
+    by virtual address, so that reads are served directly from the mapping.
+    buffer() returns the mapping itself and does not copy any data, which
+    allows for scanning large amounts of memory at disk bandwidth.
 
-        indices = ma_keys.GetChildMemberWithName("dk_indices")
-        if indices.IsValid():
-            # CPython version >= 3.6
-            # entries are stored in an array right after the indexes table
-            addr = lldb.SBAddress(indices.AddressOf().unsigned + shift, self.target)
-            entries = self.target.CreateValueFromAddress(
-                "entries", addr, dictentry_type.GetArrayType(num_entries)
-            )
-        else:
-            # CPython version < 3.6
-            num_entries = table_size
-            entries = ma_keys.GetChildMemberWithName("dk_entries").Cast(
-                dictentry_type.GetArrayType(num_entries)
-            )
+    Memory that was not dumped to the core file (e.g. read-only segments of
+    shared libraries) is read via the `fallback` reader, if provided, or from
+    the mapped files at their original paths otherwise.
+    """
 
-        ma_values = value.GetChildMemberWithName("ma_values")
-        if ma_values.unsigned != 0:
-            is_split = True
-            ma_values = ma_values.deref.Cast(
-                object_type.GetPointerType().GetArrayType(num_entries)
-            )
-        else:
-            is_split = False
+    def __init__(self, path, fallback=None):
+        self.path = path
+        self.fallback = fallback
 
-        rv = self.python_type()
-        for i in range(num_entries):
-            entry = entries.GetChildAtIndex(i)
-            k = entry.GetChildMemberWithName("me_key")
-            v = entry.GetChildMemberWithName("me_value")
-            if k.unsigned != 0 and v.unsigned != 0:
-                # hash table is "combined"; keys and values are stored together
-                rv[PyObject.from_value(k)] = PyObject.from_value(v)
-            elif k.unsigned != 0 and is_split:
-                # hash table is "split"; values are stored separately
-                for j in range(i, table_size):
-                    v = ma_values.GetChildAtIndex(j)
-                    if v.unsigned != 0:
-                        rv[PyObject.from_value(k)] = PyObject.from_value(v)
-                        break
+        self.elf = ElfFile(path)
+        if self.elf.e_type != ElfFile.ET_CORE:
+            self.elf.close()
+            raise ValueError("{} is not a core file".format(path))
 
-        return rv
+        self.pointer_size = 8 if self.elf.is64 else 4
+        self.byteorder = self.elf.byteorder
 
+        with io.open(path, "rb") as f:
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        self._view = memoryview(self._mmap)
 
-class PyDictObject(_PyDictObject, PyObject):
-    python_type = dict
-    typename = "dict"
-    cpython_struct = "PyDictObject"
+        # only the segments whose contents were actually dumped can be read
+        self._segments = sorted(
+            (segment.vaddr, segment.vaddr + segment.filesz, segment.offset)
+            for segment in self.elf.segments
+            if segment.type == ElfFile.PT_LOAD and segment.filesz
+        )
+        self._starts = [start for start, _, _ in self._segments]
+        self._mapped_files = self._parse_nt_file()
+        self._files = {}
 
+    def _file_offset(self, addr, size):
+        """Return the offset of a range of memory in the core file or None if
+        the range was not dumped to the core file."""
 
-class Counter(_PyDictObject, PyObject):
-    python_type = collections.Counter
-    typename = "Counter"
+        i = bisect.bisect_right(self._starts, addr) - 1
+        if i >= 0:
+            start, end, offset = self._segments[i]
+            if addr + size <= end:
+                return offset + addr - start
 
+        return None
 
-class OrderedDict(_PyDictObject, PyObject):
-    python_type = collections.OrderedDict
-    typename = "collections.OrderedDict"
+    def buffer(self, addr, size):
+        offset = self._file_offset(addr, size)
+        if offset is None:
+            return self.read(addr, size), 0
 
+        return self._mmap, offset
 
-class Defaultdict(PyObject):
-    typename = "collections.defaultdict"
-    cpython_struct = "defdictobject"
+    def read(self, addr, size):
+        if not size:
+            return b""
 
-    @property
-    def value(self):
-        dict_type = self.target.FindFirstType("defdictobject")
-        value = self.lldb_value.Cast(dict_type.GetPointerType()).deref
-        # for the time being, let's just convert it to a regular dict,
-        # as we can't properly display the repr of the default_factory
-        # anyway, because in order to do that we would need to execute
-        # code within the context of the inferior process
-        return PyDictObject(value.GetChildMemberWithName("dict").AddressOf()).value
+        offset = self._file_offset(addr, size)
+        if offset is not None:
+            return bytes(self._view[offset : offset + size])
+        elif self.fallback is not None:
+            return self.fallback.read(addr, size)
+
+        for start, end, offset, path in self._mapped_files:
+            if start <= addr and addr + size <= end:
+                try:
+                    f = self._files.get(path)
+                    if f is None:
+                        f = self._files[path] = io.open(path, "rb")
+
+                    f.seek(offset + addr - start)
+                    data = f.read(size)
+                except IOError:
+                    break
+                if len(data) == size:
+                    return data
+
+        raise MemoryReadError(
+            "Failed to read {} bytes at {:#x}: not available in the core file".format(
+                size, addr
+            )
+        )
 
+    def mapped_files(self):
+        return list(self._mapped_files)
 
-class _CollectionsUserObject(object):
-    @property
-    def value(self):
-        # UserDict, UserString, and UserList all have a single instance variable
-        # called "data", which is the collection used for storing the elements.
-        # As usual, that instance variable is stored in __dict__, so we need to
-        # find the location of that dict object first and look up the key.
+    def _parse_nt_file(self):
+        word = "Q" if self.elf.is64 else "I"
+        word_size = struct.calcsize(word)
+        prefix = self.elf.endian
 
-        dict_offset = (
-            self.lldb_value.GetChildMemberWithName("ob_type")
-            .GetChildMemberWithName("tp_dictoffset")
-            .signed
-        )
-        if dict_offset > 0:
-            # CPython < 3.11: __dict__ is located $tp_dictoffset bytes after the
-            # start of the common PyObject header.
-            object_type = self.target.FindFirstType("PyObject")
-            address = lldb.SBAddress(
-                int(self.lldb_value.value, 16) + dict_offset, self.target
-            )
-            value = self.target.CreateValueFromAddress(
-                "value", address, object_type.GetPointerType()
-            )
+        for name, type_, desc in self.elf.notes():
+            if name != b"CORE" or type_ != ElfFile.NT_FILE:
+                continue
 
-            return next(
-                v for k, v in PyDictObject(value).value.items() if k.value == "data"
-            )
-        else:
-            # CPython >= 3.11: &__dict__ is always stored at a fixed offset
-            # before the start of the common PyObject header.
-            object_type = self.target.FindFirstType("PyDictValues")
-            address = lldb.SBAddress(int(self.lldb_value.value, 16) - 32, self.target)
-            value = self.target.CreateValueFromAddress(
-                "value", address, object_type.GetPointerType()
+            count, page_size = struct.unpack_from(prefix + word * 2, desc)
+            entries = struct.unpack_from(
+                prefix + word * (3 * count), desc, 2 * word_size
             )
+            paths = desc[(2 + 3 * count) * word_size :].split(b"\0")
+
+            return [
+                (
+                    entries[3 * i],
+                    entries[3 * i + 1],
+                    entries[3 * i + 2] * page_size,
+                    os.fsdecode(paths[i]),
+                )
+                for i in range(count)
+            ]
 
-            # TODO: This only works because there is only one instance variable
-            # called "data" right now. We need to solve the generic case and
-            # implement iteration over PyDictValues entries.
-            return PyObject.from_value(
-                value.deref.GetChildMemberWithName("values").GetChildAtIndex(0)
-            )
+        return []
 
+    def close(self):
+        self._view.release()
+        try:
+            self._mmap.close()
+        except BufferError:
+            # views returned by view() are still alive; the mapping will be
+            # released when they are garbage collected
+            pass
+        self.elf.close()
+        for f in self._files.values():
+            f.close()
+        self._files.clear()
 
-class UserDict(_CollectionsUserObject, PyObject):
-    typename = "UserDict"
 
+class AddressMap(object):
+    """A sorted interval map of readable memory regions.
 
-class UserList(_CollectionsUserObject, PyObject):
-    typename = "UserList"
+    Adjacent and overlapping regions are merged, so that checking whether an
+    address range can be read takes O(log n). This is used for rejecting
+    garbage pointers (e.g. when decoding corrupted memory or values stored in
+    CPU registers) before attempting to read them, as each failed read is
+    slow, especially for remote targets.
+    """
 
+    def __init__(self, regions):
+        self.regions = sorted(regions)
 
-class UserString(_CollectionsUserObject, PyObject):
-    typename = "UserString"
+        self._starts, self._ends = [], []
+        for region in self.regions:
+            if self._ends and region.start <= self._ends[-1]:
+                self._ends[-1] = max(self._ends[-1], region.end)
+            else:
+                self._starts.append(region.start)
+                self._ends.append(region.end)
 
+    def __contains__(self, addr):
+        return self.contains(addr)
 
-class PyCodeAddressRange(object):
-    """A class for parsing the line number table implemented in PEP 626.
+    def __len__(self):
+        return len(self._starts)
 
-    The format of the line number table is not part of CPython's API and may
-    change without warning. The PEP has a dedicated section
-    (https://www.python.org/dev/peps/pep-0626/#out-of-process-debuggers-and-profilers),
-    which says that tools, that can't use C-API, should just copy the implementation
-    of functions required for parsing this table. We do just that below but also
-    translate C to Python.
-    """
+    def contains(self, addr, size=1):
+        """Check if the range [addr, addr + size) is entirely readable."""
 
-    def __init__(self, co_linetable, co_firstlineno):
-        """Implements PyLineTable_InitAddressRange from codeobject.c."""
+        i = bisect.bisect_right(self._starts, addr) - 1
+        return i >= 0 and addr + size <= self._ends[i]
 
-        self.lo_next = 0
-        self.co_linetable = co_linetable
-        self.computed_line = co_firstlineno
-        self.ar_start = -1
-        self.ar_end = 0
-        self.ar_line = -1
 
-    def next_address_range(self):
-        """Implements PyLineTable_NextAddressRange from codeobject.c."""
+class ElfFile(object):
+    """A minimal ELF parser: program headers, notes and symbol tables."""
 
-        if self._at_end():
-            return False
+    ET_CORE = 4
+    PT_LOAD = 1
+    PT_NOTE = 4
+    SHT_SYMTAB = 2
+    SHT_DYNSYM = 11
+    NT_FILE = 0x46494C45
 
-        self._advance()
-        while self.ar_start == self.ar_end:
-            self._advance()
+    Segment = collections.namedtuple(
+        "Segment", ["type", "offset", "vaddr", "filesz", "memsz"]
+    )
+    Section = collections.namedtuple(
+        "Section", ["type", "offset", "size", "link", "entsize"]
+    )
 
-        return True
+    def __init__(self, path):
+        self.path = path
+        self._file = io.open(path, "rb")
 
-    def prev_address_range(self):
-        """Implements PyLineTable_PreviousAddressRange from codeobject.c."""
+        ident = self._file.read(16)
+        if ident[:4] != b"\x7fELF":
+            self._file.close()
+            raise ValueError("{} is not an ELF file".format(path))
 
-        if self.ar_start <= 0:
-            return False
+        self.is64 = ident[4] == 2
+        self.byteorder = "little" if ident[5] == 1 else "big"
+        self.endian = "<" if ident[5] == 1 else ">"
 
-        self._retreat()
-        while self.ar_start == self.ar_end:
-            self._retreat()
+        header = struct.unpack(
+            self.endian + ("HHIQQQIHHHHHH" if self.is64 else "HHIIIIIHHHHHH"),
+            self._file.read(48 if self.is64 else 36),
+        )
+        (self.e_type, _, _, _, self._phoff, self._shoff, _, _) = header[:8]
+        (self._phentsize, self._phnum, self._shentsize, self._shnum) = header[8:12]
+
+    def pread(self, offset, size):
+        self._file.seek(offset)
+        data = self._file.read(size)
+        if len(data) != size:
+            raise MemoryReadError(
+                "Failed to read {} bytes at offset {:#x} of {}".format(
+                    size, offset, self.path
+                )
+            )
 
-        return True
+        return data
 
-    def _at_end(self):
-        return self.lo_next >= len(self.co_linetable)
+    @property
+    def segments(self):
+        rv = []
+        for i in range(self._phnum):
+            data = self.pread(self._phoff + i * self._phentsize, self._phentsize)
+            if self.is64:
+                type_, _, offset, vaddr, _, filesz, memsz, _ = struct.unpack_from(
+                    self.endian + "IIQQQQQQ", data
+                )
+            else:
+                type_, offset, vaddr, _, filesz, memsz, _, _ = struct.unpack_from(
+                    self.endian + "IIIIIIII", data
+                )
+            rv.append(self.Segment(type_, offset, vaddr, filesz, memsz))
 
-    def _advance(self):
-        self.ar_start = self.ar_end
-        delta = struct.unpack("B", self.co_linetable[self.lo_next : self.lo_next + 1])[
-            0
-        ]
-        self.ar_end += delta
-        ldelta = struct.unpack(
-            "b", self.co_linetable[self.lo_next + 1 : self.lo_next + 2]
-        )[0]
-        self.lo_next += 2
+        return rv
 
-        if ldelta == -128:
-            self.ar_line = -1
-        else:
-            self.computed_line += ldelta
-            self.ar_line = self.computed_line
+    @property
+    def sections(self):
+        rv = []
+        for i in range(self._shnum):
+            data = self.pread(self._shoff + i * self._shentsize, self._shentsize)
+            if self.is64:
+                _, type_, _, _, offset, size, link, _, _, entsize = struct.unpack_from(
+                    self.endian + "IIQQQQIIQQ", data
+                )
+            else:
+                _, type_, _, _, offset, size, link, _, _, entsize = struct.unpack_from(
+                    self.endian + "IIIIIIIIII", data
+                )
+            rv.append(self.Section(type_, offset, size, link, entsize))
 
-    def _retreat(self):
-        ldelta = struct.unpack("b", self.co_linetable[self.lo_next - 1 : self.lo_next])[
-            0
-        ]
-        if ldelta == -128:
-            ldelta = 0
+        return rv
 
-        self.computed_line -= ldelta
-        self.lo_next -= 2
-        self.ar_end = self.ar_start
-        self.ar_start -= struct.unpack(
-            "B", self.co_linetable[self.lo_next - 2 : self.lo_next - 1]
-        )[0]
-        ldelta = struct.unpack("b", self.co_linetable[self.lo_next - 1 : self.lo_next])[
-            0
-        ]
-        if ldelta == -128:
-            self.ar_line = -1
-        else:
-            self.ar_line = self.computed_line
+    def notes(self):
+        """Yield (name, type, description) of all notes in PT_NOTE segments."""
 
+        for segment in self.segments:
+            if segment.type != self.PT_NOTE:
+                continue
 
-class PyCodeObject(PyObject):
-    typename = "code"
+            data = self.pread(segment.offset, segment.filesz)
+            pos = 0
+            while pos + 12 <= len(data):
+                namesz, descsz, type_ = struct.unpack_from(
+                    self.endian + "III", data, pos
+                )
+                pos += 12
+                name = data[pos : pos + namesz].rstrip(b"\0")
+                pos += (namesz + 3) & ~3
+                desc = data[pos : pos + descsz]
+                pos += (descsz + 3) & ~3
+
+                yield name, type_, desc
+
+    def find_symbol(self, name):
+        """Return the value (i.e. the file address) of a symbol or None."""
+
+        name = name.encode("utf-8") + b"\0"
+        sections = self.sections
+        for section in sections:
+            if section.type not in (self.SHT_SYMTAB, self.SHT_DYNSYM):
+                continue
 
-    def addr2line(self, f_lineno, f_lasti):
-        addr_range_type = self.target.FindFirstType("PyCodeAddressRange")
-        if addr_range_type.IsValid():
-            # CPython >= 3.10 (PEP 626)
-            if f_lineno:
-                return f_lineno
-            else:
-                return self._from_co_linetable(f_lasti * 2)
-        else:
-            # CPython < 3.10
-            return self._from_co_lnotab(f_lasti) + f_lineno
+            strtab = sections[section.link]
+            strings = self.pread(strtab.offset, strtab.size)
 
-    def _from_co_linetable(self, address):
-        """Translated code from Objects/codeobject.c:PyCode_Addr2Line."""
+            # string tables can share suffixes, so all occurrences are candidates
+            candidates = set()
+            pos = strings.find(name)
+            while pos != -1:
+                candidates.add(pos)
+                pos = strings.find(name, pos + 1)
+            if not candidates:
+                continue
 
-        co_linetable = PyObject.from_value(self.child("co_linetable")).value
-        co_firstlineno = self.child("co_firstlineno").signed
-        if address < 0:
-            return co_firstlineno
+            fmt = self.endian + ("IBBHQQ" if self.is64 else "IIIBBH")
+            symbols = self.pread(section.offset, section.size)
+            for entry in struct.iter_unpack(
+                fmt, symbols[: len(symbols) // section.entsize * section.entsize]
+            ):
+                if entry[0] in candidates:
+                    value = entry[4] if self.is64 else entry[1]
+                    if value:
+                        return value
 
-        bounds = PyCodeAddressRange(co_linetable, co_firstlineno)
-        while bounds.ar_end <= address:
-            if not bounds.next_address_range():
-                return -1
-        while bounds.ar_start > address:
-            if not bounds.prev_address_range():
-                return -1
+    def close(self):
+        self._file.close()
 
-        return bounds.ar_line
+    def __enter__(self):
+        return self
 
-    def _from_co_lnotab(self, address):
-        """Translated pseudocode from Objects/lnotab_notes.txt."""
+    def __exit__(self, *exc_info):
+        self.close()
 
-        co_lnotab = PyObject.from_value(self.child("co_lnotab")).value
-        assert len(co_lnotab) % 2 == 0
 
-        lineno = addr = 0
-        for addr_incr, line_incr in zip(co_lnotab[::2], co_lnotab[1::2]):
-            addr_incr = (
-                ord(addr_incr) if isinstance(addr_incr, (bytes, str)) else addr_incr
-            )
-            line_incr = (
-                ord(line_incr) if isinstance(line_incr, (bytes, str)) else line_incr
-            )
+def find_symbol_address(memory, name):
+    """Find the load address of a global symbol in the memory of a process.
 
-            addr += addr_incr
-            if addr > address:
-                return lineno
-            if line_incr >= 0x80:
-                line_incr -= 0x100
-            lineno += line_incr
+    The symbol is looked up in the ELF files mapped to the memory of the
+    process; libpython and the interpreter executable are checked first.
+    """
 
-        return lineno
+    bases = {}
+    for start, _, offset, path in memory.mapped_files():
+        if offset == 0 and path not in bases:
+            bases[path] = start
 
+    for path in sorted(bases, key=lambda p: "python" not in os.path.basename(p)):
+        try:
+            elf = ElfFile(path)
+        except (IOError, ValueError):
+            continue
 
-class PyFrameObject(PyObject):
-    typename = "frame"
+        with elf:
+            value = elf.find_symbol(name)
+            if value is None:
+                continue
 
-    def __init__(self, lldb_value):
-        super(PyFrameObject, self).__init__(lldb_value)
-        self.co = PyCodeObject(self.child("f_code"))
+            first_vaddr = min(
+                segment.vaddr
+                for segment in elf.segments
+                if segment.type == ElfFile.PT_LOAD
+            )
+            return bases[path] - (first_vaddr & ~(PAGE_SIZE - 1)) + value
+
+
+class Layout(object):
+    """Offsets and sizes of CPython structs needed to decode raw memory.
+
+    Within LLDB the layout is extracted from the debugging symbols. It can also
+    be saved to a JSON file, so that standalone tools can decode the memory of
+    processes running the same CPython build w/o LLDB.
+    """
+
+    FIELDS = (
+        "_PyRuntimeState.interpreters.head",
+        "PyInterpreterState.next",
+        "PyInterpreterState.tstate_head",
+        "PyThreadState.next",
+        "PyThreadState.frame",
+        "PyThreadState.thread_id",
+        "_frame.f_back",
+        "_frame.f_code",
+        "_frame.f_lineno",
+        "_frame.f_lasti",
+        "PyCodeObject.co_filename",
+        "PyCodeObject.co_name",
+        "PyCodeObject.co_firstlineno",
+        "PyObject.ob_refcnt",
+        "PyObject.ob_type",
+        "PyVarObject.ob_size",
+        "PyBytesObject.ob_sval",
+        "PyASCIIObject.length",
+        "PyASCIIObject.state",
+        "PyTypeObject.tp_name",
+        "PyTypeObject.tp_basicsize",
+        "PyTypeObject.tp_itemsize",
+        "PyTypeObject.tp_base",
+        "PyTypeObject.tp_flags",
+        "PyTypeObject.tp_dictoffset",
+        "PyListObject.ob_item",
+        "PyListObject.allocated",
+        "PyTupleObject.ob_item",
+        "PyDictObject.ma_keys",
+        "PyDictObject.ma_values",
+        "PyDictKeysObject.dk_refcnt",
+        "PyDictKeysObject.dk_nentries",
+        "PyDictKeysObject.dk_indices",
+        "PyDictKeyEntry.me_key",
+        "PyDictKeyEntry.me_value",
+        "PySetObject.table",
+        "PySetObject.mask",
+        "PySetObject.smalltable",
+        "PyCellObject.ob_ref",
+        "_frame.f_localsplus",
+        "PyTypeObject.tp_dict",
+        "PyTypeObject.tp_mro",
+        "PyTypeObject.tp_members",
+    )
+    OPTIONAL_FIELDS = (
+        # CPython < 3.11
+        "PyDictKeysObject.dk_size",
+        # CPython >= 3.11
+        "PyDictKeysObject.dk_log2_size",
+        "PyDictKeysObject.dk_log2_index_bytes",
+        "PyDictKeysObject.dk_kind",
+        "PyDictUnicodeEntry.me_key",
+        "PyDictUnicodeEntry.me_value",
+        # only available if CPython is built with pymalloc
+        "arena_object.address",
+        "arena_object.pool_address",
+        "arena_object.nfreepools",
+        "pool_header.ref.count",
+        "pool_header.szidx",
+        # CPython < 3.10
+        "PyCodeObject.co_lnotab",
+        # the number of live slots of f_localsplus of CPython < 3.11
+        "PyCodeObject.co_nlocals",
+        "PyCodeObject.co_cellvars",
+        "PyCodeObject.co_freevars",
+        # CPython < 3.10
+        "_frame.f_valuestack",
+        "_frame.f_stacktop",
+        # CPython 3.10
+        "_frame.f_stackdepth",
+        # CPython >= 3.10
+        "PyCodeObject.co_linetable",
+        # CPython < 3.12
+        "PyUnicodeObject.data",
+        "PyLongObject.ob_digit",
+        # used for looking up keys in dicts w/o decoding them
+        "PyASCIIObject.hash",
+        "PyDictKeyEntry.me_hash",
+        # used for paging through dicts and sets
+        "PyDictObject.ma_used",
+        "PySetObject.used",
+        "setentry.key",
+        "setentry.hash",
+        # instance dicts of CPython >= 3.11
+        "PyHeapTypeObject.ht_cached_keys",
+        "PyDictValues.values",
+        # CPython 3.12
+        "PyDictOrValues.values",
+        # CPython >= 3.13
+        "PyDictValues.valid",
+        # collections.deque, which might be missing from debugging symbols
+        "dequeobject.leftblock",
+        "dequeobject.leftindex",
+        "block.data",
+        "block.rightlink",
+        "dequeobject.maxlen",
+        # array.array, which might be missing from debugging symbols
+        "arrayobject.ob_item",
+        "arrayobject.ob_descr",
+        "arraydescr.typecode",
+        "arraydescr.itemsize",
+        # buffers of bytearray and memoryview objects
+        "PyByteArrayObject.ob_start",
+        "PyMemoryViewObject.flags",
+        "PyMemoryViewObject.view.buf",
+        "PyMemoryViewObject.view.len",
+        "PyMemoryViewObject.view.itemsize",
+        "PyMemoryViewObject.view.ndim",
+        "PyMemoryViewObject.view.shape",
+        "PyMemoryViewObject.view.strides",
+        # sys.modules of the main interpreter
+        "_PyRuntimeState.interpreters.main",
+        # CPython < 3.12
+        "PyInterpreterState.modules",
+        # CPython >= 3.12
+        "PyInterpreterState.imports.modules",
+        # CPython >= 3.12
+        "PyLongObject.long_value.lv_tag",
+        "PyLongObject.long_value.ob_digit",
+        # private structs, which might be missing from debugging symbols
+        "PyModuleObject.md_dict",
+        "PyMemberDef.name",
+        "PyMemberDef.type",
+        "PyMemberDef.offset",
+    )
+    BITFIELDS = (
+        "PyASCIIObject.state.kind",
+        "PyASCIIObject.state.compact",
+        "PyASCIIObject.state.ascii",
+        # CPython < 3.12
+        "PyASCIIObject.state.ready",
+    )
+    SIZES = (
+        "PyASCIIObject",
+        "PyCompactUnicodeObject",
+        "PyGC_Head",
+        "PyDictKeysObject",
+        "PyDictKeyEntry",
+        "PyDictUnicodeEntry",
+        "setentry",
+        "arena_object",
+        "pool_header",
+        "PyMemberDef",
+    )
+
+    _cache = {}
+
+    def __init__(self, fields, bits, sizes, pointer_size=8):
+        # field name -> (offset, size) in bytes
+        self.fields = fields
+        # bitfield name -> (offset, size) in bits relative to the parent field
+        self.bits = bits
+        # struct name -> size in bytes
+        self.sizes = sizes
+        self.pointer_size = pointer_size
+
+    def offset(self, name):
+        return self.fields[name][0]
+
+    def has(self, name):
+        return name in self.fields or name in self.bits
 
     @classmethod
-    def _from_frame_no_walk(cls, frame):
-        """
-        Extract PyFrameObject object from current frame w/o stack walking.
-        """
-        f = frame.variables["f"]
-        if f and f[0].error.Success():
-            return cls(f[0])
-        else:
-            return None
+    def from_target(cls, target):
+        """Extract the layout from the debugging symbols of an LLDB target."""
+
+        key = target.GetExecutable().fullpath
+        if key in cls._cache:
+            return cls._cache[key]
+
+        fields, bits, sizes = {}, {}, {}
+        for name in cls.FIELDS + cls.OPTIONAL_FIELDS:
+            member = _find_member(target, name)
+            if member is not None:
+                offset, sbtype = member
+                fields[name] = (offset // 8, sbtype.GetByteSize())
+            elif name in cls.FIELDS:
+                raise ValueError(
+                    "Failed to find {} (either debugging symbols are missing "
+                    "or this version of CPython is not supported)".format(name)
+                )
+
+        for name in cls.BITFIELDS:
+            member = _find_member(target, name, bitfield=True)
+            if member is not None:
+                parent = name.rsplit(".", 1)[0]
+                offset, size = member
+                bits[name] = (offset - 8 * fields[parent][0], size)
+
+        for name in cls.SIZES:
+            sizes[name] = target.FindFirstType(name).GetByteSize()
+
+        layout = cls._cache[key] = cls(fields, bits, sizes, target.GetAddressByteSize())
+        return layout
 
     @classmethod
-    def _from_frame_heuristic(cls, frame):
-        """Extract PyFrameObject object from current frame using heuristic.
+    def from_executable(cls, path):
+        """Extract the layout from the debugging symbols of a CPython executable."""
 
-        When CPython is compiled with aggressive optimizations, the location
-        of PyFrameObject variable f can sometimes be lost. Usually, we still
-        can figure it out by analyzing the state of CPU registers. This is not
-        very reliable, because we basically try to cast the value stored in
-        each register to (PyFrameObject*) and see if it produces a valid
-        PyObject object.
+        if lldb is None:
+            raise RuntimeError(
+                "LLDB Python bindings are required to extract the layout "
+                "from debugging symbols"
+            )
 
-        This becomes especially ugly when there is more than one PyFrameObject*
-        in CPU registers at the same time. In this case we are looking for the
-        frame with a parent, that we have not seen yet.
-        """
+        debugger = lldb.SBDebugger.Create()
+        try:
+            return cls.from_target(debugger.CreateTarget(path))
+        finally:
+            lldb.SBDebugger.Destroy(debugger)
 
-        target = frame.GetThread().GetProcess().GetTarget()
-        object_type = target.FindFirstType("PyObject")
+    @classmethod
+    def load(cls, path):
+        with io.open(path, "rt", encoding="utf-8") as f:
+            data = json.load(f)
+
+        return cls(
+            {k: tuple(v) for k, v in data["fields"].items()},
+            {k: tuple(v) for k, v in data["bits"].items()},
+            data["sizes"],
+            data["pointer_size"],
+        )
 
-        # in CPython >= 3.9, PyFrameObject is an opaque type that does not
-        # expose its own structure. Unfortunately, we can't make any function
-        # calls here, so we resort to using the internal counterpart instead
-        public_frame_type = target.FindFirstType("PyFrameObject")
-        internal_frame_type = target.FindFirstType("_frame")
-        frame_type = (
-            public_frame_type if public_frame_type.members else internal_frame_type
+    def save(self, path):
+        with io.open(path, "wt", encoding="utf-8") as f:
+            json.dump(
+                {
+                    "fields": self.fields,
+                    "bits": self.bits,
+                    "sizes": self.sizes,
+                    "pointer_size": self.pointer_size,
+                },
+                f,
+                indent=2,
+                sort_keys=True,
+            )
+
+
+def _find_member(target, path, bitfield=False):
+    """Find a (possibly nested) struct member given a path like "Type.field.subfield".
+
+    Returns a tuple of (offset in bits, SBType) for regular members, or
+    (offset in bits, size in bits) for bitfields. Returns None if not found.
+    """
+
+    type_name, *names = path.split(".")
+    sbtype = target.FindFirstType(type_name)
+    if not sbtype.IsValid():
+        return None
+
+    offset = 0
+    for name in names:
+        sbtype = sbtype.GetCanonicalType()
+        member = next(
+            (
+                sbtype.GetFieldAtIndex(i)
+                for i in range(sbtype.GetNumberOfFields())
+                if sbtype.GetFieldAtIndex(i).GetName() == name
+            ),
+            None,
         )
+        if member is None:
+            return None
 
-        found_frames = []
-        for register in general_purpose_registers(frame):
-            sbvalue = frame.register[register]
+        offset += member.GetOffsetInBits()
+        sbtype = member.GetType()
 
-            # ignore unavailable registers or null pointers
-            if not sbvalue or not sbvalue.unsigned:
-                continue
-            # and things that are not valid PyFrameObjects
-            pyobject = PyObject(sbvalue.Cast(object_type.GetPointerType()))
-            if pyobject.typename != PyFrameObject.typename:
-                continue
+    if bitfield:
+        return offset, member.GetBitfieldSizeInBits()
+    else:
+        return offset, sbtype
 
-            found_frames.append(
-                PyFrameObject(sbvalue.Cast(frame_type.GetPointerType()))
-            )
 
-        # sometimes the parent _PyEval_EvalFrameDefault frame contains two
-        # PyFrameObject's - the one that is currently being executed and its
-        # parent, so we need to filter out the latter
-        found_frames_addresses = [frame.lldb_value.unsigned for frame in found_frames]
-        eligible_frames = [
-            frame
-            for frame in found_frames
-            if frame.child("f_back").unsigned not in found_frames_addresses
-        ]
+# Objects
 
-        if eligible_frames:
-            return eligible_frames[0]
+
+class Budget(object):
+    """A limit on how much of a value is decoded.
+
+    Decoding a huge container or string could take forever, so when a budget
+    is active (for the duration of a `with` block), decoders stop once it is
+    exhausted and represent the rest with placeholders (see Truncated). The
+    budget is shared by all objects decoded within the block, i.e. it limits
+    the total size of a value including the nested objects. Outside of any
+    block, values are decoded in full.
+    """
+
+    current = None
+
+    def __init__(self, max_items=1000, max_bytes=64 * 1024):
+        # the number of items of containers
+        self.items = max_items
+        # the number of bytes of str and bytes payloads
+        self.bytes = max_bytes
+
+        self._previous = None
+
+    def __enter__(self):
+        self._previous, Budget.current = Budget.current, self
+        return self
+
+    def __exit__(self, *exc_info):
+        Budget.current = self._previous
 
     @classmethod
-    def from_frame(cls, frame):
-        if frame is None:
-            return None
+    def take_items(cls, count):
+        """Return how many of count items can be decoded and consume them."""
 
-        # check if we are in a potential function
-        if frame.name not in ("_PyEval_EvalFrameDefault", "PyEval_EvalFrameEx"):
-            return None
+        budget = cls.current
+        if budget is None:
+            return count
 
-        # try different methods of getting PyFrameObject before giving up
-        methods = (
-            # normally, we just need to check the location of `f` variable in the current frame
-            cls._from_frame_no_walk,
-            # but sometimes, it's only available in the parent frame
-            lambda frame: frame.parent and cls._from_frame_no_walk(frame.parent),
-            # when aggressive optimizations are enabled, we need to check the CPU registers
-            cls._from_frame_heuristic,
-            # and the registers in the parent frame as well
-            lambda frame: frame.parent and cls._from_frame_heuristic(frame.parent),
-        )
-        for method in methods:
-            result = method(frame)
-            if result is not None:
-                return result
+        taken = max(min(count, budget.items), 0)
+        budget.items -= taken
+        return taken
 
     @classmethod
-    def get_pystack(cls, thread):
-        pyframes = []
+    def take_bytes(cls, count):
+        """Return how many of count bytes can be decoded and consume them."""
 
-        frame = thread.GetSelectedFrame()
-        while frame:
-            pyframe = cls.from_frame(frame)
-            if pyframe is not None:
-                pyframes.append(pyframe)
+        budget = cls.current
+        if budget is None:
+            return count
 
-            frame = frame.get_parent_frame()
+        taken = max(min(count, budget.bytes), 0)
+        budget.bytes -= taken
+        return taken
 
-        return pyframes
 
-    @property
-    def filename(self):
-        return PyObject.from_value(self.co.child("co_filename")).value
+class Truncated(object):
+    """A placeholder for the items of a container that were not decoded."""
 
-    @property
-    def line_number(self):
-        f_lineno = self.child("f_lineno").signed
-        f_lasti = self.child("f_lasti").signed
+    def __init__(self, count=None):
+        self.count = count
 
-        return self.co.addr2line(f_lineno, f_lasti)
+    def __repr__(self):
+        return "...<{} more>".format(self.count) if self.count else "..."
 
-    @property
-    def line(self):
+
+class TruncatedStr(str):
+    """A prefix of a str value that was not decoded in full."""
+
+    def __new__(cls, value, count):
+        self = super(TruncatedStr, cls).__new__(cls, value)
+        self.count = count
+        return self
+
+    def __repr__(self):
+        return "{}...<{} more>".format(str.__repr__(self), self.count)
+
+
+class TruncatedDict(dict):
+    """A dict, of which not all items were decoded, e.g. {'a': 1, ...<2 more>}.
+
+    typename is set for subclasses of dict, e.g. Counter({'a': 1, ...<2 more>}).
+    """
+
+    def __init__(self, items, count, typename=None):
+        super(TruncatedDict, self).__init__(items)
+        self.count = count
+        self.typename = typename
+
+    def __repr__(self):
+        parts = ["{!r}: {!r}".format(k, v) for k, v in self.items()]
+        parts.append(repr(Truncated(self.count)))
+        rv = "{{{}}}".format(", ".join(parts))
+        return "{}({})".format(self.typename, rv) if self.typename else rv
+
+
+class TruncatedSet(frozenset):
+    """A set or a frozenset, of which not all items were decoded.
+
+    The repr looks like {1, ...<2 more>} or frozenset({1, ...<2 more>}).
+    """
+
+    def __new__(cls, items, count, typename="set"):
+        self = super(TruncatedSet, cls).__new__(cls, items)
+        self.count = count
+        self.typename = typename
+        return self
+
+    def __repr__(self):
+        parts = [repr(item) for item in self]
+        parts.append(repr(Truncated(self.count)))
+        rv = "{{{}}}".format(", ".join(parts))
+        return rv if self.typename == "set" else "{}({})".format(self.typename, rv)
+
+
+class Instance(object):
+    """A decoded instance of a user-defined class.
+
+    The repr looks like the one generated for dataclasses, e.g.
+    Point(x=1, y=2). Reference cycles are represented as Point(...).
+    """
+
+    # addresses of instances, whose repr is being computed
+    _running = set()
+
+    def __init__(self, address, typename, attributes, truncated=0):
+        self.address = address
+        self.typename = typename
+        # a list of (name, value) pairs
+        self.attributes = attributes
+        self.truncated = truncated
+
+    def __repr__(self):
+        if self.address in Instance._running:
+            return "{}(...)".format(self.typename)
+
+        Instance._running.add(self.address)
         try:
-            encoding = source_file_encoding(self.filename)
-            return source_file_lines(
-                self.filename, self.line_number, self.line_number + 1, encoding=encoding
-            )[0]
-        except (IOError, IndexError):
-            return "<source code is not available>"
+            parts = ["{}={!r}".format(name, value) for name, value in self.attributes]
+        finally:
+            Instance._running.discard(self.address)
+        if self.truncated:
+            parts.append(repr(Truncated(self.truncated)))
 
-    def to_pythonlike_string(self):
-        lineno = self.line_number
-        co_name = PyObject.from_value(self.co.child("co_name")).value
-        return 'File "{filename}", line {lineno}, in {co_name}'.format(
-            filename=self.filename,
-            co_name=co_name,
-            lineno=lineno,
-        )
+        return "{}({})".format(self.typename, ", ".join(parts))
 
 
-# Commands
+class TruncatedBytes(bytes):
+    """A prefix of a bytes value that was not decoded in full."""
 
+    def __new__(cls, value, count):
+        self = super(TruncatedBytes, cls).__new__(cls, value)
+        self.count = count
+        return self
 
-class Command(metaclass=abc.ABCMeta):
-    """Base class for py-* command implementations.
+    def __repr__(self):
+        return "{}...<{} more>".format(bytes.__repr__(self), self.count)
 
-    Takes care of commands registration and error handling.
 
-    Subclasses' docstrings are used as help messages for the commands. The
-    first line of a docstring act as a command description that appears ina
-    the output of `help`.
+class Buffer(object):
+    """The contents of a bytearray or a memoryview, e.g. memoryview(b'abc').
+
+    data is None for memoryviews, whose buffer has been released.
     """
 
-    def __init__(self, debugger, unused):
-        # using this instance of Debugger crashes LLDB. But commands receive a
-        # working instance on every invocation, so we don't really need it
-        pass
+    def __init__(self, typename, address, data):
+        self.typename = typename
+        self.address = address
+        # bytes or TruncatedBytes
+        self.data = data
 
-    def get_short_help(self):
-        return self.__doc__.splitlines()[0]
+    def __repr__(self):
+        if self.data is None:
+            return "<released memory at 0x{:x}>".format(self.address)
 
-    def get_long_help(self):
-        return self.__doc__
+        return "{}({!r})".format(self.typename, self.data)
+
+
+class Array(object):
+    """A decoded array.array, e.g. array('d', [1.0, 2.0])."""
+
+    def __init__(self, typecode, items, truncated=0):
+        self.typecode = typecode
+        # a list of numbers or a str for the 'u' and 'w' type codes
+        self.items = items
+        self.truncated = truncated
+
+    def __repr__(self):
+        if not self.items and not self.truncated:
+            return "array({!r})".format(self.typecode)
+
+        if isinstance(self.items, str):
+            items = self.items
+            if self.truncated:
+                items = TruncatedStr(items, self.truncated)
+        else:
+            items = list(self.items)
+            if self.truncated:
+                items.append(Truncated(self.truncated))
+
+        return "array({!r}, {!r})".format(self.typecode, items)
+
+
+class PyObject(object):
+    def __init__(self, lldb_value):
+        # members of CPython structs are hidden by synthetic children
+        self.lldb_value = lldb_value.GetNonSyntheticValue()
+
+    def __repr__(self):
+        return repr(self.value)
+
+    def __hash__(self):
+        return hash(self.value)
+
+    def __eq__(self, other):
+        assert isinstance(other, PyObject)
+
+        return self.value == other.value
+
+    def child(self, name):
+        return self.lldb_value.GetChildMemberWithName(name)
+
+    @classmethod
+    def from_value(cls, v):
+        # immortal objects are recognized by their addresses w/o reading memory
+        if v.TypeIsPointerType():
+            known = immortal_objects(v.GetTarget()).get(v.unsigned)
+            if known is not None:
+                return PyImmortalObject(v, *known)
+
+        ob_type = cls.type_address_of(v)
+        if ob_type is None:
+            return cls(v)
+
+        # the class used for decoding is chosen once per type object, so that
+        # values of the same type are decoded w/o reading the type name again
+        factories = object_reader(v.GetTarget())._factory_cache
+        factory = factories.get(ob_type)
+        if factory is None:
+            factory = factories[ob_type] = cls._factory(v, ob_type)
+
+        return factory(v)
+
+    @classmethod
+    def _factory(cls, v, ob_type):
+        """Return a callable creating a PyObject that decodes objects of a type."""
+
+        typename = cls.typename_of(v)
+        if typename is None:
+            return cls
+
+        # registered decoders take precedence over the built-in ones
+        decoder = object_reader(v.GetTarget()).decoder(ob_type)
+        if decoder is not None:
+            return functools.partial(PyDecodedObject, decoder=decoder)
+
+        subclasses = {
+            c.typename: c for c in cls.__subclasses__() if c.typename is not None
+        }
+        if typename not in subclasses and PyInstanceObject(v).is_user_instance():
+            return PyInstanceObject
+
+        return subclasses.get(typename, cls)
+
+    @staticmethod
+    def type_address_of(v):
+        """Return the address of the type object of an object or None."""
 
-    def __call__(self, debugger, command, exe_ctx, result):
         try:
-            args = self.argument_parser.parse_args(shlex.split(command))
-            self.execute(debugger, args, result)
-        except Exception as e:
-            msg = "Failed to execute command `{}`: {}".format(self.command, e)
+            v = v.GetNonSyntheticValue()
+            # reject garbage pointers before attempting to dereference them
+            process = v.GetProcess()
+            addr = v.unsigned if v.TypeIsPointerType() else v.GetLoadAddress()
+            if not is_readable(process, addr):
+                return
 
-            result.SetError(msg)
+            ob_type = object_reader(v.GetTarget()).type_of(addr)
+            if is_readable(process, ob_type):
+                return ob_type
+        except Exception:
+            # not a PyObject
+            pass
 
-    @property
-    def argument_parser(self):
-        """ArgumentParser instance used for this command.
+    @staticmethod
+    def typename_of(v):
+        try:
+            v = v.GetNonSyntheticValue()
+            # reject garbage pointers before LLDB attempts to dereference them
+            process = v.GetProcess()
+            if v.TypeIsPointerType() and not is_readable(process, v.unsigned):
+                return
+            ob_type = v.GetChildMemberWithName("ob_type")
+            if not is_readable(process, ob_type.unsigned):
+                return
 
-        The default parser does not have any arguments and only prints a help
-        message based on the command description.
+            addr = ob_type.GetChildMemberWithName("tp_name").unsigned
+            if not addr:
+                return
+
+            return memory_reader(v.GetProcess()).read_cstring(addr, 256)
+        except Exception:
+            # if we fail to read tp_name, then it's likely not a PyObject
+            pass
+
+    @property
+    def typename(self):
+        return self.typename_of(self.lldb_value)
+
+    @property
+    def value(self):
+        return str(self.lldb_value.addr)
+
+    @property
+    def target(self):
+        return self.lldb_value.GetTarget()
+
+    @property
+    def process(self):
+        return self.lldb_value.GetProcess()
+
+    @property
+    def address(self):
+        if self.lldb_value.TypeIsPointerType():
+            return self.lldb_value.unsigned
+        else:
+            return self.lldb_value.GetLoadAddress()
+
+    @property
+    def memory(self):
+        return memory_reader(self.process)
+
+    @property
+    def reader(self):
+        return object_reader(self.target)
+
+    def decode(self, addr):
+        """Return a PyObject for the object at addr, e.g. an item of a container."""
+
+        return PyObject.from_value(object_pointer(self.target, addr))
+
+
+class PyInstanceObject(PyObject):
+    """An instance of a user-defined class decoded to its attributes.
+
+    Attributes are read from __slots__ and the instance __dict__, including
+    the values of instance dicts that have not been created yet (CPython >=
+    3.11). Information about the layout of each type is read once.
+    """
+
+    typename = None
+
+    def is_user_instance(self):
+        try:
+            reader = object_reader(self.target)
+            ob_type = reader.type_of(self.address)
+            info = reader.type_info(ob_type)
+            if not info.flags & ObjectReader.Py_TPFLAGS_HEAPTYPE or (
+                reader.builtin_type(ob_type) is not None
+            ):
+                return False
+
+            # C types created by PyType_FromSpec() (e.g. re.Pattern) are heap
+            # types too, but their state is not stored in attributes
+            return bool(
+                info.dictoffset
+                or info.flags & ObjectReader.Py_TPFLAGS_MANAGED_DICT
+                or reader._slots(ob_type)
+            )
+        except Exception:
+            return False
+
+    @property
+    def value(self):
+        reader = object_reader(self.target)
+        addr = self.address
+        attributes = reader.instance_attributes(addr)
+
+        allowed = Budget.take_items(len(attributes))
+        return Instance(
+            addr,
+            reader.type_info(reader.type_of(addr)).name,
+            [
+                (name, PyObject.from_value(object_pointer(self.target, value)))
+                for name, value in attributes[:allowed]
+            ],
+            len(attributes) - allowed,
+        )
+
+
+class PyDecodedObject(PyObject):
+    """An object decoded by a decoder registered with register_decoder()."""
+
+    typename = None
+
+    def __init__(self, lldb_value, decoder):
+        super(PyDecodedObject, self).__init__(lldb_value)
+        self.decoder = decoder
+
+    @property
+    def value(self):
+        return self.decoder(self)
+
+
+class PyImmortalObject(PyObject):
+    """An object with a fixed address and a known value (see immortal_objects())."""
+
+    # both are set per instance, as immortal objects can be of any type
+    typename = None
+    value = None
+
+    def __init__(self, lldb_value, typename, value):
+        super(PyImmortalObject, self).__init__(lldb_value)
+        self.typename = typename
+        self.value = value
+
+
+class PyLongObject(PyObject):
+    typename = "int"
+    cpython_struct = "PyLongObject"
+
+    @property
+    def value(self):
+        """
+
+        The absolute value of a number is equal to:
+
+            SUM(for i=0 through abs(ob_size)-1) ob_digit[i] * 2**(SHIFT*i)
+
+        Negative numbers are represented with ob_size < 0;
+        zero is represented by ob_size == 0.
+
+        where SHIFT can be either:
+            #define PyLong_SHIFT        30
+        or:
+            #define PyLong_SHIFT        15
+
+        """
+
+        long_type = self.target.FindFirstType(self.cpython_struct)
+        digit_type = self.target.FindFirstType("digit")
+
+        shift = 15 if digit_type.size == 2 else 30
+        value = self.lldb_value.Cast(long_type.GetPointerType())
+        size = (
+            value.GetChildMemberWithName("ob_base")
+            .GetChildMemberWithName("ob_size")
+            .signed
+        )
+        if not size:
+            return 0
+
+        # all digits are read at once rather than one by one
+        digits = self.memory.read(
+            value.GetChildMemberWithName("ob_digit").GetLoadAddress(),
+            abs(size) * digit_type.size,
+        )
+        abs_value = sum(
+            int.from_bytes(
+                digits[i * digit_type.size : (i + 1) * digit_type.size],
+                self.memory.byteorder,
+            )
+            << (shift * i)
+            for i in range(0, abs(size))
+        )
+        return abs_value if size > 0 else -abs_value
+
+
+class PyBoolObject(PyObject):
+    typename = "bool"
+
+    @property
+    def value(self):
+        long_type = self.target.FindFirstType("PyLongObject")
+
+        value = self.lldb_value.Cast(long_type.GetPointerType())
+        digits = value.GetChildMemberWithName("ob_digit")
+        return bool(digits.GetChildAtIndex(0).unsigned)
+
+
+class PyFloatObject(PyObject):
+    typename = "float"
+    cpython_struct = "PyFloatObject"
+
+    @property
+    def value(self):
+        float_type = self.target.FindFirstType(self.cpython_struct)
+
+        value = self.lldb_value.Cast(float_type.GetPointerType())
+        fval = value.GetChildMemberWithName("ob_fval")
+        return float(fval.GetValue())
+
+
+class PyBytesObject(PyObject):
+    typename = "bytes"
+    cpython_struct = "PyBytesObject"
+
+    @property
+    def value(self):
+        bytes_type = self.target.FindFirstType(self.cpython_struct)
+
+        value = self.lldb_value.Cast(bytes_type.GetPointerType())
+        size = (
+            value.GetChildMemberWithName("ob_base")
+            .GetChildMemberWithName("ob_size")
+            .unsigned
+        )
+        addr = value.GetChildMemberWithName("ob_sval").GetLoadAddress()
+
+        allowed = Budget.take_bytes(size)
+        rv = self.memory.read(addr, allowed)
+        return rv if allowed == size else TruncatedBytes(rv, size - allowed)
+
+
+class PyUnicodeObject(PyObject):
+    typename = "str"
+    cpython_struct = "PyUnicodeObject"
+
+    U_WCHAR_KIND = 0
+    U_1BYTE_KIND = 1
+    U_2BYTE_KIND = 2
+    U_4BYTE_KIND = 4
+
+    @staticmethod
+    def _get_encoding(kind):
+        if kind == PyUnicodeObject.U_1BYTE_KIND:
+            return "latin-1"
+        elif kind == PyUnicodeObject.U_2BYTE_KIND:
+            return "utf-16"
+        elif kind == PyUnicodeObject.U_4BYTE_KIND:
+            return "utf-32"
+        else:
+            raise ValueError("Unsupported PyUnicodeObject kind: {}".format(kind))
+
+    @staticmethod
+    def _read_string_from_memory(process, addr, length, kind):
+        if not length:
+            return ""
+
+        allowed = Budget.take_bytes(length * kind) // kind
+        rv = memory_reader(process).read(addr, allowed * kind)
+        rv = rv.decode(PyUnicodeObject._get_encoding(kind))
+        return rv if allowed == length else TruncatedStr(rv, length - allowed)
+
+    @property
+    def value(self):
+        ascii_type = self.target.FindFirstType("PyASCIIObject")
+        value = self.lldb_value.Cast(ascii_type.GetPointerType())
+
+        length = value.GetChildMemberWithName("length").unsigned
+        state = value.GetChildMemberWithName("state")
+
+        compact = bool(state.GetChildMemberWithName("compact").unsigned)
+        is_ascii = bool(state.GetChildMemberWithName("ascii").unsigned)
+        kind = state.GetChildMemberWithName("kind").unsigned
+        ready = bool(state.GetChildMemberWithName("ready").unsigned)
+
+        # Reference: PEP 393 and Include/cpython/unicodeobject.h.
+        if is_ascii and compact and ready:
+            # content is stored right after the data structure in memory
+            addr = value.unsigned + ascii_type.size
+        elif compact and ready:
+            # content is stored right after the data structure in memory
+            compact_type = self.target.FindFirstType("PyCompactUnicodeObject")
+
+            value = self.lldb_value.Cast(compact_type.GetPointerType())
+            addr = value.unsigned + compact_type.size
+        elif ready:
+            # legacy string, "ready" (content is stored in the `data.any` field)
+            str_type = self.target.FindFirstType("PyUnicodeObject")
+
+            value = self.lldb_value.Cast(str_type.GetPointerType())
+            addr = (
+                value.GetChildMemberWithName("data")
+                .GetChildMemberWithName("any")
+                .unsigned
+            )
+        else:
+            # legacy string, "not ready" (content is stored in the `wstr` field)
+            str_type = self.target.FindFirstType("PyUnicodeObject")
+            wchar_type = self.target.FindFirstType("wchar_t")
+
+            value = self.lldb_value.Cast(str_type.GetPointerType())
+            addr = (
+                value.GetChildMemberWithName("_base")
+                .GetChildMemberWithName("_base")
+                .GetChildMemberWithName("wstr")
+            ).unsigned
+            length = (
+                value.GetChildMemberWithName("_base")
+                .GetChildMemberWithName("wstr_length")
+                .unsigned
+            )
+            kind = wchar_type.GetByteSize()
+
+        return PyUnicodeObject._read_string_from_memory(
+            self.process, addr, length, kind
+        )
+
+
+class PyNoneObject(PyObject):
+    typename = "NoneType"
+    value = None
+
+
+class _PySequence(object):
+    @property
+    def value(self):
+        value = self.lldb_value.Cast(self.lldb_type.GetPointerType())
+        size = (
+            value.GetChildMemberWithName("ob_base")
+            .GetChildMemberWithName("ob_size")
+            .signed
+        )
+        items = value.GetChildMemberWithName("ob_item")
+
+        allowed = Budget.take_items(size)
+        rv = [
+            PyObject.from_value(items.GetChildAtIndex(i, 0, True))
+            for i in range(allowed)
+        ]
+        if allowed < size:
+            rv.append(Truncated(size - allowed))
+
+        return self.python_type(rv)
+
+
+class PyListObject(_PySequence, PyObject):
+    python_type = list
+    typename = "list"
+    cpython_struct = "PyListObject"
+
+    @property
+    def lldb_type(self):
+        return self.target.FindFirstType(self.cpython_struct)
+
+
+class PyTupleObject(_PySequence, PyObject):
+    python_type = tuple
+    typename = "tuple"
+    cpython_struct = "PyTupleObject"
+
+    @property
+    def lldb_type(self):
+        return self.target.FindFirstType(self.cpython_struct)
+
+
+class _PySetObject(object):
+    cpython_struct = "PySetObject"
+
+    @property
+    def value(self):
+        set_type = self.target.FindFirstType(self.cpython_struct)
+
+        value = self.lldb_value.Cast(set_type.GetPointerType())
+        size = value.GetChildMemberWithName("mask").unsigned + 1
+        used = value.GetChildMemberWithName("used").unsigned
+        table = value.GetChildMemberWithName("table")
+        array = table.Cast(
+            table.type.GetPointeeType().GetArrayType(size).GetPointerType()
+        )
+
+        allowed = Budget.take_items(used)
+        rv = set()
+        for i in range(size):
+            if len(rv) >= allowed:
+                break
+
+            entry = array.GetChildAtIndex(i)
+            key = entry.GetChildMemberWithName("key")
+            hash_ = entry.GetChildMemberWithName("hash").signed
+
+            # filter out 'dummy' and 'unused' slots
+            if hash_ != -1 and (hash_ != 0 or key.unsigned != 0):
+                rv.add(PyObject.from_value(key))
+
+        if allowed < used:
+            # the marker is shown after the decoded items
+            return TruncatedSet(rv, used - allowed, self.typename)
+
+        return rv
+
+
+class PySetObject(_PySetObject, PyObject):
+    typename = "set"
+
+
+class PyFrozenSetObject(_PySetObject, PyObject):
+    typename = "frozenset"
+
+    @property
+    def value(self):
+        rv = super(PyFrozenSetObject, self).value
+        return rv if isinstance(rv, TruncatedSet) else frozenset(rv)
+
+
+class _PyDictObject(object):
+    DICT_KEYS_GENERAL = 0
+    DICT_KEYS_UNICODE = 1
+    DICT_KEYS_SPLIT = 2
+
+    @staticmethod
+    def _get_table_size(ma_keys):
+        dk_log2_size = ma_keys.GetChildMemberWithName("dk_log2_size")
+        if dk_log2_size.IsValid():
+            # CPython version >= 3.11
+            table_size = 1 << dk_log2_size.unsigned
+        else:
+            table_size = ma_keys.GetChildMemberWithName("dk_size").unsigned
+
+        return table_size
+
+    @staticmethod
+    def _get_dictentry_type(target, ma_keys):
+        dk_kind = ma_keys.GetChildMemberWithName("dk_kind")
+        if dk_kind.IsValid():
+            # CPython version >= 3.11
+            kind = dk_kind.unsigned
+        else:
+            kind = _PyDictObject.DICT_KEYS_GENERAL
+
+        if kind == _PyDictObject.DICT_KEYS_GENERAL:
+            return target.FindFirstType("PyDictKeyEntry")
+        else:
+            return target.FindFirstType("PyDictUnicodeEntry")
+
+    @property
+    def value(self):
+        dict_type = self.target.FindFirstType("PyDictObject")
+        used = (
+            self.lldb_value.Cast(dict_type.GetPointerType())
+            .GetChildMemberWithName("ma_used")
+            .unsigned
+        )
+
+        allowed = Budget.take_items(used)
+        rv = self.python_type()
+        for k, v in itertools.islice(self.entries(), allowed):
+            rv[PyObject.from_value(k)] = PyObject.from_value(v)
+        if allowed < used:
+            # the marker is shown after the decoded items
+            return TruncatedDict(
+                rv,
+                used - allowed,
+                None if self.python_type is dict else self.python_type.__name__,
+            )
+
+        return rv
+
+    def entries(self):
+        """Lazily yield (key, value) pairs of LLDB values w/o decoding them."""
+
+        dict_type = self.target.FindFirstType("PyDictObject")
+        object_type = self.target.FindFirstType("PyObject")
+
+        value = self.lldb_value.Cast(dict_type.GetPointerType()).deref
+
+        ma_keys = value.GetChildMemberWithName("ma_keys")
+        num_entries = ma_keys.GetChildMemberWithName("dk_nentries").unsigned
+
+        table_size = _PyDictObject._get_table_size(ma_keys)
+        dictentry_type = _PyDictObject._get_dictentry_type(self.target, ma_keys)
+
+        # hash table effectively stores indexes of entries in the key/value
+        # pairs array; the size of an index varies, so that all possible
+        # array positions can be addressed
+        if table_size < 0xFF:
+            index_size = 1
+        elif table_size < 0xFFFF:
+            index_size = 2
+        elif table_size < 0xFFFFFFF:
+            index_size = 4
+        else:
+            index_size = 8
+        shift = table_size * index_size
+
+        indices = ma_keys.GetChildMemberWithName("dk_indices")
+        if indices.IsValid():
+            # CPython version >= 3.6
+            # entries are stored in an array right after the indexes table
+            addr = lldb.SBAddress(indices.AddressOf().unsigned + shift, self.target)
+            entries = self.target.CreateValueFromAddress(
+                "entries", addr, dictentry_type.GetArrayType(num_entries)
+            )
+        else:
+            # CPython version < 3.6
+            num_entries = table_size
+            entries = ma_keys.GetChildMemberWithName("dk_entries").Cast(
+                dictentry_type.GetArrayType(num_entries)
+            )
+
+        ma_values = value.GetChildMemberWithName("ma_values")
+        if ma_values.unsigned != 0:
+            is_split = True
+            ma_values = ma_values.deref.Cast(
+                object_type.GetPointerType().GetArrayType(num_entries)
+            )
+        else:
+            is_split = False
+
+        for i in range(num_entries):
+            entry = entries.GetChildAtIndex(i)
+            k = entry.GetChildMemberWithName("me_key")
+            v = entry.GetChildMemberWithName("me_value")
+            if k.unsigned != 0 and v.unsigned != 0:
+                # hash table is "combined"; keys and values are stored together
+                yield k, v
+            elif k.unsigned != 0 and is_split:
+                # hash table is "split"; values are stored separately
+                for j in range(i, table_size):
+                    v = ma_values.GetChildAtIndex(j)
+                    if v.unsigned != 0:
+                        yield k, v
+                        break
+
+
+class PyDictObject(_PyDictObject, PyObject):
+    python_type = dict
+    typename = "dict"
+    cpython_struct = "PyDictObject"
+
+
+class Counter(_PyDictObject, PyObject):
+    python_type = collections.Counter
+    typename = "Counter"
+
+
+class OrderedDict(_PyDictObject, PyObject):
+    python_type = collections.OrderedDict
+    typename = "collections.OrderedDict"
+
+
+class Defaultdict(PyObject):
+    typename = "collections.defaultdict"
+    cpython_struct = "defdictobject"
+
+    @property
+    def value(self):
+        dict_type = self.target.FindFirstType("defdictobject")
+        value = self.lldb_value.Cast(dict_type.GetPointerType()).deref
+        # for the time being, let's just convert it to a regular dict,
+        # as we can't properly display the repr of the default_factory
+        # anyway, because in order to do that we would need to execute
+        # code within the context of the inferior process
+        return PyDictObject(value.GetChildMemberWithName("dict").AddressOf()).value
+
+
+class _CollectionsUserObject(object):
+    @property
+    def value(self):
+        # UserDict, UserString, and UserList all have a single instance variable
+        # called "data", which is the collection used for storing the elements
+        data = object_reader(self.target).attribute(self.address, "data")
+        if data is None:
+            return super(_CollectionsUserObject, self).value
+
+        return PyObject.from_value(object_pointer(self.target, data)).value
+
+
+class UserDict(_CollectionsUserObject, PyObject):
+    typename = "UserDict"
+
+
+class UserList(_CollectionsUserObject, PyObject):
+    typename = "UserList"
+
+
+class UserString(_CollectionsUserObject, PyObject):
+    typename = "UserString"
+
+
+class PyByteArrayObject(PyObject):
+    typename = "bytearray"
+    cpython_struct = "PyByteArrayObject"
+
+    @property
+    def value(self):
+        reader = self.reader
+        if not reader.layout.has("PyByteArrayObject.ob_start"):
+            return super(PyByteArrayObject, self).value
+
+        addr, size = reader.bytearray_buffer(self.address)
+        allowed = Budget.take_bytes(size)
+        rv = self.memory.read(addr, allowed) if allowed else b""
+        if allowed == size:
+            return bytearray(rv)
+
+        return Buffer(self.typename, self.address, TruncatedBytes(rv, size - allowed))
+
+
+class PyMemoryViewObject(PyObject):
+    typename = "memoryview"
+    cpython_struct = "PyMemoryViewObject"
+
+    @property
+    def value(self):
+        reader = self.reader
+        if not reader.layout.has("PyMemoryViewObject.view.buf"):
+            return super(PyMemoryViewObject, self).value
+
+        try:
+            buffer = reader.memoryview_buffer(self.address)
+        except ValueError:
+            # e.g. a view of a multi-dimensional array with strides
+            return super(PyMemoryViewObject, self).value
+        if buffer is None:
+            return Buffer(self.typename, self.address, None)
+
+        size, ranges = buffer
+        allowed = remaining = Budget.take_bytes(size)
+        requests = []
+        for addr, length in ranges:
+            if remaining <= 0:
+                break
+
+            requests.append((addr, min(length, remaining)))
+            remaining -= length
+
+        rv = b"".join(self.memory.read_many(requests))
+        if allowed < size:
+            rv = TruncatedBytes(rv, size - allowed)
+
+        return Buffer(self.typename, self.address, rv)
+
+
+class PyArrayObject(PyObject):
+    typename = "array.array"
+    cpython_struct = "arrayobject"
+
+    @property
+    def value(self):
+        # the array module might be built w/o debugging symbols
+        reader = self.reader
+        if not reader.layout.has("arrayobject.ob_descr"):
+            return super(PyArrayObject, self).value
+
+        typecode, itemsize, addr, count = reader.array_buffer(self.address)
+        allowed = Budget.take_items(count)
+        data = self.memory.read(addr, allowed * itemsize) if allowed else b""
+        return Array(
+            typecode, reader.unpack_array(typecode, itemsize, data), count - allowed
+        )
+
+
+class PyDequeObject(PyObject):
+    typename = "collections.deque"
+    cpython_struct = "dequeobject"
+
+    @property
+    def value(self):
+        reader = self.reader
+        if not reader.layout.has("block.data"):
+            return super(PyDequeObject, self).value
+
+        addr = self.address
+        size = reader._int(addr, "PyVarObject.ob_size", signed=True)
+        allowed = Budget.take_items(size)
+        rv = [self.decode(item) for item in reader.deque_items(addr, 0, allowed)]
+        if allowed < size:
+            rv.append(Truncated(size - allowed))
+
+        maxlen = -1
+        if reader.layout.has("dequeobject.maxlen"):
+            maxlen = reader._int(addr, "dequeobject.maxlen", signed=True)
+
+        return collections.deque(rv, maxlen if maxlen >= 0 else None)
+
+
+class PyCodeAddressRange(object):
+    """A class for parsing the line number table implemented in PEP 626.
+
+    The format of the line number table is not part of CPython's API and may
+    change without warning. The PEP has a dedicated section
+    (https://www.python.org/dev/peps/pep-0626/#out-of-process-debuggers-and-profilers),
+    which says that tools, that can't use C-API, should just copy the implementation
+    of functions required for parsing this table. We do just that below but also
+    translate C to Python.
+    """
+
+    def __init__(self, co_linetable, co_firstlineno):
+        """Implements PyLineTable_InitAddressRange from codeobject.c."""
+
+        self.lo_next = 0
+        self.co_linetable = co_linetable
+        self.computed_line = co_firstlineno
+        self.ar_start = -1
+        self.ar_end = 0
+        self.ar_line = -1
+
+    def next_address_range(self):
+        """Implements PyLineTable_NextAddressRange from codeobject.c."""
+
+        if self._at_end():
+            return False
+
+        self._advance()
+        while self.ar_start == self.ar_end:
+            self._advance()
+
+        return True
+
+    def prev_address_range(self):
+        """Implements PyLineTable_PreviousAddressRange from codeobject.c."""
+
+        if self.ar_start <= 0:
+            return False
+
+        self._retreat()
+        while self.ar_start == self.ar_end:
+            self._retreat()
+
+        return True
+
+    def _at_end(self):
+        return self.lo_next >= len(self.co_linetable)
+
+    def _advance(self):
+        self.ar_start = self.ar_end
+        delta = struct.unpack("B", self.co_linetable[self.lo_next : self.lo_next + 1])[
+            0
+        ]
+        self.ar_end += delta
+        ldelta = struct.unpack(
+            "b", self.co_linetable[self.lo_next + 1 : self.lo_next + 2]
+        )[0]
+        self.lo_next += 2
+
+        if ldelta == -128:
+            self.ar_line = -1
+        else:
+            self.computed_line += ldelta
+            self.ar_line = self.computed_line
+
+    def _retreat(self):
+        ldelta = struct.unpack("b", self.co_linetable[self.lo_next - 1 : self.lo_next])[
+            0
+        ]
+        if ldelta == -128:
+            ldelta = 0
+
+        self.computed_line -= ldelta
+        self.lo_next -= 2
+        self.ar_end = self.ar_start
+        self.ar_start -= struct.unpack(
+            "B", self.co_linetable[self.lo_next - 2 : self.lo_next - 1]
+        )[0]
+        ldelta = struct.unpack("b", self.co_linetable[self.lo_next - 1 : self.lo_next])[
+            0
+        ]
+        if ldelta == -128:
+            self.ar_line = -1
+        else:
+            self.ar_line = self.computed_line
+
+
+class PyCodeObject(PyObject):
+    typename = "code"
+
+    def addr2line(self, f_lineno, f_lasti):
+        addr_range_type = self.target.FindFirstType("PyCodeAddressRange")
+        if addr_range_type.IsValid():
+            # CPython >= 3.10 (PEP 626)
+            if f_lineno:
+                return f_lineno
+            else:
+                return self._from_co_linetable(f_lasti * 2)
+        else:
+            # CPython < 3.10
+            return self._from_co_lnotab(f_lasti) + f_lineno
+
+    def _from_co_linetable(self, address):
+        co_linetable = PyObject.from_value(self.child("co_linetable")).value
+        co_firstlineno = self.child("co_firstlineno").signed
+
+        return PyCodeObject.line_from_co_linetable(
+            co_linetable, co_firstlineno, address
+        )
+
+    def _from_co_lnotab(self, address):
+        co_lnotab = PyObject.from_value(self.child("co_lnotab")).value
+
+        return PyCodeObject.line_from_co_lnotab(co_lnotab, address)
+
+    @staticmethod
+    def line_from_co_linetable(co_linetable, co_firstlineno, address):
+        """Translated code from Objects/codeobject.c:PyCode_Addr2Line."""
+
+        if address < 0:
+            return co_firstlineno
+
+        bounds = PyCodeAddressRange(co_linetable, co_firstlineno)
+        while bounds.ar_end <= address:
+            if not bounds.next_address_range():
+                return -1
+        while bounds.ar_start > address:
+            if not bounds.prev_address_range():
+                return -1
+
+        return bounds.ar_line
+
+    @staticmethod
+    def line_from_co_lnotab(co_lnotab, address):
+        """Translated pseudocode from Objects/lnotab_notes.txt."""
+
+        assert len(co_lnotab) % 2 == 0
+
+        lineno = addr = 0
+        for addr_incr, line_incr in zip(co_lnotab[::2], co_lnotab[1::2]):
+            addr_incr = (
+                ord(addr_incr) if isinstance(addr_incr, (bytes, str)) else addr_incr
+            )
+            line_incr = (
+                ord(line_incr) if isinstance(line_incr, (bytes, str)) else line_incr
+            )
+
+            addr += addr_incr
+            if addr > address:
+                return lineno
+            if line_incr >= 0x80:
+                line_incr -= 0x100
+            lineno += line_incr
+
+        return lineno
+
+
+class PyFrameObject(PyObject):
+    typename = "frame"
+
+    def __init__(self, lldb_value):
+        super(PyFrameObject, self).__init__(lldb_value)
+        self.co = PyCodeObject(self.child("f_code"))
+
+    @classmethod
+    def _from_frame_no_walk(cls, frame):
+        """
+        Extract PyFrameObject object from current frame w/o stack walking.
+        """
+        f = frame.variables["f"]
+        if f and f[0].error.Success():
+            return cls(f[0])
+        else:
+            return None
+
+    @classmethod
+    def _from_frame_heuristic(cls, frame):
+        """Extract PyFrameObject object from current frame using heuristic.
+
+        When CPython is compiled with aggressive optimizations, the location
+        of PyFrameObject variable f can sometimes be lost. Usually, we still
+        can figure it out by analyzing the state of CPU registers. This is not
+        very reliable, because we basically try to cast the value stored in
+        each register to (PyFrameObject*) and see if it produces a valid
+        PyObject object.
+
+        This becomes especially ugly when there is more than one PyFrameObject*
+        in CPU registers at the same time. In this case we are looking for the
+        frame with a parent, that we have not seen yet.
+        """
+
+        target = frame.GetThread().GetProcess().GetTarget()
+        object_type = target.FindFirstType("PyObject")
+
+        # in CPython >= 3.9, PyFrameObject is an opaque type that does not
+        # expose its own structure. Unfortunately, we can't make any function
+        # calls here, so we resort to using the internal counterpart instead
+        public_frame_type = target.FindFirstType("PyFrameObject")
+        internal_frame_type = target.FindFirstType("_frame")
+        frame_type = (
+            public_frame_type if public_frame_type.members else internal_frame_type
+        )
+
+        process = target.GetProcess()
+        found_frames = []
+        for register in general_purpose_registers(frame):
+            sbvalue = frame.register[register]
+
+            # ignore unavailable registers or null pointers
+            if not sbvalue or not sbvalue.unsigned:
+                continue
+            # and values that don't even point to readable memory
+            if not is_readable(process, sbvalue.unsigned, object_type.GetByteSize()):
+                continue
+            # and things that are not valid PyFrameObjects
+            pyobject = PyObject(sbvalue.Cast(object_type.GetPointerType()))
+            if pyobject.typename != PyFrameObject.typename:
+                continue
+
+            found_frames.append(
+                PyFrameObject(sbvalue.Cast(frame_type.GetPointerType()))
+            )
+
+        # sometimes the parent _PyEval_EvalFrameDefault frame contains two
+        # PyFrameObject's - the one that is currently being executed and its
+        # parent, so we need to filter out the latter
+        found_frames_addresses = [frame.lldb_value.unsigned for frame in found_frames]
+        eligible_frames = [
+            frame
+            for frame in found_frames
+            if frame.child("f_back").unsigned not in found_frames_addresses
+        ]
+
+        if eligible_frames:
+            return eligible_frames[0]
+
+    @classmethod
+    def from_frame(cls, frame):
+        if frame is None:
+            return None
+
+        # check if we are in a potential function
+        if frame.name not in ("_PyEval_EvalFrameDefault", "PyEval_EvalFrameEx"):
+            return None
+
+        # try different methods of getting PyFrameObject before giving up
+        methods = (
+            # normally, we just need to check the location of `f` variable in the current frame
+            cls._from_frame_no_walk,
+            # but sometimes, it's only available in the parent frame
+            lambda frame: frame.parent and cls._from_frame_no_walk(frame.parent),
+            # when aggressive optimizations are enabled, we need to check the CPU registers
+            cls._from_frame_heuristic,
+            # and the registers in the parent frame as well
+            lambda frame: frame.parent and cls._from_frame_heuristic(frame.parent),
+        )
+        for method in methods:
+            result = method(frame)
+            if result is not None:
+                return result
+
+    @classmethod
+    def iter_pystack(cls, thread):
+        """Lazily yield Python frames starting from the selected frame of a thread.
+
+        The call stack is walked from the most recent frame to the oldest one,
+        so that callers can stop early once they have seen enough frames.
+        """
+
+        frame = thread.GetSelectedFrame()
+        while frame:
+            pyframe = cls.from_frame(frame)
+            if pyframe is not None:
+                yield pyframe
+
+            frame = frame.get_parent_frame()
+
+    @classmethod
+    def get_pystack(cls, thread, skip=0, limit=None):
+        """Return a list of Python frames of a thread (most recent call first).
+
+        Args:
+            skip: the number of the most recent frames to omit
+            limit: the maximum number of frames to return (or None to return
+                   all of them). The call stack is not walked any further
+                   once this many frames have been found
+        """
+
+        stop = None if limit is None else skip + limit
+        return list(itertools.islice(cls.iter_pystack(thread), skip, stop))
+
+    @classmethod
+    def from_thread(cls, thread):
+        """Return the most recent Python frame of a thread (or None).
+
+        Only the native frames up to the most recent Python frame are
+        inspected, regardless of the frame that is currently selected.
+        """
+
+        frame = thread.GetFrameAtIndex(0)
+        while frame:
+            pyframe = cls.from_frame(frame)
+            if pyframe is not None:
+                return pyframe
+
+            frame = frame.get_parent_frame()
+
+    @property
+    def location_key(self):
+        """A key identifying the code location this frame is executing.
+
+        Frames with equal keys are formatted identically, which allows for
+        decoding the code object and reading the source file only once per
+        distinct location (e.g. in a deep recursion).
+        """
+
+        return (
+            self.co.lldb_value.unsigned,
+            self.child("f_lineno").signed,
+            self.child("f_lasti").signed,
+        )
+
+    @property
+    def filename(self):
+        return PyObject.from_value(self.co.child("co_filename")).value
+
+    @property
+    def line_number(self):
+        f_lineno = self.child("f_lineno").signed
+        f_lasti = self.child("f_lasti").signed
+
+        return self.co.addr2line(f_lineno, f_lasti)
+
+    @property
+    def line(self):
+        try:
+            encoding = source_file_encoding(self.filename)
+            return source_file_lines(
+                self.filename, self.line_number, self.line_number + 1, encoding=encoding
+            )[0]
+        except (IOError, IndexError):
+            return "<source code is not available>"
+
+    @property
+    def co_name(self):
+        return PyObject.from_value(self.co.child("co_name")).value
+
+    def namespace(self, name):
+        """Return the LLDB value of f_locals, f_globals or f_builtins of the frame."""
+
+        mapping = self.child(name)
+        if not mapping.IsValid():
+            # CPython >= 3.11
+            mapping = self.child("f_frame").GetChildMemberWithName(name)
+
+        return mapping
+
+    def fast_locals(self):
+        """Return a list of (name, LLDB value) of variables stored in the frame.
+
+        Those are the local variables (including arguments), as well as cell
+        and free variables, whose values are read from the cell objects. The
+        values are not decoded; the value is None if a variable is not set.
+        """
+
+        varnames, cellvars, freevars = (
+            [name.value for name in PyTupleObject(self.co.child(field)).value]
+            for field in ("co_varnames", "co_cellvars", "co_freevars")
+        )
+        names = varnames + cellvars + freevars
+
+        # the whole array is read at once rather than pointer by pointer
+        target = self.target
+        memory = self.memory
+        pointers = memory.read_pointers(
+            self.child("f_localsplus").GetLoadAddress(), len(names)
+        )
+        ob_ref_offset = _find_member(target, "PyCellObject.ob_ref")[0] // 8
+
+        rv = []
+        for i, (name, addr) in enumerate(zip(names, pointers)):
+            if addr and i >= len(varnames):
+                # cell and free variables are stored in cell objects
+                addr = memory.read_pointer(addr + ob_ref_offset)
+            rv.append((name, object_pointer(target, addr) if addr else None))
+
+        return rv
+
+    def to_pythonlike_string(self):
+        lineno = self.line_number
+        return 'File "{filename}", line {lineno}, in {co_name}'.format(
+            filename=self.filename,
+            co_name=self.co_name,
+            lineno=lineno,
+        )
+
+
+class ObjectReader(object):
+    """Decode CPython objects from raw memory.
+
+    Only a MemoryReader and a Layout are needed, i.e. LLDB is not involved in
+    accessing the fields of CPython structs at all. This is what makes it
+    possible to process large numbers of objects in reasonable time.
+    """
+
+    TypeInfo = collections.namedtuple(
+        "TypeInfo", "name basicsize itemsize flags dictoffset", defaults=(0, 0)
+    )
+    # built-in types, whose instances store pointers to other objects in arrays
+    CONTAINER_TYPES = ("list", "tuple", "dict", "set", "frozenset", "cell", "frame")
+    # built-in types, whose instances need special handling
+    BUILTIN_TYPES = CONTAINER_TYPES + (
+        "str",
+        "bytes",
+        "module",
+        "type",
+        "function",
+        "collections.deque",
+    )
+    # CPython >= 3.11: the instance dict is stored before the object header
+    Py_TPFLAGS_MANAGED_DICT = 1 << 4
+    # CPython >= 3.13: the values of the instance dict are stored after the object
+    Py_TPFLAGS_INLINE_VALUES = 1 << 2
+    Py_TPFLAGS_HEAPTYPE = 1 << 9
+    Py_TPFLAGS_HAVE_GC = 1 << 14
+    # PyMemberDef types of object pointers (e.g. __slots__)
+    T_OBJECT = 6
+    T_OBJECT_EX = 16
+    # special values of dk_indices entries
+    DKIX_EMPTY = -1
+    # PyMemoryViewObject.flags of memoryviews, whose buffer has been released,
+    # is C-contiguous and uses suboffsets (PIL-style arrays), respectively
+    MEMORYVIEW_RELEASED = 1
+    MEMORYVIEW_C = 2
+    MEMORYVIEW_PIL = 16
+    # (compression rounds, finalization rounds) of SipHash-1-3 and SipHash-2-4,
+    # which are used for hashing str objects by CPython >= 3.11 and < 3.11
+    SIPHASH_ROUNDS = ((1, 3), (2, 4))
+
+    # the (k0, k1) keys of SipHash read from _Py_HashSecret, if known
+    hash_secret = None
+    # type object address -> decoder of the types registered by C symbol names
+    registered_types = {}
+
+    def __init__(self, memory, layout):
+        self.memory = memory
+        self.layout = layout
+
+        # type object address -> TypeInfo
+        self._type_cache = {}
+        # type object address -> name of the built-in base type or None
+        self._builtin_cache = {}
+        # type object address -> {member name: offset}
+        self._members_cache = {}
+        # type object address -> [(member name, offset)] along the MRO
+        self._slots_cache = {}
+        # type object address -> addresses of keys shared by the instance dicts
+        self._shared_keys_cache = {}
+        # str object address -> value
+        self._names_cache = {}
+        # SipHash rounds used by the process; False if not detected yet
+        self._siphash_rounds = False
+        # type object address -> decoder registered by register_decoder() or None
+        self._decoder_cache = {}
+        # type object address -> callable creating the PyObject that decodes
+        # the instances of the type (see PyObject.from_value())
+        self._factory_cache = {}
+
+    @classmethod
+    def from_target(cls, target):
+        reader = cls(memory_reader(target.GetProcess()), Layout.from_target(target))
+
+        secret = data_symbol_addresses(target, "_Py_HashSecret")
+        if secret:
+            # the first 16 bytes are the keys of SipHash (always little-endian)
+            data = reader.memory.read(secret[0], 16)
+            reader.hash_secret = (
+                int.from_bytes(data[:8], "little"),
+                int.from_bytes(data[8:], "little"),
+            )
+        reader.registered_types = registered_type_addresses(target)
+
+        return reader
+
+    def type_info(self, addr):
+        """Return the name, the instance sizes and the layout flags of a type object."""
+
+        info = self._type_cache.get(addr)
+        if info is None:
+            info = self._type_cache[addr] = self.TypeInfo(
+                self.memory.read_cstring(self._pointer(addr, "PyTypeObject.tp_name")),
+                self._int(addr, "PyTypeObject.tp_basicsize", signed=True),
+                self._int(addr, "PyTypeObject.tp_itemsize", signed=True),
+                self._int(addr, "PyTypeObject.tp_flags"),
+                self._int(addr, "PyTypeObject.tp_dictoffset", signed=True),
+            )
+
+        return info
+
+    def type_of(self, addr):
+        return self._pointer(addr, "PyObject.ob_type")
+
+    def decoder(self, ob_type):
+        """Return the decoder registered for a type object or None.
+
+        Types registered by C symbol names are looked up by address; others
+        are matched by tp_name once per type object.
+        """
+
+        if not _decoders:
+            return None
+
+        try:
+            return self._decoder_cache[ob_type]
+        except KeyError:
+            pass
+
+        decoder = self.registered_types.get(ob_type)
+        if decoder is None:
+            decoder = _decoders.get(self.type_info(ob_type).name)
+
+        self._decoder_cache[ob_type] = decoder
+        return decoder
+
+    def builtin_type(self, ob_type):
+        """Return the name of the built-in type from BUILTIN_TYPES ob_type derives from.
+
+        Returns None if the type is not a (subclass of a) known built-in type.
+        """
+
+        if ob_type in self._builtin_cache:
+            return self._builtin_cache[ob_type]
+
+        builtin = None
+        base = ob_type
+        while base:
+            name = self.type_info(base).name
+            if name in self.BUILTIN_TYPES:
+                builtin = name
+                break
+
+            base = self._pointer(base, "PyTypeObject.tp_base")
+
+        self._builtin_cache[ob_type] = builtin
+        return builtin
+
+    def container_type(self, ob_type):
+        """Return the name of the built-in container type ob_type derives from.
+
+        Returns None if the type is not a (subclass of a) known container type.
+        """
+
+        builtin = self.builtin_type(ob_type)
+        return builtin if builtin in self.CONTAINER_TYPES else None
+
+    def slots(self, addr, ob_type):
+        """Return the arrays of object pointers stored in a container object.
+
+        Each array is described by a tuple of (address, count, stride). An
+        empty list is returned for objects of unsupported types.
+        """
+
+        container = self.container_type(ob_type)
+        pointer_size = self.layout.pointer_size
+        if container == "list":
+            return [
+                (
+                    self._pointer(addr, "PyListObject.ob_item"),
+                    self._int(addr, "PyVarObject.ob_size", signed=True),
+                    pointer_size,
+                )
+            ]
+        elif container == "tuple":
+            return [
+                (
+                    addr + self.layout.offset("PyTupleObject.ob_item"),
+                    self._int(addr, "PyVarObject.ob_size", signed=True),
+                    pointer_size,
+                )
+            ]
+        elif container == "frame":
+            # local variables, cells, free variables and the value stack
+            return [
+                (
+                    addr + self.layout.offset("_frame.f_localsplus"),
+                    self._frame_slots_count(addr),
+                    pointer_size,
+                )
+            ]
+        elif container == "cell":
+            return [(addr + self.layout.offset("PyCellObject.ob_ref"), 1, pointer_size)]
+        elif container in ("set", "frozenset"):
+            # the key is the first field of setentry
+            return [
+                (
+                    self._pointer(addr, "PySetObject.table"),
+                    self._int(addr, "PySetObject.mask") + 1,
+                    self.layout.sizes["setentry"],
+                )
+            ]
+        elif container == "dict":
+            return self._dict_slots(addr)
+        else:
+            return []
+
+    def _frame_slots_count(self, frame):
+        """Return the number of slots of f_localsplus that hold live references.
+
+        Those are the local, cell and free variables, as well as the items on
+        the value stack, if its depth is known (i.e. the frame is not being
+        executed). Slots above the top of the stack may hold stale pointers.
+        """
+
+        size = self._int(frame, "PyVarObject.ob_size", signed=True)
+        if not self.layout.has("PyCodeObject.co_nlocals"):
+            return size
+
+        code = self._pointer(frame, "_frame.f_code")
+        count = self._int(code, "PyCodeObject.co_nlocals", signed=True)
+        for field in ("PyCodeObject.co_cellvars", "PyCodeObject.co_freevars"):
+            names = self._pointer(code, field)
+            if names:
+                count += self._int(names, "PyVarObject.ob_size", signed=True)
+
+        if self.layout.has("_frame.f_stackdepth"):
+            # -1 while the frame is being executed
+            count += max(self._int(frame, "_frame.f_stackdepth", signed=True), 0)
+        elif self.layout.has("_frame.f_stacktop"):
+            # NULL while the frame is being executed
+            top = self._pointer(frame, "_frame.f_stacktop")
+            if top:
+                bottom = self._pointer(frame, "_frame.f_valuestack")
+                count += (top - bottom) // self.layout.pointer_size
+
+        return max(min(count, size), 0)
+
+    def _read_slots(self, ob_type, start, count, stride):
+        """Read an array of pointers returned by slots().
+
+        The keys of 'dummy' set entries, which replace deleted keys, are not
+        references, so they are returned as NULL pointers.
+        """
+
+        if self.container_type(ob_type) not in ("set", "frozenset") or (
+            not self.layout.has("setentry.hash")
+        ):
+            return self.memory.read_pointers(start, count, stride)
+
+        if count <= 0:
+            return []
+
+        data = self.memory.read(start, count * stride)
+        return [
+            0
+            if self._unpack(data, "setentry.hash", base, signed=True) == -1
+            else self._unpack(data, "setentry.key", base)
+            for base in range(0, count * stride, stride)
+        ]
+
+    def _dict_keys(self, keys):
+        """Return a tuple of (table size, size of indexes in bytes, entry type)."""
+
+        if self.layout.has("PyDictKeysObject.dk_log2_size"):
+            # CPython >= 3.11
+            size = 1 << self._int(keys, "PyDictKeysObject.dk_log2_size")
+            index_bytes = 1 << self._int(keys, "PyDictKeysObject.dk_log2_index_bytes")
+            kind = self._int(keys, "PyDictKeysObject.dk_kind")
+        else:
+            size = self._int(keys, "PyDictKeysObject.dk_size")
+            if size <= 0xFF:
+                index_bytes = size
+            elif size <= 0xFFFF:
+                index_bytes = size * 2
+            elif size <= 0xFFFFFFFF:
+                index_bytes = size * 4
+            else:
+                index_bytes = size * 8
+            kind = _PyDictObject.DICT_KEYS_GENERAL
+
+        entry = (
+            "PyDictKeyEntry"
+            if kind == _PyDictObject.DICT_KEYS_GENERAL
+            else "PyDictUnicodeEntry"
+        )
+        return size, index_bytes, entry
+
+    def _dict_slots(self, addr):
+        keys = self._pointer(addr, "PyDictObject.ma_keys")
+        values = self._pointer(addr, "PyDictObject.ma_values")
+        count = self._int(keys, "PyDictKeysObject.dk_nentries", signed=True)
+
+        # entries are stored in an array right after the indexes table
+        _, index_bytes, entry = self._dict_keys(keys)
+        entries = keys + self.layout.offset("PyDictKeysObject.dk_indices") + index_bytes
+        stride = self.layout.sizes[entry]
+
+        slots = [(entries + self.layout.offset(entry + ".me_key"), count, stride)]
+        if values:
+            # the dict is "split": values are stored in a separate array
+            if self.layout.has("PyDictValues.values"):
+                values += self.layout.offset("PyDictValues.values")
+            slots.append((values, count, self.layout.pointer_size))
+        else:
+            slots.append(
+                (entries + self.layout.offset(entry + ".me_value"), count, stride)
+            )
+
+        return slots
+
+    def sizeof(self, addr):
+        """Return the size of an object in bytes, similarly to sys.getsizeof().
+
+        Memory allocated separately is taken into account for the built-in
+        types, e.g. the capacity of lists or the hash tables of dicts and sets.
+        """
+
+        ob_type = self.type_of(addr)
+        info = self.type_info(ob_type)
+        builtin = self.builtin_type(ob_type)
+        pointer_size = self.layout.pointer_size
+
+        size = info.basicsize
+        if info.itemsize:
+            ob_size = self._int(addr, "PyVarObject.ob_size", signed=True)
+            size += abs(ob_size) * info.itemsize
+
+        if builtin == "list":
+            size += (
+                self._int(addr, "PyListObject.allocated", signed=True) * pointer_size
+            )
+        elif builtin == "dict":
+            size += self._dict_tables_size(addr)
+        elif builtin in ("set", "frozenset"):
+            table = self._pointer(addr, "PySetObject.table")
+            if table != addr + self.layout.offset("PySetObject.smalltable"):
+                size += (self._int(addr, "PySetObject.mask") + 1) * self.layout.sizes[
+                    "setentry"
+                ]
+        elif builtin == "str":
+            size = self._str_size(addr, info.basicsize)
+
+        flags = self._int(ob_type, "PyTypeObject.tp_flags")
+        if flags & self.Py_TPFLAGS_HAVE_GC:
+            size += self.layout.sizes["PyGC_Head"]
+        if self.layout.has("PyDictKeysObject.dk_log2_size") and (
+            flags & self.Py_TPFLAGS_MANAGED_DICT
+        ):
+            # CPython >= 3.11: pointers to the dict and the values
+            size += 2 * pointer_size
+
+        return size
+
+    def _dict_tables_size(self, addr):
+        # see _PyDict_SizeOf() for details
+        keys = self._pointer(addr, "PyDictObject.ma_keys")
+        size, index_bytes, entry = self._dict_keys(keys)
+        usable = (size << 1) // 3
+
+        rv = 0
+        if self._pointer(addr, "PyDictObject.ma_values"):
+            rv += usable * self.layout.pointer_size
+        # keys shared by instances of the same class are not accounted for
+        if self._int(keys, "PyDictKeysObject.dk_refcnt", signed=True) == 1:
+            rv += (
+                self.layout.sizes["PyDictKeysObject"]
+                + index_bytes
+                + usable * self.layout.sizes[entry]
+            )
+
+        return rv
+
+    def _str_size(self, addr, basicsize):
+        # see unicode_sizeof() for details
+        length = self._int(addr, "PyASCIIObject.length", signed=True)
+        state = self._int(addr, "PyASCIIObject.state")
+        kind = self._bits(state, "PyASCIIObject.state.kind")
+
+        if self._bits(state, "PyASCIIObject.state.compact"):
+            if self._bits(state, "PyASCIIObject.state.ascii"):
+                size = self.layout.sizes["PyASCIIObject"]
+            else:
+                size = self.layout.sizes["PyCompactUnicodeObject"]
+            return size + (length + 1) * kind
+        elif self._pointer(addr, "PyUnicodeObject.data"):
+            return basicsize + (length + 1) * kind
+        else:
+            return basicsize
+
+    def deep_sizeof(self, root, max_depth=None, max_nodes=None):
+        """Return a tuple of (total size, number of objects) reachable from root.
+
+        Objects are traversed breadth-first following the same references as
+        graph() does, and objects referenced more than once are only counted
+        once. Modules, types and functions are neither counted nor followed,
+        as they are typically shared by the whole program. The number of
+        objects skipped because of max_nodes is returned as the third item.
+        """
+
+        skipped = total = count = 0
+        seen = {root}
+        queue = collections.deque([(root, 0)])
+        while queue:
+            addr, depth = queue.popleft()
+            try:
+                ob_type = self.type_of(addr)
+                if addr != root and self.builtin_type(ob_type) in (
+                    "module",
+                    "type",
+                    "function",
+                ):
+                    continue
+
+                total += self.sizeof(addr)
+                count += 1
+                if max_depth is not None and depth >= max_depth:
+                    continue
+
+                referents = [r for r, _ in self._labeled_referents(addr, ob_type)[0]]
+            except MemoryReadError:
+                continue
+
+            for referent in referents:
+                if referent in seen:
+                    continue
+                if max_nodes is not None and len(seen) >= max_nodes:
+                    skipped += 1
+                    continue
+
+                seen.add(referent)
+                queue.append((referent, depth + 1))
+
+        return total, count, skipped
+
+    def scan(self, regions, ob_types, chunk_size=SCAN_CHUNK_SIZE):
+        """Find objects of the given types by scanning memory regions.
+
+        Regions (see memory_regions()) are read in large chunks, which are
+        searched for pointer-aligned words equal to the address of one of the
+        type objects. Each candidate is validated using the bytes that have
+        already been read (the reference count must be sane and the object
+        must fit into the region), so no additional reads are needed. Yields
+        tuples of (address, ob_type) in the order of addresses.
+        """
+
+        for addr, ob_type, _, _, _ in self._scan(regions, ob_types, chunk_size):
+            yield addr, ob_type
+
+    def _scan(self, regions, ob_types, chunk_size):
+        """Implementation of scan() that also yields the buffer each object was
+        found in (see MemoryReader.buffer()), the offset of the object in that
+        buffer and the offset of the end of the memory read."""
+
+        pointer_size = self.layout.pointer_size
+        type_offset = self.layout.offset("PyObject.ob_type")
+        # chunks overlap, so that headers of all candidates can be validated
+        overlap = 64
+        needles = [
+            (t.to_bytes(pointer_size, self.memory.byteorder), t) for t in ob_types
+        ]
+
+        for region in regions:
+            for chunk_start in range(region.start, region.end, chunk_size):
+                chunk_end = min(chunk_start + chunk_size, region.end)
+                data_start = max(chunk_start - overlap, region.start)
+                size = min(chunk_end + overlap, region.end) - data_start
+                try:
+                    data, base = self.memory.buffer(data_start, size)
+                except MemoryReadError:
+                    continue
+
+                # offsets in data corresponding to data_start and chunk_end
+                base -= data_start
+                data_end = base + data_start + size
+                candidates = []
+                for needle, ob_type in needles:
+                    pos = data.find(needle, base + chunk_start + type_offset, data_end)
+                    while pos != -1 and pos - type_offset < base + chunk_end:
+                        addr = pos - type_offset - base
+                        if addr % pointer_size == 0 and self._plausible(
+                            data, addr + base, ob_type, region.end - addr
+                        ):
+                            candidates.append((addr, ob_type))
+                        pos = data.find(needle, pos + 1, data_end)
+
+                for addr, ob_type in sorted(candidates):
+                    yield addr, ob_type, data, addr + base, data_end
+
+    def _plausible(self, data, offset, ob_type, max_size):
+        """Check if the bytes at data[offset:] look like an object of ob_type."""
+
+        # immortal objects have large, but still 32-bit reference counts, so
+        # this rejects candidates that are preceded by pointers
+        refcnt = self._unpack(data, "PyObject.ob_refcnt", offset, signed=True)
+        if not 0 < refcnt <= 1 << 32:
+            return False
+
+        info = self.type_info(ob_type)
+        builtin = self.builtin_type(ob_type)
+        if builtin == "str":
+            length = self._unpack(data, "PyASCIIObject.length", offset, signed=True)
+            state = self._unpack(data, "PyASCIIObject.state", offset)
+            kind = self._bits(state, "PyASCIIObject.state.kind")
+            compact = self._bits(state, "PyASCIIObject.state.compact")
+            if kind not in (1, 2, 4) or length < 0:
+                return False
+            if compact:
+                return self.layout.sizes["PyASCIIObject"] + length * kind <= max_size
+        elif info.itemsize:
+            ob_size = self._unpack(data, "PyVarObject.ob_size", offset, signed=True)
+            return info.basicsize + abs(ob_size) * info.itemsize <= max_size
+
+        return info.basicsize <= max_size
+
+    def grep(self, regions, ob_types, pattern, flags=0, chunk_size=SCAN_CHUNK_SIZE):
+        """Find str and bytes objects with values matching a regular expression.
+
+        Objects are found by scan(). The raw payload of each candidate is first
+        searched for the literal part of the pattern (see regex_literal()), so
+        that only a small fraction of objects have to be decoded and matched
+        against the regular expression. Bytes objects are matched against the
+        pattern encoded to UTF-8. Yields tuples of (address, value, match).
+        """
+
+        regexes = {"str": re.compile(pattern, flags)}
+        try:
+            regexes["bytes"] = re.compile(pattern.encode("utf-8"), flags)
+        except re.error:
+            # e.g. \N{...} and \U are only supported in str patterns
+            pass
+        if regexes["str"].flags & (re.IGNORECASE | re.VERBOSE):
+            # the literal can't be searched for as is
+            needles = None
+        else:
+            needles = self._needles(regex_literal(pattern))
+
+        scan = self._scan(regions, ob_types, chunk_size)
+        for addr, ob_type, data, offset, data_end in scan:
+            builtin = self.builtin_type(ob_type)
+            if builtin not in regexes:
+                continue
+
+            try:
+                value = self._grep_payload(
+                    data, offset, data_end, addr, builtin, needles
+                )
+            except (MemoryReadError, UnicodeDecodeError, ValueError):
+                continue
+            if value is None:
+                continue
+
+            match = regexes[builtin].search(value)
+            if match is not None:
+                yield addr, value, match
+
+    def _needles(self, literal):
+        """Encode a literal the way it is stored in payloads of each kind."""
+
+        if not literal:
+            return None
+
+        suffix = "-le" if self.memory.byteorder == "little" else "-be"
+        needles = {"str": literal, "bytes": literal.encode("utf-8")}
+        for kind, encoding in ((1, "latin-1"), (2, "utf-16"), (4, "utf-32")):
+            try:
+                needles[kind] = literal.encode(
+                    encoding if kind == 1 else encoding + suffix
+                )
+            except UnicodeEncodeError:
+                # e.g. a latin-1 string can't contain this literal
+                needles[kind] = None
+            else:
+                if kind == 2 and len(needles[kind]) != 2 * len(literal):
+                    # surrogate pairs are never stored in 2-byte strings
+                    needles[kind] = None
+
+        return needles
+
+    def _grep_payload(self, data, offset, data_end, addr, builtin, needles):
+        """Return the decoded value of a candidate for grep(), or None if the
+        raw payload does not contain the literal part of the pattern."""
+
+        if builtin == "bytes":
+            size = self._unpack(data, "PyVarObject.ob_size", offset, signed=True)
+            start = offset + self.layout.offset("PyBytesObject.ob_sval")
+            kind, encoding = "bytes", None
+        else:
+            state = self._unpack(data, "PyASCIIObject.state", offset)
+            kind = self._bits(state, "PyASCIIObject.state.kind")
+            if not self._bits(state, "PyASCIIObject.state.compact"):
+                # the payload of a legacy string is allocated separately
+                value = self.read_str(addr)
+                if needles and needles["str"] not in value:
+                    return None
+                return value
+
+            if self._bits(state, "PyASCIIObject.state.ascii"):
+                start = offset + self.layout.sizes["PyASCIIObject"]
+            else:
+                start = offset + self.layout.sizes["PyCompactUnicodeObject"]
+            size = kind * self._unpack(
+                data, "PyASCIIObject.length", offset, signed=True
+            )
+            encoding = PyUnicodeObject._get_encoding(kind)
+
+        if needles:
+            needle = needles[kind]
+            if needle is None:
+                return None
+
+        end = start + size
+        if end <= data_end:
+            if needles and data.find(needle, start, end) == -1:
+                return None
+            payload = data[start:end]
+        else:
+            # the payload crosses the chunk boundary
+            payload = self.memory.read(addr + start - offset, size)
+            if needles and needle not in payload:
+                return None
+
+        return payload if encoding is None else payload.decode(encoding)
+
+    def referents(self, addr, ob_type):
+        """Return the addresses of objects referenced by a container object."""
+
+        referents = []
+        for start, count, stride in self.slots(addr, ob_type):
+            referents.extend(
+                p for p in self._read_slots(ob_type, start, count, stride) if p
+            )
+
+        return referents
+
+    def describe_slot(self, addr, ob_type, slot, index):
+        """Return a human readable description of a position in a container."""
+
+        container = self.container_type(ob_type)
+        if container in ("list", "tuple"):
+            return "[{}]".format(index)
+        elif container == "dict":
+            if slot == 0:
+                return "key"
+
+            start, _, stride = self.slots(addr, ob_type)[0]
+            key = self.memory.read_pointer(start + index * stride)
+            if key and self.type_info(self.type_of(key)).name == "str":
+                return "value of key {!r}".format(self.read_str(key))
+            return "value"
+        elif container in ("set", "frozenset"):
+            return "item"
+        elif container == "cell":
+            return "cell_contents"
+        elif container == "frame":
+            return "f_localsplus[{}]".format(index)
+
+    def dict_pointer(self, addr, ob_type):
+        """Return the address of the instance __dict__ of an object or 0."""
+
+        info = self.type_info(ob_type)
+        dictoffset = info.dictoffset
+        if not dictoffset:
+            return 0
+
+        if info.flags & self.Py_TPFLAGS_MANAGED_DICT and dictoffset < 0:
+            pointer = self.memory.read_pointer(addr - 3 * self.layout.pointer_size)
+            if self.layout.has("PyDictOrValues.values") and pointer & 1:
+                # CPython 3.12: a tagged pointer to values, see PyDictOrValues
+                return 0
+
+            return pointer
+        elif dictoffset < 0:
+            # the dict is stored after the variable-size part of the object.
+            # See _PyObject_GetDictPtr() for details
+            ob_size = self._int(addr, "PyVarObject.ob_size", signed=True)
+            size = info.basicsize + abs(ob_size) * info.itemsize
+            size = -(-size // self.layout.pointer_size) * self.layout.pointer_size
+            dictoffset += size
+
+        return self.memory.read_pointer(addr + dictoffset)
+
+    def instance_dict_items(self, addr, ob_type):
+        """Return (key, value) address pairs of the instance __dict__ of an object.
+
+        In CPython >= 3.11, the dict of an instance is only created on demand:
+        until then, the values are stored in an array, and the keys are shared
+        by all instances of the class (see ht_cached_keys).
+        """
+
+        instance_dict = self.dict_pointer(addr, ob_type)
+        if instance_dict:
+            return list(self.dict_items(instance_dict))
+
+        values = self._inline_values(addr, ob_type)
+        if not values:
+            return []
+
+        keys = self._shared_keys(ob_type)
+        return [
+            (key, value)
+            for key, value in zip(keys, self.memory.read_pointers(values, len(keys)))
+            if key and value
+        ]
+
+    def _inline_values(self, addr, ob_type):
+        """Return the address of the values array of an instance dict or 0."""
+
+        if not self.layout.has("PyHeapTypeObject.ht_cached_keys"):
+            return 0
+
+        flags = self.type_info(ob_type).flags
+        if not flags & self.Py_TPFLAGS_MANAGED_DICT:
+            return 0
+
+        if self.layout.has("PyDictValues.valid"):
+            # CPython >= 3.13: the values are stored right after the object
+            if not flags & self.Py_TPFLAGS_INLINE_VALUES:
+                return 0
+
+            values = addr + self.type_info(ob_type).basicsize
+            if not self._int(values, "PyDictValues.valid"):
+                return 0
+        elif self.layout.has("PyDictOrValues.values"):
+            # CPython 3.12: a tagged pointer stored before the object header
+            pointer = self.memory.read_pointer(addr - 3 * self.layout.pointer_size)
+            if not pointer & 1:
+                return 0
+
+            values = pointer - 1
+        else:
+            # CPython 3.11: a pointer stored before the object header
+            values = self.memory.read_pointer(addr - 4 * self.layout.pointer_size)
+            if not values:
+                return 0
+
+        if self.layout.has("PyDictValues.values"):
+            values += self.layout.offset("PyDictValues.values")
+
+        return values
+
+    def _shared_keys(self, ob_type):
+        """Return the addresses of the keys shared by the instance dicts of a type."""
+
+        keys = self._shared_keys_cache.get(ob_type)
+        if keys is None:
+            cached_keys = self._pointer(ob_type, "PyHeapTypeObject.ht_cached_keys")
+            if cached_keys:
+                _, index_bytes, entry = self._dict_keys(cached_keys)
+                keys = self.memory.read_pointers(
+                    cached_keys
+                    + self.layout.offset("PyDictKeysObject.dk_indices")
+                    + index_bytes
+                    + self.layout.offset(entry + ".me_key"),
+                    self._int(cached_keys, "PyDictKeysObject.dk_nentries", signed=True),
+                    self.layout.sizes[entry],
+                )
+            else:
+                keys = []
+
+            self._shared_keys_cache[ob_type] = keys
+
+        return keys
+
+    def dict_items(self, addr):
+        """Yield (key, value) pointer pairs of a dict w/o decoding them."""
+
+        (keys, count, stride), (values, _, values_stride) = self._dict_slots(addr)
+        for key, value in zip(
+            self.memory.read_pointers(keys, count, stride),
+            self.memory.read_pointers(values, count, values_stride),
+        ):
+            if key and value:
+                yield key, value
+
+    def dict_keys(self, addr):
+        """Yield the addresses of keys of a dict w/o decoding keys or values.
+
+        Values are only checked for NULL, as entries of split dicts can be
+        deleted from one instance while the keys are shared with others.
+        """
+
+        for key, _ in self.dict_items(addr):
+            yield key
+
+    def dict_lookup(self, addr, key):
+        """Return the address of the value of a str or int key in a dict or None.
+
+        The hash table is probed the same way lookdict() does it, so only a few
+        entries are read regardless of the size of the dict. If the hash of
+        the key can't be computed (e.g. the hash secret of the process is not
+        known), all entries are compared with the key instead.
+        """
+
+        if not isinstance(key, (str, int)):
+            raise ValueError("Only str and int keys are supported")
+
+        keys = self._pointer(addr, "PyDictObject.ma_keys")
+        (entries, count, stride), (values, _, values_stride) = self._dict_slots(addr)
+        key_hash = self.hash_of(key, entries, count, stride)
+        if key_hash is None:
+            for k, v in self.dict_items(addr):
+                if self._key_equals(k, key):
+                    return v
+
+            return None
+
+        size, index_bytes, entry = self._dict_keys(keys)
+        index_size = index_bytes // size
+        indices = keys + self.layout.offset("PyDictKeysObject.dk_indices")
+        me_hash = entry + ".me_hash"
+        me_hash_offset = (
+            self.layout.offset(me_hash) - self.layout.offset(entry + ".me_key")
+            if self.layout.has(me_hash)
+            else None
+        )
+
+        # see the comment on the probing sequence in Objects/dictobject.c
+        mask = size - 1
+        perturb = key_hash & ((1 << (8 * self.layout.pointer_size)) - 1)
+        i = perturb & mask
+        # once perturb is 0, every slot is visited in size iterations. The
+        # number of iterations is limited in case the table is corrupted
+        for _ in range(size + 8 * self.layout.pointer_size):
+            ix = self.memory.read_int(indices + i * index_size, index_size, signed=True)
+            if ix == self.DKIX_EMPTY:
+                return None
+            elif 0 <= ix < count and (
+                me_hash_offset is None
+                or self.memory.read_int(
+                    entries + ix * stride + me_hash_offset,
+                    self.layout.pointer_size,
+                    signed=True,
+                )
+                == key_hash
+            ):
+                k = self.memory.read_pointer(entries + ix * stride)
+                if k and self._key_equals(k, key):
+                    return self.memory.read_pointer(values + ix * values_stride) or None
+
+            perturb >>= 5
+            i = (i * 5 + perturb + 1) & mask
+
+        return None
+
+    def hash_of(self, key, entries=None, count=0, stride=0):
+        """Return the hash of a str or int key as computed by the process or None.
+
+        The hash of str objects depends on the hash secret of the process and
+        the hash algorithm. The latter is detected by comparing the hashes
+        cached in str keys from the given array of dict entries.
+        """
+
+        if isinstance(key, int):
+            # see _PyHASH_MODULUS in Include/pyhash.h
+            bits = 61 if self.layout.pointer_size == 8 else 31
+            value = abs(key) % ((1 << bits) - 1) * (-1 if key < 0 else 1)
+            # -1 is reserved for errors
+            return -2 if value == -1 else value
+        elif not key:
+            return 0
+
+        if self._siphash_rounds is False:
+            self._siphash_rounds = self._detect_siphash_rounds(
+                self.memory.read_pointers(entries, min(count, 8), stride)
+                if entries
+                else []
+            )
+        if not self._siphash_rounds:
+            return None
+
+        return self._str_hash(key, self._siphash_rounds)
+
+    def _str_hash(self, string, rounds):
+        bits = 8 * self.layout.pointer_size
+        value = siphash(
+            self.hash_secret[0], self.hash_secret[1], self._str_payload(string), *rounds
+        ) & ((1 << bits) - 1)
+        if value >= 1 << (bits - 1):
+            value -= 1 << bits
+
+        return -2 if value == -1 else value
+
+    def _detect_siphash_rounds(self, candidates):
+        """Return the SipHash rounds matching the cached hashes of str objects.
+
+        Returns None if the rounds can't be detected (e.g. the process uses a
+        different hash algorithm), and False if none of the candidates is a
+        str object with a cached hash, so that detection is retried later.
+        """
+
+        if self.hash_secret is None or not self.layout.has("PyASCIIObject.hash"):
+            return None
+
+        for addr in candidates:
+            if not addr or self.builtin_type(self.type_of(addr)) != "str":
+                continue
+
+            cached = self._int(addr, "PyASCIIObject.hash", signed=True)
+            if cached in (-1, 0):
+                # not computed yet or an empty string
+                continue
+
+            string = self.read_str(addr)
+            for rounds in self.SIPHASH_ROUNDS:
+                if self._str_hash(string, rounds) == cached:
+                    return rounds
+
+            return None
+
+        return False
+
+    def _str_payload(self, string):
+        """Encode a string the way it is stored in the compact representation."""
+
+        maxchar = max(map(ord, string)) if string else 0
+        if maxchar < 0x100:
+            return string.encode("latin-1")
+
+        suffix = "-le" if self.memory.byteorder == "little" else "-be"
+        encoding = "utf-16" if maxchar < 0x10000 else "utf-32"
+        return string.encode(encoding + suffix, "surrogatepass")
+
+    def _key_equals(self, addr, key):
+        builtin = self.builtin_type(self.type_of(addr))
+        if isinstance(key, str):
+            return builtin == "str" and self.read_str(addr) == key
+        elif isinstance(key, int):
+            return self.type_info(self.type_of(addr)).name == "int" and (
+                self.read_int(addr) == key
+            )
+        else:
+            raise ValueError("Only str and int keys are supported")
+
+    def attribute(self, addr, name):
+        """Return the address of an attribute of an object or None if not found.
+
+        Attributes are looked up in __slots__ of the type, in the instance
+        __dict__ and in the dicts of the types in the MRO (or in the module
+        dict for modules). Descriptors (e.g. properties) are not evaluated.
+        """
+
+        ob_type = self.type_of(addr)
+        builtin = self.builtin_type(ob_type)
+        if builtin == "module" and self.layout.has("PyModuleObject.md_dict"):
+            md_dict = self._pointer(addr, "PyModuleObject.md_dict")
+            return self.dict_lookup(md_dict, name) if md_dict else None
+        elif builtin == "type":
+            return self._mro_lookup(addr, name)
+
+        for member, offset in self._slots(ob_type):
+            if member == name:
+                # the slot is NULL if the attribute is not set
+                return self.memory.read_pointer(addr + offset) or None
+
+        instance_dict = self.dict_pointer(addr, ob_type)
+        if instance_dict:
+            value = self.dict_lookup(instance_dict, name)
+        else:
+            value = next(
+                (
+                    value
+                    for key, value in self.instance_dict_items(addr, ob_type)
+                    if self._key_name(key) == name
+                ),
+                None,
+            )
+        if value is not None:
+            return value
+
+        return self._mro_lookup(ob_type, name)
+
+    def _slots(self, ob_type):
+        """Return (name, offset) pairs of members (e.g. __slots__) along the MRO."""
+
+        slots = self._slots_cache.get(ob_type)
+        if slots is None:
+            slots = self._slots_cache[ob_type] = [
+                member
+                for base in self._mro(ob_type)
+                for member in sorted(
+                    self._members(base).items(), key=lambda member: member[1]
+                )
+            ]
+
+        return slots
+
+    def _key_name(self, addr):
+        """Return the value of a str key or None for keys of other types."""
+
+        if addr not in self._names_cache:
+            self._names_cache[addr] = (
+                self.read_str(addr)
+                if self.builtin_type(self.type_of(addr)) == "str"
+                else None
+            )
+
+        return self._names_cache[addr]
+
+    def _mro(self, ob_type):
+        mro = self._pointer(ob_type, "PyTypeObject.tp_mro")
+        if not mro:
+            return [ob_type]
+
+        return self.memory.read_pointers(
+            mro + self.layout.offset("PyTupleObject.ob_item"),
+            self._int(mro, "PyVarObject.ob_size", signed=True),
+        )
+
+    def _mro_lookup(self, ob_type, name):
+        for base in self._mro(ob_type):
+            # tp_dict of static types is NULL in CPython >= 3.12
+            tp_dict = self._pointer(base, "PyTypeObject.tp_dict")
+            value = self.dict_lookup(tp_dict, name) if tp_dict else None
+            if value is not None:
+                return value
+
+        return None
+
+    def _members(self, ob_type):
+        """Return a dict of name -> offset of the object members (e.g. __slots__)."""
+
+        members = self._members_cache.get(ob_type)
+        if members is not None:
+            return members
+
+        members = self._members_cache[ob_type] = {}
+        addr = self._pointer(ob_type, "PyTypeObject.tp_members")
+        if not addr or not self.layout.has("PyMemberDef.name"):
+            return members
+
+        while True:
+            name = self._pointer(addr, "PyMemberDef.name")
+            if not name:
+                break
+
+            if self._int(addr, "PyMemberDef.type") in (
+                self.T_OBJECT,
+                self.T_OBJECT_EX,
+            ):
+                members[self.memory.read_cstring(name)] = self._int(
+                    addr, "PyMemberDef.offset", signed=True
+                )
+            addr += self.layout.sizes["PyMemberDef"]
+
+        return members
+
+    def item(self, addr, key):
+        """Return the address of an item of a list, a tuple or a dict.
+
+        Lists and tuples are indexed by ints (negative indexes are supported),
+        while dicts can have str or int keys. Raises ValueError if the item
+        does not exist.
+        """
+
+        ob_type = self.type_of(addr)
+        container = self.container_type(ob_type)
+        if container in ("list", "tuple"):
+            if not isinstance(key, int):
+                raise ValueError("{} indices must be integers".format(container))
+
+            start, count, stride = self.slots(addr, ob_type)[0]
+            index = key + count if key < 0 else key
+            if not 0 <= index < count:
+                raise ValueError("{} index {} out of range".format(container, key))
+
+            return self.memory.read_pointer(start + index * stride)
+        elif container == "dict":
+            value = self.dict_lookup(addr, key)
+            if value is None:
+                raise ValueError("Key {!r} not found".format(key))
+
+            return value
+        else:
+            raise ValueError(
+                "Object of type {} is not subscriptable".format(
+                    self.type_info(ob_type).name
+                )
+            )
+
+    def item_slice(self, addr, start=None, stop=None, step=None):
+        """Return the addresses of a slice of items of a list or a tuple.
+
+        Only the pointers of the items within the slice are read.
+        """
+
+        ob_type = self.type_of(addr)
+        container = self.container_type(ob_type)
+        if container not in ("list", "tuple"):
+            raise ValueError(
+                "Object of type {} can't be sliced".format(self.type_info(ob_type).name)
+            )
+
+        base, count, stride = self.slots(addr, ob_type)[0]
+        indexes = range(*slice(start, stop, step).indices(count))
+        if not indexes:
+            return []
+
+        first = min(indexes[0], indexes[-1])
+        pointers = self.memory.read_pointers(
+            base + first * stride, len(indexes), abs(indexes.step) * stride
+        )
+        return pointers if indexes.step > 0 else pointers[::-1]
+
+    def dict_page(self, addr, offset, limit):
+        """Return (key, value) address pairs of a range of entries of a dict.
+
+        If no entries were deleted from the dict, only the rows of the entries
+        table within the range are read. Otherwise, the key and value pointers
+        preceding the range are read (but not decoded) to skip the holes.
+        """
+
+        read_rows, count = self._dict_table(addr)
+        if self.layout.has("PyDictObject.ma_used") and (
+            self._int(addr, "PyDictObject.ma_used", signed=True) == count
+        ):
+            # there are no holes, so rows can be indexed directly
+            return read_rows(offset, max(0, min(limit, count - offset)))
+
+        return self._page(read_rows, count, offset, limit)
+
+    def dict_rows(self, addr, start, limit):
+        """Return up to limit tuples of (row, (key, value)) of the entries of a
+        dict, starting at the given row of the entries table.
+
+        Unlike dict_page(), this allows for resuming the iteration after the
+        row of the last entry returned w/o reading the preceding rows again.
+        """
+
+        read_rows, count = self._dict_table(addr)
+        return list(
+            itertools.islice(self._table_rows(read_rows, count, start, limit), limit)
+        )
+
+    def _dict_table(self, addr):
+        """Return a function reading rows of the entries table of a dict, and
+        the number of rows. Rows of deleted entries are None."""
+
+        (keys, count, stride), (values, _, values_stride) = self._dict_slots(addr)
+
+        def read_rows(start, size):
+            return [
+                (k, v) if k and v else None
+                for k, v in zip(
+                    self.memory.read_pointers(keys + start * stride, size, stride),
+                    self.memory.read_pointers(
+                        values + start * values_stride, size, values_stride
+                    ),
+                )
+            ]
+
+        return read_rows, count
+
+    def set_page(self, addr, offset, limit):
+        """Return the addresses of a range of items of a set.
+
+        The hash table of a set has holes, so the rows preceding the range
+        are read (but not decoded) to skip them.
+        """
+
+        return self._page(*self._set_table(addr), offset=offset, limit=limit)
+
+    def set_rows(self, addr, start, limit):
+        """Return up to limit tuples of (row, address) of the items of a set,
+        starting at the given row of the hash table (see dict_rows())."""
+
+        read_rows, count = self._set_table(addr)
+        return list(
+            itertools.islice(self._table_rows(read_rows, count, start, limit), limit)
+        )
+
+    def _set_table(self, addr):
+        """Return a function reading rows of the hash table of a set, and the
+        number of rows. Empty rows and rows of deleted items are None."""
+
+        table = self._pointer(addr, "PySetObject.table")
+        count = self._int(addr, "PySetObject.mask") + 1
+        stride = self.layout.sizes["setentry"]
+
+        def read_rows(start, size):
+            data = self.memory.read(table + start * stride, size * stride)
+            rows = []
+            for base in range(0, size * stride, stride):
+                key = self._unpack(data, "setentry.key", base)
+                # the hash of 'dummy' entries, which replace deleted keys, is -1
+                deleted = self._unpack(data, "setentry.hash", base, signed=True) == -1
+                rows.append(key if key and not deleted else None)
+
+            return rows
+
+        return read_rows, count
+
+    def deque_items(self, addr, start=0, count=None):
+        """Return the addresses of a range of items of a collections.deque.
+
+        Items are stored in a linked list of fixed-size blocks, so the blocks
+        preceding the range are walked, but their items are not read.
+        """
+
+        size = self._int(addr, "PyVarObject.ob_size", signed=True)
+        count = size - start if count is None else min(count, size - start)
+        if count <= 0:
+            return []
+
+        data, data_size = self.layout.fields["block.data"]
+        block_length = data_size // self.layout.pointer_size
+        position = self._int(addr, "dequeobject.leftindex", signed=True) + start
+        block = self._pointer(addr, "dequeobject.leftblock")
+        for _ in range(position // block_length):
+            block = self._pointer(block, "block.rightlink")
+
+        # the link to the next block follows the items, so both are read at once
+        linked = self.layout.offset("block.rightlink") == data + data_size
+
+        rv = []
+        index = position % block_length
+        while len(rv) < count:
+            chunk = min(block_length - index, count - len(rv))
+            more = len(rv) + chunk < count
+            pointers = self.memory.read_pointers(
+                block + data + index * self.layout.pointer_size,
+                chunk + (more and linked),
+            )
+            if more and linked:
+                block = pointers.pop()
+            elif more:
+                block = self._pointer(block, "block.rightlink")
+
+            rv.extend(pointers)
+            index = 0
+
+        return rv
+
+    def instance_attributes(self, addr):
+        """Return (name, address) pairs of attributes stored in an object.
+
+        Those are the members defined by __slots__ along the MRO, followed
+        by the items of the instance __dict__ with str keys.
+        """
+
+        ob_type = self.type_of(addr)
+        rv = []
+        for name, offset in self._slots(ob_type):
+            value = self.memory.read_pointer(addr + offset)
+            if value:
+                rv.append((name, value))
+
+        for key, value in self.instance_dict_items(addr, ob_type):
+            name = self._key_name(key)
+            if name is not None:
+                rv.append((name, value))
+
+        return rv
+
+    def _page(self, read_rows, count, offset, limit):
+        """Return at most limit rows of a table after skipping offset rows.
+
+        Holes (None) are not counted.
+        """
+
+        return [
+            row
+            for _, row in itertools.islice(
+                self._table_rows(read_rows, count), offset, offset + limit
+            )
+        ]
+
+    @staticmethod
+    def _table_rows(read_rows, count, start=0, chunk_size=4096):
+        """Lazily yield tuples of (index, row) of the rows of a table, except
+        for holes (None), starting at the given index.
+
+        The table is read in chunks of rows as the rows are consumed.
+        """
+
+        for chunk_start in range(start, count, chunk_size):
+            rows = read_rows(chunk_start, min(chunk_size, count - chunk_start))
+            for index, row in enumerate(rows, chunk_start):
+                if row is not None:
+                    yield index, row
+
+    def graph(self, root, max_depth, max_nodes, max_referents=None):
+        """Traverse the graph of objects reachable from root breadth-first.
+
+        Yields tuples of ("node", address, type name, depth) and ("edge",
+        source address, target address, label) in the order the objects are
+        visited. Each object is read once. Referents are the items of the
+        containers supported by slots() and instance dicts; at most
+        max_referents container slots are read per object, and no new objects are
+        visited once max_nodes of them have been found. The last tuple is
+        ("skipped", number of edges skipped because of these limits).
+        """
+
+        skipped = 0
+        seen = {root}
+        queue = collections.deque([(root, 0)])
+        while queue:
+            addr, depth = queue.popleft()
+            try:
+                ob_type = self.type_of(addr)
+                yield "node", addr, self.type_info(ob_type).name, depth
+            except MemoryReadError:
+                yield "node", addr, "<unreadable>", depth
+                continue
+
+            if depth >= max_depth:
+                continue
+
+            try:
+                referents, truncated = self._labeled_referents(
+                    addr, ob_type, max_referents
+                )
+            except MemoryReadError:
+                continue
+
+            skipped += truncated
+            for referent, label in referents:
+                if referent not in seen:
+                    if len(seen) >= max_nodes:
+                        skipped += 1
+                        continue
+
+                    seen.add(referent)
+                    queue.append((referent, depth + 1))
+
+                if callable(label):
+                    try:
+                        label = label()
+                    except MemoryReadError:
+                        label = ""
+                yield "edge", addr, referent, label
+
+        yield "skipped", skipped
+
+    def _labeled_referents(self, addr, ob_type, limit=None):
+        """Return a list of (referent, label) and the number of slots skipped
+        because of the limit."""
+
+        referents = []
+        skipped = 0
+        remaining = limit
+        for slot, (start, count, stride) in enumerate(self.slots(addr, ob_type)):
+            if remaining is not None:
+                if count > remaining:
+                    skipped += count - remaining
+                    count = remaining
+                remaining -= count
+
+            for index, pointer in enumerate(
+                self._read_slots(ob_type, start, count, stride)
+            ):
+                if pointer:
+                    # describing a slot may require additional reads, so
+                    # that's only done for edges that are actually emitted
+                    referents.append(
+                        (
+                            pointer,
+                            functools.partial(
+                                self.describe_slot, addr, ob_type, slot, index
+                            ),
+                        )
+                    )
+
+        dict_addr = self.dict_pointer(addr, ob_type)
+        if dict_addr:
+            referents.append((dict_addr, "__dict__"))
+
+        return referents, skipped
+
+    def read_bytes(self, addr):
+        size = self._int(addr, "PyVarObject.ob_size", signed=True)
+        return self.memory.read(
+            addr + self.layout.offset("PyBytesObject.ob_sval"), size
+        )
+
+    def bytearray_buffer(self, addr):
+        """Return (address, size) of the payload of a bytearray."""
+
+        return (
+            self._pointer(addr, "PyByteArrayObject.ob_start"),
+            self._int(addr, "PyVarObject.ob_size", signed=True),
+        )
+
+    def memoryview_buffer(self, addr):
+        """Return the size of the memory exposed by a memoryview and the
+        (address, size) ranges of memory holding it in order.
+
+        The memory of C-contiguous views is a single range; views with one
+        dimension can be strided (e.g. a slice with a step), so each item is
+        a separate range, and the ranges are generated lazily. Returns None
+        if the buffer has been released; raises ValueError for other views.
+        """
+
+        flags = self._int(addr, "PyMemoryViewObject.flags")
+        if flags & self.MEMORYVIEW_RELEASED:
+            return None
+
+        buf = self._pointer(addr, "PyMemoryViewObject.view.buf")
+        size = self._int(addr, "PyMemoryViewObject.view.len", signed=True)
+        if flags & self.MEMORYVIEW_C:
+            return size, [(buf, size)]
+
+        if (
+            not self.layout.has("PyMemoryViewObject.view.strides")
+            or flags & self.MEMORYVIEW_PIL
+            or self._int(addr, "PyMemoryViewObject.view.ndim", signed=True) != 1
+        ):
+            raise ValueError("Only contiguous or one-dimensional views are supported")
+
+        itemsize = self._int(addr, "PyMemoryViewObject.view.itemsize", signed=True)
+        count = self.memory.read_int(
+            self._pointer(addr, "PyMemoryViewObject.view.shape"),
+            self.layout.pointer_size,
+            signed=True,
+        )
+        stride = self.memory.read_int(
+            self._pointer(addr, "PyMemoryViewObject.view.strides"),
+            self.layout.pointer_size,
+            signed=True,
+        )
+        return size, ((buf + i * stride, itemsize) for i in range(count))
+
+    def array_buffer(self, addr):
+        """Return (typecode, itemsize, address, count) of the items of an array.array."""
+
+        descr = self._pointer(addr, "arrayobject.ob_descr")
+        return (
+            chr(self._int(descr, "arraydescr.typecode")),
+            self._int(descr, "arraydescr.itemsize", signed=True),
+            self._pointer(addr, "arrayobject.ob_item"),
+            self._int(addr, "PyVarObject.ob_size", signed=True),
+        )
+
+    def unpack_array(self, typecode, itemsize, data):
+        """Decode the raw items of an array.array to a list of numbers or a str."""
+
+        little = self.memory.byteorder == "little"
+        if typecode in "uw":
+            # wchar_t or Py_UCS4
+            encoding = "utf-16" if itemsize == 2 else "utf-32"
+            # lone surrogates can be stored in arrays, but not encoded to UTF-8
+            return data.decode(encoding + ("-le" if little else "-be"), "surrogatepass")
+
+        if typecode in "fd":
+            code = "f" if itemsize == 4 else "d"
+        else:
+            code = {1: "b", 2: "h", 4: "i", 8: "q"}[itemsize]
+            if typecode.isupper():
+                code = code.upper()
+
+        count = len(data) // itemsize
+        return list(
+            struct.unpack("{}{}{}".format("<" if little else ">", count, code), data)
+        )
+
+    def read_int(self, addr):
+        if self.layout.has("PyLongObject.long_value.lv_tag"):
+            # CPython >= 3.12: the number of digits and the sign are packed
+            tag = self._int(addr, "PyLongObject.long_value.lv_tag")
+            count, sign = tag >> 3, 1 - (tag & 3)
+            digits = "PyLongObject.long_value.ob_digit"
+        else:
+            size = self._int(addr, "PyVarObject.ob_size", signed=True)
+            count, sign = abs(size), (size > 0) - (size < 0)
+            digits = "PyLongObject.ob_digit"
+
+        offset, digit_size = self.layout.fields[digits]
+        shift = 30 if digit_size == 4 else 15
+        data = self.memory.read(addr + offset, count * digit_size)
+
+        value = 0
+        for i in reversed(range(count)):
+            digit = data[i * digit_size : (i + 1) * digit_size]
+            value = (value << shift) | int.from_bytes(digit, self.memory.byteorder)
+
+        return sign * value
+
+    def read_str(self, addr):
+        length = self._int(addr, "PyASCIIObject.length", signed=True)
+
+        state = self._int(addr, "PyASCIIObject.state")
+        kind = self._bits(state, "PyASCIIObject.state.kind")
+        compact = self._bits(state, "PyASCIIObject.state.compact")
+        is_ascii = self._bits(state, "PyASCIIObject.state.ascii")
+
+        # see PyUnicodeObject.value for the details on string layouts. Legacy
+        # strings that are "not ready" are not supported
+        if is_ascii and compact:
+            data = addr + self.layout.sizes["PyASCIIObject"]
+        elif compact:
+            data = addr + self.layout.sizes["PyCompactUnicodeObject"]
+        else:
+            data = self._pointer(addr, "PyUnicodeObject.data")
+
+        if not length:
+            return ""
+
+        return self.memory.read(data, length * kind).decode(
+            PyUnicodeObject._get_encoding(kind)
+        )
+
+    def _pointer(self, addr, field):
+        return self.memory.read_pointer(addr + self.layout.offset(field))
+
+    def _unpack(self, data, field, base=0, signed=False):
+        """Decode an integer field of a struct located at data[base:]."""
+
+        offset, size = self.layout.fields[field]
+        return int.from_bytes(
+            data[base + offset : base + offset + size],
+            self.memory.byteorder,
+            signed=signed,
+        )
+
+    def _int(self, addr, field, signed=False):
+        offset, size = self.layout.fields[field]
+        return self.memory.read_int(addr + offset, size, signed=signed)
+
+    def _bits(self, value, bitfield):
+        offset, size = self.layout.bits[bitfield]
+        return (value >> offset) & ((1 << size) - 1)
+
+
+class PyStackReader(ObjectReader):
+    """Decode Python call stacks of all threads from raw memory.
+
+    Unlike PyFrameObject, which relies on LLDB for unwinding native call
+    stacks and for accessing the fields of CPython structs, this class only
+    needs a MemoryReader and a Layout. The thread states are found by walking
+    the list of interpreters in _PyRuntime, so no native frames are analyzed
+    at all. This allows for using the very same logic in LLDB as well as for
+    reading the memory of a live process or a core file directly.
+    """
+
+    def __init__(self, memory, layout, runtime_addr):
+        super(PyStackReader, self).__init__(memory, layout)
+        self.runtime_addr = runtime_addr
+
+        # code object address -> (co_name, co_filename, co_firstlineno, line table)
+        self._code_cache = {}
+
+    @classmethod
+    def from_target(cls, target):
+        symbols = target.FindSymbols("_PyRuntime")
+        if not symbols.GetSize():
+            raise ValueError("Failed to find _PyRuntime (symbols might be missing!)")
+
+        runtime_addr = (
+            symbols.GetContextAtIndex(0)
+            .GetSymbol()
+            .GetStartAddress()
+            .GetLoadAddress(target)
+        )
+        return cls(
+            memory_reader(target.GetProcess()), Layout.from_target(target), runtime_addr
+        )
+
+    @classmethod
+    def from_memory(cls, memory, layout):
+        runtime_addr = find_symbol_address(memory, "_PyRuntime")
+        if runtime_addr is None:
+            raise ValueError("Failed to find _PyRuntime in the mapped files")
+
+        return cls(memory, layout, runtime_addr)
+
+    def thread_states(self):
+        """Yield the addresses of PyThreadState structs of all interpreters."""
+
+        interp = self._pointer(self.runtime_addr, "_PyRuntimeState.interpreters.head")
+        while interp:
+            tstate = self._pointer(interp, "PyInterpreterState.tstate_head")
+            while tstate:
+                yield tstate
+
+                tstate = self._pointer(tstate, "PyThreadState.next")
+            interp = self._pointer(interp, "PyInterpreterState.next")
+
+    def modules(self):
+        """Return the address of the sys.modules dict of the main interpreter."""
+
+        if self.layout.has("_PyRuntimeState.interpreters.main"):
+            interp = self._pointer(
+                self.runtime_addr, "_PyRuntimeState.interpreters.main"
+            )
+        else:
+            # the main interpreter is the last one in the list
+            interp = self._pointer(
+                self.runtime_addr, "_PyRuntimeState.interpreters.head"
+            )
+            while self._pointer(interp, "PyInterpreterState.next"):
+                interp = self._pointer(interp, "PyInterpreterState.next")
+
+        for field in (
+            "PyInterpreterState.modules",
+            "PyInterpreterState.imports.modules",
+        ):
+            if self.layout.has(field):
+                return self._pointer(interp, field)
+
+        raise ValueError("Failed to find sys.modules (symbols might be missing!)")
+
+    def thread_id(self, tstate):
+        return self._int(tstate, "PyThreadState.thread_id")
+
+    def current_frame(self, tstate):
+        return self._pointer(tstate, "PyThreadState.frame")
+
+    def frames(self, frame):
+        """Yield the addresses of frames, starting from the given one."""
+
+        while frame:
+            yield frame
+
+            frame = self._pointer(frame, "_frame.f_back")
+
+    def frame_location(self, frame):
+        """Return a tuple of (filename, line number, function name) of a frame."""
+
+        code = self._pointer(frame, "_frame.f_code")
+        info = self._code_cache.get(code)
+        if info is None:
+            if self.layout.has("PyCodeObject.co_linetable"):
+                line_table = self.read_bytes(
+                    self._pointer(code, "PyCodeObject.co_linetable")
+                )
+            else:
+                line_table = self.read_bytes(
+                    self._pointer(code, "PyCodeObject.co_lnotab")
+                )
+
+            info = self._code_cache[code] = (
+                self.read_str(self._pointer(code, "PyCodeObject.co_name")),
+                self.read_str(self._pointer(code, "PyCodeObject.co_filename")),
+                self._int(code, "PyCodeObject.co_firstlineno", signed=True),
+                line_table,
+            )
+
+        co_name, co_filename, co_firstlineno, line_table = info
+        f_lineno = self._int(frame, "_frame.f_lineno", signed=True)
+        f_lasti = self._int(frame, "_frame.f_lasti", signed=True)
+        if self.layout.has("PyCodeObject.co_linetable"):
+            # CPython >= 3.10 (PEP 626)
+            lineno = f_lineno or PyCodeObject.line_from_co_linetable(
+                line_table, co_firstlineno, f_lasti * 2
+            )
+        else:
+            lineno = PyCodeObject.line_from_co_lnotab(line_table, f_lasti) + f_lineno
+
+        return co_filename, lineno, co_name
+
+
+class GCHeap(ObjectReader):
+    """Walk the lists of objects tracked by the cyclic garbage collector.
+
+    Each GC generation is a circular doubly linked list of PyGC_Head structs,
+    which immediately precede the PyObject part of container objects. Lists
+    are walked using raw memory reads: the GC header, the type pointer and the
+    size of an object are fetched in one read, so that large heaps can be
+    processed in a matter of seconds.
+    """
+
+    def __init__(self, memory, layout, heads, gc_head_size):
+        super(GCHeap, self).__init__(memory, layout)
+        # addresses of the list heads of all GC generations
+        self.heads = heads
+        self.gc_head_size = gc_head_size
+        # the number of lists that could not be walked until the end
+        self.truncated = 0
+
+    @classmethod
+    def from_target(cls, target):
+        runtime = target.FindFirstGlobalVariable("_PyRuntime")
+        gc_head_size = target.FindFirstType("PyGC_Head").GetByteSize()
+        if not runtime.IsValid() or not gc_head_size:
+            raise ValueError("Failed to find _PyRuntime (symbols might be missing!)")
+
+        states = []
+        if runtime.GetChildMemberWithName("gc").IsValid():
+            # CPython < 3.9: the GC state is global
+            states.append(runtime.GetChildMemberWithName("gc"))
+        else:
+            interp = runtime.GetChildMemberWithName(
+                "interpreters"
+            ).GetChildMemberWithName("head")
+            while interp.unsigned:
+                states.append(interp.deref.GetChildMemberWithName("gc"))
+                interp = interp.deref.GetChildMemberWithName("next")
+
+        heads = []
+        for state in states:
+            # CPython >= 3.13 has "young" and "old" generations instead
+            for name in ("generations", "young", "old", "permanent_generation"):
+                member = state.GetChildMemberWithName(name)
+                if not member.IsValid():
+                    continue
+
+                if member.GetType().IsArrayType():
+                    generations = [
+                        member.GetChildAtIndex(i)
+                        for i in range(member.GetNumChildren())
+                    ]
+                else:
+                    generations = [member]
+                heads.extend(
+                    g.GetChildMemberWithName("head").GetLoadAddress()
+                    for g in generations
+                )
+
+        return cls(
+            memory_reader(target.GetProcess()),
+            Layout.from_target(target),
+            heads,
+            gc_head_size,
+        )
+
+    def objects(self):
+        """Yield the addresses of all objects tracked by the GC."""
+
+        for addr, _, _ in self.headers():
+            yield addr
+
+    def headers(self):
+        """Yield tuples of (address, ob_type, ob_size) of all objects tracked by the GC.
+
+        ob_size is only meaningful for variable-size objects.
+        """
+
+        pointer = "Q" if self.layout.pointer_size == 8 else "I"
+        type_offset = self.gc_head_size + self.layout.offset("PyObject.ob_type")
+        size_offset = self.gc_head_size + self.layout.offset("PyVarObject.ob_size")
+        header = struct.Struct(
+            "{}{}{}x{}{}x{}".format(
+                "<" if self.memory.byteorder == "little" else ">",
+                pointer,
+                type_offset - self.layout.pointer_size,
+                pointer,
+                size_offset - type_offset - self.layout.pointer_size,
+                pointer.lower(),
+            )
+        )
+
+        for head in self.heads:
+            try:
+                # the lower bits of the pointer are used for flags
+                gc = self.memory.read_pointer(head) & ~3
+                while gc and gc != head:
+                    next_gc, ob_type, ob_size = header.unpack(
+                        self.memory.read(gc, header.size)
+                    )
+                    yield gc + self.gc_head_size, ob_type, ob_size
+
+                    gc = next_gc & ~3
+            except MemoryReadError:
+                self.truncated += 1
+
+    def histogram(self):
+        """Return a dict of type name -> (number of objects, total size in bytes).
+
+        The size of an object is tp_basicsize plus tp_itemsize times the number
+        of items, i.e. the memory allocated separately (e.g. for list items or
+        dict entries) is not taken into account.
+        """
+
+        # type object address -> [number of objects, total number of items]
+        by_type = {}
+        for _, ob_type, ob_size in self.headers():
+            counts = by_type.get(ob_type)
+            if counts is None:
+                counts = by_type[ob_type] = [0, 0]
+            counts[0] += 1
+            counts[1] += abs(ob_size)
+
+        # type names are only resolved once per type. Different types can have
+        # the same name, e.g. classes defined in different modules
+        histogram = collections.defaultdict(lambda: (0, 0))
+        for ob_type, (count, items) in by_type.items():
+            try:
+                info = self.type_info(ob_type)
+            except MemoryReadError:
+                info = self.TypeInfo("<invalid type at 0x{:x}>".format(ob_type), 0, 0)
+            total_count, total_size = histogram[info.name]
+            histogram[info.name] = (
+                total_count + count,
+                total_size
+                + count * info.basicsize
+                + (items * info.itemsize if info.itemsize else 0),
+            )
+
+        return dict(histogram)
+
+    def referrers(self, addr, candidates=None):
+        """Yield containers that hold a reference to the object at addr.
+
+        Each referrer is a tuple of (address, ob_type, slot, index), where slot
+        is the index of a pointer array returned by slots() and index is the
+        position of the reference in that array. Instead of decoding every
+        container, pointer arrays are read at once and searched for the packed
+        address as a byte string.
+
+        All GC-tracked objects are scanned, unless the addresses of candidate
+        containers are passed (e.g. the ones found by referrers_index()).
+        """
+
+        if candidates is None:
+            candidates = ((r, t) for r, t, _ in self.headers())
+        else:
+            candidates = ((r, self.type_of(r)) for r in candidates)
+
+        needle = addr.to_bytes(self.layout.pointer_size, self.memory.byteorder)
+        for referrer, ob_type in candidates:
+            if self.container_type(ob_type) is None:
+                continue
+
+            try:
+                for slot, (start, count, stride) in enumerate(
+                    self.slots(referrer, ob_type)
+                ):
+                    if count <= 0:
+                        continue
+
+                    data = self.memory.read(
+                        start, (count - 1) * stride + self.layout.pointer_size
+                    )
+                    pos = data.find(needle)
+                    while pos != -1:
+                        if pos % stride == 0:
+                            yield referrer, ob_type, slot, pos // stride
+                        pos = data.find(needle, pos + 1)
+            except MemoryReadError:
+                continue
+
+    def referrers_index(self):
+        """Return a dict of object address -> addresses of containers referencing it."""
+
+        index = collections.defaultdict(list)
+        for referrer, ob_type, _ in self.headers():
+            if self.container_type(ob_type) is None:
+                continue
+
+            try:
+                for referent in set(self.referents(referrer, ob_type)):
+                    index[referent].append(referrer)
+            except MemoryReadError:
+                continue
+
+        return index
+
+
+class Pymalloc(ObjectReader):
+    """Read the state of the pymalloc allocator (see Objects/obmalloc.c).
+
+    Small objects are allocated in blocks of fixed size classes. Blocks of the
+    same size class are carved from pools, and pools are carved from arenas
+    allocated with mmap(). Arenas are only returned to the OS once all of their
+    pools are empty, so a few live objects can keep a lot of memory allocated.
+    """
+
+    SMALL_REQUEST_THRESHOLD = 512
+
+    SizeClass = collections.namedtuple(
+        "SizeClass", "index block_size pools used_blocks free_blocks"
+    )
+    Stats = collections.namedtuple(
+        "Stats",
+        "size_classes arenas arena_size pool_size free_pools untouched_pools counters",
+    )
+
+    def __init__(self, memory, layout, arenas, maxarenas, num_classes, large, counters):
+        super(Pymalloc, self).__init__(memory, layout)
+        # address and length of the array of arena_object structs
+        self.arenas = arenas
+        self.maxarenas = maxarenas
+        self.num_classes = num_classes
+        self.alignment = self.SMALL_REQUEST_THRESHOLD // num_classes
+        # CPython >= 3.10 uses larger arenas and pools on 64-bit platforms
+        # when the radix tree is used for tracking arenas
+        self.arena_size = 1 << (20 if large else 18)
+        self.pool_size = 1 << (14 if large else 12)
+        # the arena usage counters maintained by pymalloc
+        self.counters = counters
+
+    @classmethod
+    def from_target(cls, target):
+        def find(name, path):
+            value = target.FindFirstGlobalVariable(name)
+            if value.IsValid():
+                return value
+
+            # CPython >= 3.12: the allocator state is stored in the interpreter
+            value = target.FindFirstGlobalVariable("_PyRuntime")
+            for member in ("_main_interpreter", "obmalloc") + tuple(path.split(".")):
+                value = value.GetChildMemberWithName(member)
+            return value
+
+        arenas = find("arenas", "mgmt.arenas")
+        usedpools = find("usedpools", "pools.used")
+        layout = Layout.from_target(target)
+        if (
+            not arenas.IsValid()
+            or not usedpools.IsValid()
+            or not layout.has("arena_object.address")
+        ):
+            raise ValueError(
+                "Failed to find the state of pymalloc (either symbols are missing "
+                "or CPython is built w/o pymalloc)"
+            )
+
+        counters = collections.OrderedDict()
+        for name in (
+            "narenas_currently_allocated",
+            "narenas_highwater",
+            "ntimes_arena_allocated",
+        ):
+            value = find(name, "mgmt." + name)
+            if value.IsValid():
+                counters[name] = value.unsigned
+
+        return cls(
+            memory_reader(target.GetProcess()),
+            layout,
+            arenas.unsigned,
+            find("maxarenas", "mgmt.maxarenas").unsigned,
+            # see the definition of usedpools for details
+            usedpools.GetNumChildren() // 2,
+            find("arena_map_root", "usage.arena_map_root").IsValid(),
+            counters,
+        )
+
+    def stats(self):
+        """Collect statistics similar to the ones printed by sys._debugmallocstats()."""
+
+        arena_object_size = self.layout.sizes["arena_object"]
+        pool_header_size = self.layout.sizes["pool_header"]
+        # the pool header is padded to preserve the alignment of blocks
+        pool_overhead = -(-pool_header_size // self.alignment) * self.alignment
+
+        # the array of arena objects is read at once
+        data = self.memory.read(self.arenas, self.maxarenas * arena_object_size)
+        arenas = nfreepools = 0
+        headers = []
+        for i in range(self.maxarenas):
+            base = i * arena_object_size
+            address = self._unpack(data, "arena_object.address", base)
+            if not address:
+                # the arena object is not associated with an allocated arena
+                continue
+
+            arenas += 1
+            nfreepools += self._unpack(data, "arena_object.nfreepools", base)
+
+            # pools are carved from the arena lazily, up to pool_address
+            pool = -(-address // self.pool_size) * self.pool_size
+            end = self._unpack(data, "arena_object.pool_address", base)
+            headers.extend(
+                (p, pool_header_size) for p in range(pool, end, self.pool_size)
+            )
+
+        # pool headers are pool_size bytes apart: only the headers themselves
+        # are read (coalescing the gaps would read every arena as a whole),
+        # and the page cache is bypassed, as it would be filled with pages
+        # that are never looked at again
+        memory = self.memory
+        if isinstance(memory, CachingMemoryReader):
+            memory = memory.reader
+
+        # index -> [pools, used blocks, free blocks]
+        classes = [[0, 0, 0] for _ in range(self.num_classes)]
+        free_pools = 0
+        for header in memory.read_many(headers, max_gap=pool_header_size):
+            used = self._unpack(header, "pool_header.ref.count")
+            if not used:
+                # empty pools are on the arena's list of free pools
+                free_pools += 1
+                continue
+
+            index = self._unpack(header, "pool_header.szidx")
+            block_size = (index + 1) * self.alignment
+            counts = classes[index]
+            counts[0] += 1
+            counts[1] += used
+            counts[2] += (self.pool_size - pool_overhead) // block_size - used
+
+        return self.Stats(
+            [
+                self.SizeClass(i, (i + 1) * self.alignment, *counts)
+                for i, counts in enumerate(classes)
+                if counts[0]
+            ],
+            arenas,
+            self.arena_size,
+            self.pool_size,
+            free_pools,
+            # nfreepools also counts pools that have never been carved
+            nfreepools - free_pools,
+            self.counters,
+        )
+
+
+class HeapSnapshot(object):
+    """A snapshot of objects tracked by the GC saved to a file.
+
+    Records (object address, type id, size and, optionally, addresses of the
+    objects referenced by containers) are written in blocks of columns, so that
+    a snapshot is streamed to disk while the heap is walked and can be read back
+    block by block w/o materializing millions of records at once. The table of
+    type names, which are indexed by type ids, is written at the end of the file.
+    """
+
+    MAGIC = b"CPYHEAP1"
+    BLOCK_SIZE = 64 * 1024
+
+    Block = collections.namedtuple(
+        "Block", "addresses types sizes referent_counts referents"
+    )
+    # typecodes of Block columns
+    COLUMNS = ("Q", "I", "Q", "I", "Q")
+
+    def __init__(self, path):
+        self.path = path
+
+        with io.open(path, "rb") as f:
+            if f.read(len(self.MAGIC)) != self.MAGIC:
+                raise ValueError("{} is not a heap snapshot".format(path))
+
+            try:
+                f.seek(-8, os.SEEK_END)
+                (self._footer,) = struct.unpack("<Q", f.read(8))
+                f.seek(self._footer)
+                footer = json.loads(f.read()[:-8].decode("utf-8"))
+            except (IOError, ValueError, struct.error):
+                raise ValueError("{} is truncated".format(path))
+
+        # type id -> type name
+        self.types = footer["types"]
+        self._byteorder = footer["byteorder"]
+
+    @classmethod
+    def save(cls, heap, path, referents=False):
+        """Walk a GCHeap and save a snapshot to a file.
+
+        Returns the number of saved records.
+        """
+
+        # type object address -> type id
+        type_ids = {}
+        types = []
+        total = 0
+
+        with io.open(path, "wb") as f:
+            f.write(cls.MAGIC)
+
+            block = cls.Block(*(array.array(t) for t in cls.COLUMNS))
+            for addr, ob_type, ob_size in heap.headers():
+                type_id = type_ids.get(ob_type)
+                if type_id is None:
+                    try:
+                        info = heap.type_info(ob_type)
+                    except MemoryReadError:
+                        info = heap.TypeInfo(
+                            "<invalid type at 0x{:x}>".format(ob_type), 0, 0
+                        )
+                    type_id = type_ids[ob_type] = len(types)
+                    types.append(info)
+                info = types[type_id]
+
+                block.addresses.append(addr)
+                block.types.append(type_id)
+                block.sizes.append(
+                    info.basicsize
+                    + (abs(ob_size) * info.itemsize if info.itemsize else 0)
+                )
+                if referents:
+                    try:
+                        pointers = heap.referents(addr, ob_type)
+                    except MemoryReadError:
+                        pointers = []
+                    block.referent_counts.append(len(pointers))
+                    block.referents.extend(pointers)
+                else:
+                    block.referent_counts.append(0)
+
+                if len(block.addresses) == cls.BLOCK_SIZE:
+                    total += cls._write_block(f, block)
+                    block = cls.Block(*(array.array(t) for t in cls.COLUMNS))
+            total += cls._write_block(f, block)
+
+            footer = f.tell()
+            f.write(
+                json.dumps(
+                    {"types": [t.name for t in types], "byteorder": sys.byteorder}
+                ).encode("utf-8")
+            )
+            f.write(struct.pack("<Q", footer))
+
+        return total
+
+    @staticmethod
+    def _write_block(f, block):
+        if not block.addresses:
+            return 0
+
+        f.write(struct.pack("<QQ", len(block.addresses), len(block.referents)))
+        for column in block:
+            column.tofile(f)
+
+        return len(block.addresses)
+
+    def blocks(self):
+        """Yield blocks of records as Block tuples of array.array columns."""
+
+        with io.open(self.path, "rb") as f:
+            f.seek(len(self.MAGIC))
+            while f.tell() < self._footer:
+                count, referents = struct.unpack("<QQ", f.read(16))
+
+                columns = []
+                for typecode, size in zip(
+                    self.COLUMNS, (count, count, count, count, referents)
+                ):
+                    column = array.array(typecode)
+                    try:
+                        column.fromfile(f, size)
+                    except EOFError:
+                        raise ValueError("{} is truncated".format(self.path))
+                    if self._byteorder != sys.byteorder:
+                        column.byteswap()
+                    columns.append(column)
+
+                yield self.Block(*columns)
+
+    def histogram(self):
+        """Return a dict of type name -> (number of objects, total size in bytes)."""
+
+        counts = collections.Counter()
+        sizes = collections.Counter()
+        for block in self.blocks():
+            counts.update(block.types)
+            for type_id, size in zip(block.types, block.sizes):
+                sizes[type_id] += size
+
+        histogram = collections.defaultdict(lambda: (0, 0))
+        for type_id, count in counts.items():
+            name = self.types[type_id]
+            total_count, total_size = histogram[name]
+            histogram[name] = (total_count + count, total_size + sizes[type_id])
+
+        return dict(histogram)
+
+
+# Commands
+
+
+class Command(metaclass=abc.ABCMeta):
+    """Base class for py-* command implementations.
+
+    Takes care of commands registration and error handling.
+
+    Subclasses' docstrings are used as help messages for the commands. The
+    first line of a docstring act as a command description that appears ina
+    the output of `help`.
+    """
+
+    def __init__(self, debugger, unused):
+        # using this instance of Debugger crashes LLDB. But commands receive a
+        # working instance on every invocation, so we don't really need it
+        pass
+
+    def get_short_help(self):
+        return self.__doc__.splitlines()[0]
+
+    def get_long_help(self):
+        return self.__doc__
+
+    def __call__(self, debugger, command, exe_ctx, result):
+        try:
+            args = self.argument_parser.parse_args(shlex.split(command))
+            self.execute(debugger, args, result)
+        except Exception as e:
+            msg = "Failed to execute command `{}`: {}".format(self.command, e)
+
+            result.SetError(msg)
+
+    @property
+    def argument_parser(self):
+        """ArgumentParser instance used for this command.
+
+        The default parser does not have any arguments and only prints a help
+        message based on the command description.
+
+        Subclasses are expected to override this property in order to add
+        additional commands to the provided ArgumentParser instance.
+        """
+
+        return argparse.ArgumentParser(
+            prog=self.command,
+            description=self.get_long_help(),
+            formatter_class=argparse.RawDescriptionHelpFormatter,
+        )
+
+    @property
+    @abc.abstractmethod
+    def command(self):
+        """Command name.
+
+        This name will be used by LLDB in order to uniquely identify an
+        implementation that should be executed when a command is run
+        in the REPL.
+        """
+
+    @abc.abstractmethod
+    def execute(self, debugger, args, result):
+        """Implementation of the command.
+
+        Subclasses override this method to implement the logic of a given
+        command, e.g. printing a stacktrace. The command output should be
+        communicated back via the provided result object, so that it's
+        properly routed to LLDB frontend. Any unhandled exception will be
+        automatically transformed into proper errors.
+
+        Args:
+            debugger: lldb.SBDebugger: the primary interface to LLDB scripting
+            args: argparse.Namespace: an object holding parsed command arguments
+            result: lldb.SBCommandReturnObject: a container which holds the
+                    result from command execution
+        """
+
+
+class PyBt(Command):
+    """Print a Python-level call trace of the selected thread.
+
+    Use
+
+        py-bt
+
+    to print all Python frames of the selected thread. Runs of identical
+    frames (e.g. in a deep recursion) are collapsed the same way the
+    traceback module does it.
+
+
+    Use
+
+        py-bt -n N
+
+    to only print the N most recent frames.
+
+
+    Use
+
+        py-bt --skip M
+
+    to omit the M most recent frames.
+
+    The call stack is not walked any further than necessary, so the latter
+    two are useful for keeping the command fast on very deep call stacks.
+    """
+
+    command = "py-bt"
+
+    @property
+    def argument_parser(self):
+        parser = super(PyBt, self).argument_parser
+
+        parser.add_argument(
+            "-n", "--limit", type=int, default=None, help="print at most N frames"
+        )
+        parser.add_argument(
+            "--skip", type=int, default=0, help="omit M most recent frames"
+        )
+
+        return parser
+
+    def execute(self, debugger, args, result):
+        target = debugger.GetSelectedTarget()
+        thread = target.GetProcess().GetSelectedThread()
+
+        pystack = PyFrameObject.get_pystack(thread, skip=args.skip, limit=args.limit)
+
+        # identical frames are only decoded once
+        formatted = {}
+        for pyframe in pystack:
+            key = pyframe.location_key
+            if key not in formatted:
+                formatted[key] = (
+                    "  " + pyframe.to_pythonlike_string(),
+                    "    " + pyframe.line.strip(),
+                )
+
+        lines = []
+        for location, repeated in collapse_repeated(
+            formatted[pyframe.location_key] for pyframe in reversed(pystack)
+        ):
+            lines.extend(location)
+            if repeated:
+                lines.append(
+                    "  [Previous line repeated {} more time{}]".format(
+                        repeated, "s" if repeated > 1 else ""
+                    )
+                )
+
+        if lines:
+            write_line(result, "Traceback (most recent call last):")
+            write_line(result, "\n".join(lines))
+        else:
+            write_line(result, "No Python traceback found")
+
+
+class PyList(Command):
+    """List the source code of the Python module that is currently being executed.
+
+    Use
+
+        py-list
+
+    to list the source code around (5 lines before and after) the line that is
+    currently being executed.
+
+
+    Use
+
+        py-list start
+
+    to list the source code starting at a different line number.
+
+
+    Use
+
+        py-list start end
+
+    to list the source code within a specific range of lines.
+    """
+
+    command = "py-list"
+
+    @property
+    def argument_parser(self):
+        parser = super(PyList, self).argument_parser
+
+        parser.add_argument("linenum", nargs="*", type=int, default=[0, 0])
+
+        return parser
+
+    @staticmethod
+    def linenum_range(current_line_num, specified_range):
+        if len(specified_range) == 2:
+            start, end = specified_range
+        elif len(specified_range) == 1:
+            start = specified_range[0]
+            end = start + 10
+        else:
+            start = None
+            end = None
+
+        start = start or max(current_line_num - 5, 1)
+        end = end or (current_line_num + 5)
+
+        return start, end
+
+    def execute(self, debugger, args, result):
+        # optional arguments allow to list the source code within a specific range
+        # of lines instead of the context around the line that is being executed
+        linenum_range = args.linenum
+        if len(linenum_range) > 2:
+            write_line(result, "Usage: py-list [start [end]]")
+            return
+
+        # find the most recent Python frame in the callstack of the selected thread
+        current_frame = select_closest_python_frame(debugger)
+        if current_frame is None:
+            write_line(result, "<source code is not available>")
+            return
+
+        # determine the location of the module and the exact line that is currently
+        # being executed
+        filename = current_frame.filename
+        current_line_num = current_frame.line_number
+
+        # default to showing the context around the current line, unless overridden
+        start, end = PyList.linenum_range(current_line_num, linenum_range)
+        try:
+            encoding = source_file_encoding(filename)
+            lines = source_file_lines(filename, start, end + 1, encoding=encoding)
+            for i, line in enumerate(lines, start):
+                # highlight the current line
+                if i == current_line_num:
+                    prefix = ">{}".format(i)
+                else:
+                    prefix = "{}".format(i)
+
+                write_line(result, "{:>5}    {}".format(prefix, line.rstrip()))
+        except IOError:
+            write_line(result, "<source code is not available>")
+
+
+class PyUp(Command):
+    """Select an older Python stack frame."""
+
+    command = "py-up"
+
+    def execute(self, debugger, args, result):
+        select_closest_python_frame(debugger, direction=Direction.UP)
+
+        new_frame = move_python_frame(debugger, direction=Direction.UP)
+        if new_frame is None:
+            write_line(result, "*** Oldest frame")
+        else:
+            print_frame_summary(result, new_frame)
+
+
+class PyDown(Command):
+    """Select a newer Python stack frame."""
+
+    command = "py-down"
+
+    def execute(self, debugger, args, result):
+        select_closest_python_frame(debugger, direction=Direction.DOWN)
+
+        new_frame = move_python_frame(debugger, direction=Direction.DOWN)
+        if new_frame is None:
+            write_line(result, "*** Newest frame")
+        else:
+            print_frame_summary(result, new_frame)
+
+
+class PyLocals(Command):
+    """Print the values of local variables in the selected Python frame.
+
+    Use
+
+        py-locals request_id 'user_*'
+
+    to only print the variables with the given names (glob patterns are
+    supported), or
+
+        py-locals --names-only
+
+    to only list the names of variables without decoding any values. Names
+    are resolved first, and only the values of the selected variables are
+    decoded. Large containers and strings are truncated once --max-items
+    items or --max-bytes bytes of a variable have been decoded.
+    """
+
+    command = "py-locals"
+
+    @property
+    def argument_parser(self):
+        parser = super(PyLocals, self).argument_parser
+
+        parser.add_argument(
+            "names",
+            nargs="*",
+            metavar="NAME",
+            help="names of variables to print (glob patterns are supported)",
+        )
+        parser.add_argument(
+            "--names-only",
+            action="store_true",
+            help="only print the names of variables",
+        )
+        add_budget_arguments(parser)
+
+        return parser
+
+    def execute(self, debugger, args, result):
+        current_frame = select_closest_python_frame(debugger, direction=Direction.UP)
+        if current_frame is None:
+            write_line(result, "No locals found (symbols might be missing!)")
+            return
+
+        merged_locals = self._locals(current_frame)
+        for name in sorted(merged_locals):
+            if args.names and not any(
+                fnmatch.fnmatchcase(name, pattern) for pattern in args.names
+            ):
+                continue
+
+            if args.names_only:
+                write_line(result, name)
+                continue
+
+            with Budget(args.max_items, args.max_bytes):
+                value = PyObject.from_value(merged_locals[name]).value
+                write_line(result, "{} = {}".format(name, repr(value)))
+
+    @staticmethod
+    def _locals(frame):
+        """Return a dict of name -> LLDB value of local variables of a frame.
+
+        Only the names are decoded, the values are decoded by the caller.
+        """
+
+        # merge logic is based on the implementation of PyFrame_LocalsToFast()
+        merged_locals = {}
+
+        # f_locals contains top-level declarations (e.g. functions or classes)
+        # of a frame executing a Python module, rather than a function. It's
+        # never materialized for function frames, as no code can be executed
+        f_locals = frame.namespace("f_locals")
+        if f_locals.unsigned != 0:
+            for k, v in PyDictObject(f_locals).entries():
+                merged_locals[PyObject.from_value(k).value] = v
+
+        # f_localsplus stores local variables and arguments of function frames
+        for name, value in frame.fast_locals():
+            if value is not None:
+                merged_locals[name] = value
+            else:
+                merged_locals.pop(name, None)
+
+        return merged_locals
+
+
+class PyGlobals(Command):
+    """Print the names of global variables of the selected Python frame.
+
+    Use
+
+        py-globals --filter 'user_*' --values
+
+    to only list the globals with names matching a glob pattern and to print
+    their values as well. By default, only the names are read, so the command
+    is fast even for modules with thousands of globals. Use --builtins to list
+    the builtins of the frame instead, and --page to see the rest of a long
+    listing.
+    """
+
+    command = "py-globals"
+
+    @property
+    def argument_parser(self):
+        parser = super(PyGlobals, self).argument_parser
+
+        parser.add_argument(
+            "--builtins",
+            action="store_true",
+            help="list the builtins of the frame instead of the globals",
+        )
+        parser.add_argument(
+            "--values", action="store_true", help="also print the values"
+        )
+        add_paging_arguments(parser)
+        add_budget_arguments(parser)
+
+        return parser
+
+    def execute(self, debugger, args, result):
+        current_frame = select_closest_python_frame(debugger, direction=Direction.UP)
+        if current_frame is None:
+            write_line(result, "No globals found (symbols might be missing!)")
+            return
+
+        namespace = "f_builtins" if args.builtins else "f_globals"
+        mapping = current_frame.namespace(namespace).unsigned
+        if mapping == 0:
+            return
+
+        target = debugger.GetSelectedTarget()
+        reader = object_reader(target)
+        names = [
+            reader.read_str(key)
+            for key in reader.dict_keys(mapping)
+            if reader.builtin_type(reader.type_of(key)) == "str"
+        ]
+
+        page, pages, count = select_page(names, args)
+        for name in page:
+            if not args.values:
+                write_line(result, name)
+                continue
+
+            addr = reader.dict_lookup(mapping, name)
+            with Budget(args.max_items, args.max_bytes):
+                value = PyObject.from_value(object_pointer(target, addr)).value
+                write_line(result, "{} = {}".format(name, repr(value)))
+
+        if pages > 1:
+            write_line(
+                result, "Page {} of {} ({} names)".format(args.page, pages, count)
+            )
+
+
+class PyModules(Command):
+    """Print the names of modules in sys.modules.
+
+    Use
+
+        py-modules --filter 'email.*'
+
+    to only list the modules with names matching a glob pattern. sys.modules
+    is read from the state of the main interpreter, so the selected thread
+    doesn't need to execute Python code. Only the names of modules are read,
+    so the command is fast even with thousands of modules loaded.
+    """
+
+    command = "py-modules"
+
+    @property
+    def argument_parser(self):
+        parser = super(PyModules, self).argument_parser
+        add_paging_arguments(parser)
+
+        return parser
+
+    def execute(self, debugger, args, result):
+        reader = PyStackReader.from_target(debugger.GetSelectedTarget())
+        modules = reader.modules()
+        names = [
+            reader.read_str(key)
+            for key in reader.dict_keys(modules)
+            if reader.builtin_type(reader.type_of(key)) == "str"
+        ]
+
+        page, pages, count = select_page(names, args)
+        for name in page:
+            write_line(result, name)
+
+        if pages > 1:
+            write_line(
+                result, "Page {} of {} ({} modules)".format(args.page, pages, count)
+            )
+
+
+class PyPrint(Command):
+    """Print the value of an object given by a path of attributes and items.
+
+    Use
+
+        py-print "self.cache['user'].name"
+
+    to print the value of an object reachable from a variable visible in the
+    selected Python frame (local variables take precedence over globals and
+    builtins) or from an object address, e.g. 0x7f1b7c2e0a40.items[0]. Paths
+    with string keys need to be quoted, as the arguments are split like in a
+    shell.
+
+    Only the objects along the path are looked up: attributes are read from
+    __slots__, the instance __dict__ and the dicts of the classes in the MRO
+    (descriptors such as properties are not evaluated), list and tuple items
+    are read by index, and dict items by str or int keys. Only the final
+    object is decoded, subject to the --max-items and --max-bytes limits.
+
+    Use
+
+        py-print "items[1000000:1000050]"
+
+    to only decode a slice of a large list or tuple, or
+
+        py-print cache --offset 1000 --limit 10
+
+    to page through the entries of a large dict or set. Only the memory of
+    the requested items is read when possible.
+    """
+
+    command = "py-print"
+
+    @property
+    def argument_parser(self):
+        parser = super(PyPrint, self).argument_parser
+
+        parser.add_argument(
+            "path", help="a path like name.attribute[0]['key'] or 0xADDRESS.attribute"
+        )
+        parser.add_argument(
+            "--offset",
+            type=int,
+            default=0,
+            help="the number of items of a container to skip (default: 0)",
+        )
+        parser.add_argument(
+            "--limit",
+            type=int,
+            default=None,
+            help="the maximum number of items of a container to print",
+        )
+        add_budget_arguments(parser)
+
+        return parser
+
+    def execute(self, debugger, args, result):
+        path = args.path.strip()
+        try:
+            node = ast.parse(path, mode="eval").body
+        except SyntaxError:
+            raise ValueError("Invalid path: {}".format(args.path))
+        if args.offset < 0 or (args.limit is not None and args.limit < 0):
+            raise ValueError("--offset and --limit must not be negative")
+
+        target = debugger.GetSelectedTarget()
+        reader = object_reader(target)
+
+        bounds = self._slice_bounds(node)
+        if bounds is not None:
+            addr = self._resolve(debugger, reader, node.value)
+            items = reader.item_slice(addr, *bounds)
+            count = len(items)
+        else:
+            addr = self._resolve(debugger, reader, node)
+            if not args.offset and args.limit is None:
+                with Budget(args.max_items, args.max_bytes):
+                    value = PyObject.from_value(object_pointer(target, addr)).value
+                    write_line(result, "{} = {}".format(path, repr(value)))
+                return
+
+            items, count = self._page(
+                reader, addr, args.offset, args.limit, args.max_items
+            )
+
+        container = reader.container_type(reader.type_of(addr))
+        with Budget(args.max_items, args.max_bytes):
+            write_line(
+                result,
+                "{} = {}".format(path, self._format(target, container, items, count)),
+            )
+
+    @staticmethod
+    def _slice_bounds(node):
+        """Return (start, stop, step) if the path ends with a slice or None."""
+
+        if not isinstance(node, ast.Subscript) or not isinstance(node.slice, ast.Slice):
+            return None
+
+        try:
+            return tuple(
+                ast.literal_eval(bound) if bound is not None else None
+                for bound in (node.slice.lower, node.slice.upper, node.slice.step)
+            )
+        except ValueError:
+            raise ValueError("Only int literals are supported in slices")
+
+    # the fields storing the number of items of containers that can be paged
+    SIZE_FIELDS = {
+        "list": "PyVarObject.ob_size",
+        "tuple": "PyVarObject.ob_size",
+        "dict": "PyDictObject.ma_used",
+        "set": "PySetObject.used",
+        "frozenset": "PySetObject.used",
+    }
+
+    @classmethod
+    def _page(cls, reader, addr, offset, limit, max_items):
+        """Return the items of a container in the range given by --offset and
+        --limit, and the number of items in that range (None if unknown).
+
+        Items that would not be decoded because of --max-items are not read,
+        except for one that tells if the range is truncated when the size of
+        the container is not known.
+        """
+
+        ob_type = reader.type_of(addr)
+        container = reader.container_type(ob_type)
+        if container not in cls.SIZE_FIELDS:
+            raise ValueError(
+                "--offset and --limit are not supported for objects of type {}".format(
+                    reader.type_info(ob_type).name
+                )
+            )
+
+        limit = sys.maxsize if limit is None else limit
+        count = min(limit, max_items + 1)
+        if container in ("list", "tuple"):
+            items = reader.item_slice(addr, offset, offset + count)
+        elif container == "dict":
+            items = reader.dict_page(addr, offset, count)
+        else:
+            items = reader.set_page(addr, offset, count)
+
+        if reader.layout.has(cls.SIZE_FIELDS[container]):
+            size = reader._int(addr, cls.SIZE_FIELDS[container], signed=True)
+            return items, max(0, min(limit, size - offset))
+        elif len(items) < count or count == limit:
+            # all items in the range have been read
+            return items, len(items)
+        else:
+            return items, None
+
+    @staticmethod
+    def _format(target, container, items, count):
+        """Format a part of a container the way repr() formats the whole.
+
+        count is the number of items in that part, of which only the first
+        ones may have been read (None if unknown).
+        """
+
+        def decode(addr):
+            return repr(PyObject.from_value(object_pointer(target, addr)).value)
+
+        allowed = Budget.take_items(len(items))
+        if container == "dict":
+            parts = ["{}: {}".format(decode(k), decode(v)) for k, v in items[:allowed]]
+        else:
+            parts = [decode(addr) for addr in items[:allowed]]
+        if count is None:
+            parts.append(repr(Truncated()))
+        elif allowed < count:
+            parts.append(repr(Truncated(count - allowed)))
+
+        if container == "list":
+            return "[{}]".format(", ".join(parts))
+        elif container == "tuple":
+            return "({})".format(", ".join(parts) + ("," if len(parts) == 1 else ""))
+        elif container == "dict":
+            return "{{{}}}".format(", ".join(parts))
+        elif not parts:
+            return "{}()".format(container)
+        elif container == "set":
+            return "{{{}}}".format(", ".join(parts))
+        else:
+            return "frozenset({{{}}})".format(", ".join(parts))
+
+    def _resolve(self, debugger, reader, node):
+        """Return the address of the object referenced by an AST node."""
+
+        if isinstance(node, ast.Attribute):
+            addr = self._resolve(debugger, reader, node.value)
+            value = reader.attribute(addr, node.attr)
+            if value is None:
+                raise ValueError(
+                    "'{}' object has no attribute '{}'".format(
+                        reader.type_info(reader.type_of(addr)).name, node.attr
+                    )
+                )
+
+            return value
+        elif isinstance(node, ast.Subscript):
+            addr = self._resolve(debugger, reader, node.value)
+            key = node.slice
+            if isinstance(key, getattr(ast, "Index", ())):
+                # CPython < 3.9
+                key = key.value
+            if isinstance(key, ast.Slice):
+                raise ValueError("Slices are only supported at the end of a path")
+
+            try:
+                key = ast.literal_eval(key)
+            except ValueError:
+                raise ValueError("Only str and int literals are supported as keys")
+
+            return reader.item(addr, key)
+        elif isinstance(node, ast.Name):
+            addr = self._lookup_name(debugger, reader, node.id)
+            if addr is None:
+                raise ValueError("name '{}' is not defined".format(node.id))
+
+            return addr
+
+        try:
+            addr = ast.literal_eval(node)
+        except ValueError:
+            addr = None
+        if not isinstance(addr, int):
+            raise ValueError("Unsupported path: {}".format(ast.dump(node)))
+
+        return addr
+
+    @staticmethod
+    def _lookup_name(debugger, reader, name):
+        frame = select_closest_python_frame(debugger, direction=Direction.UP)
+        if frame is None:
+            return None
+
+        for var, value in frame.fast_locals():
+            if var == name and value is not None:
+                return value.unsigned
+
+        for namespace in ("f_locals", "f_globals", "f_builtins"):
+            mapping = frame.namespace(namespace)
+            if mapping.unsigned == 0:
+                continue
+
+            value = reader.dict_lookup(mapping.unsigned, name)
+            if value is not None:
+                return value
+
+        return None
+
+
+class PySample(Command):
+    """Sample Python call stacks of a running process to find out where it spends time.
+
+    Use
+
+        py-sample --interval 10ms --duration 30s
+
+    to repeatedly interrupt the process, collect a Python call stack of the
+    selected thread (or of all threads, if --all-threads is passed) and resume
+    the process again. When done, the functions that were seen most often are
+    printed along with the average time the process was paused for collecting
+    a single sample.
+
+
+    Use
+
+        py-sample --output stacks.txt
+
+    to also write the collected call stacks in the "collapsed" format, which
+    can be used as an input for flame graph tools.
+
+    The process is left stopped when the command completes.
+    """
+
+    command = "py-sample"
+
+    @property
+    def argument_parser(self):
+        parser = super(PySample, self).argument_parser
+
+        parser.add_argument(
+            "--interval",
+            type=parse_duration,
+            default="10ms",
+            help="time between two consecutive samples (default: 10ms)",
+        )
+        parser.add_argument(
+            "--duration",
+            type=parse_duration,
+            default="10s",
+            help="total sampling time (default: 10s)",
+        )
+        parser.add_argument(
+            "--all-threads",
+            action="store_true",
+            help="sample all threads instead of just the selected one",
+        )
+        parser.add_argument(
+            "--output", help="write collapsed call stacks to the given file"
+        )
+        parser.add_argument(
+            "--top",
+            type=int,
+            default=20,
+            help="the number of functions to print (default: 20)",
+        )
+
+        return parser
+
+    def execute(self, debugger, args, result):
+        target = debugger.GetSelectedTarget()
+        process = target.GetProcess()
+        if not process.IsValid() or process.GetState() != lldb.eStateStopped:
+            write_line(result, "The process must be stopped to start sampling")
+            return
+
+        # code objects are decoded only once per sampling session
+        reader = PyStackReader.from_target(target)
+        stacks = collections.Counter()
+        pauses = []
+
+        # the process is resumed synchronously, i.e. Continue() will block
+        # until it's interrupted from a separate thread
+        is_async = debugger.GetAsync()
+        debugger.SetAsync(False)
+        try:
+            deadline = time.monotonic() + args.duration
+            while True:
+                started_at = time.perf_counter()
+                for frame in self._newest_frames(reader, process, args.all_threads):
+                    stack = tuple(
+                        "{2} ({0}:{1})".format(*reader.frame_location(f))
+                        for f in reader.frames(frame)
+                    )
+                    stacks[stack[::-1]] += 1
+                pauses.append(time.perf_counter() - started_at)
+
+                if time.monotonic() >= deadline:
+                    break
+
+                timer = threading.Timer(args.interval, process.SendAsyncInterrupt)
+                timer.start()
+                try:
+                    process.Continue()
+                finally:
+                    timer.cancel()
+
+                if process.GetState() != lldb.eStateStopped:
+                    break
+        finally:
+            debugger.SetAsync(is_async)
+
+        if args.output:
+            with io.open(args.output, "wt", encoding="utf-8") as f:
+                for stack, count in sorted(stacks.items()):
+                    f.write("{} {}\n".format(";".join(stack), count))
+
+        self._print_summary(result, stacks, pauses, args.top)
+
+    @staticmethod
+    def _newest_frames(reader, process, all_threads):
+        if all_threads:
+            # the current frame of each thread is known to the interpreter,
+            # so there is no need to unwind native call stacks at all
+            frames = (reader.current_frame(t) for t in reader.thread_states())
+            return [frame for frame in frames if frame]
+
+        pyframe = PyFrameObject.from_thread(process.GetSelectedThread())
+        return [pyframe.lldb_value.unsigned] if pyframe is not None else []
+
+    @staticmethod
+    def _print_summary(result, stacks, pauses, top):
+        total = sum(stacks.values())
+        write_line(
+            result,
+            "Collected {} samples, {} stacks; pause per sample: "
+            "avg {:.2f} ms, max {:.2f} ms".format(
+                len(pauses),
+                total,
+                1000 * sum(pauses) / len(pauses),
+                1000 * max(pauses),
+            ),
+        )
+        if not total:
+            return
+
+        own = collections.Counter()
+        cumulative = collections.Counter()
+        for stack, count in stacks.items():
+            own[stack[-1]] += count
+            for label in set(stack):
+                cumulative[label] += count
+
+        write_line(result, "{:>7} {:>7}  {}".format("Own", "Total", "Function"))
+        for label, count in own.most_common(top):
+            write_line(
+                result,
+                "{:>6.1f}% {:>6.1f}%  {}".format(
+                    100.0 * count / total, 100.0 * cumulative[label] / total, label
+                ),
+            )
+
+
+class PyHeap(Command):
+    """Print a histogram of objects tracked by the garbage collector.
+
+    Use
+
+        py-heap
+
+    to walk all GC generations and print the types with the largest total
+    size of instances. The size of an object is tp_basicsize plus tp_itemsize
+    times the number of items, i.e. memory allocated separately (such as the
+    storage of list items or dict entries) is not included. Objects that are
+    not tracked by the GC (e.g. ints, floats, strings) are not counted either.
+
+
+    Use
+
+        py-heap --sort count --top 50
+
+    to print the 50 types with the largest number of instances instead.
+    """
+
+    command = "py-heap"
+
+    @property
+    def argument_parser(self):
+        parser = super(PyHeap, self).argument_parser
+
+        parser.add_argument(
+            "--top",
+            type=int,
+            default=20,
+            help="the number of types to print (default: 20)",
+        )
+        parser.add_argument(
+            "--sort",
+            choices=("size", "count"),
+            default="size",
+            help="sort types by the total size or by the number of objects",
+        )
+        parser.add_argument(
+            "--save",
+            metavar="PATH",
+            help="save a snapshot of the heap to a file instead",
+        )
+        parser.add_argument(
+            "--referents",
+            action="store_true",
+            help="also save the addresses of objects referenced by containers",
+        )
+
+        return parser
+
+    def execute(self, debugger, args, result):
+        heap = GCHeap.from_target(debugger.GetSelectedTarget())
+        if args.save:
+            total = HeapSnapshot.save(heap, args.save, referents=args.referents)
+        else:
+            histogram = heap.histogram()
+
+        if heap.truncated:
+            write_line(
+                result,
+                "Warning: {} GC list(s) could not be read completely".format(
+                    heap.truncated
+                ),
+            )
+
+        if args.save:
+            write_line(result, "Saved {} objects to {}".format(total, args.save))
+        else:
+            print_heap_histogram(histogram, result, top=args.top, sort=args.sort)
+
+
+class PyReferrers(Command):
+    """Find containers that hold a reference to the given object.
+
+    Use
+
+        py-referrers 0x7f3c5a2d1e80
+
+    to scan lists, tuples, dicts (including instance dicts), sets, cells and
+    frames tracked by the garbage collector for references to the object at
+    the given address. Instance attributes are stored in dicts, so use
+    py-referrers on the address of a dict to find the instance it belongs to.
+
+
+    Use
+
+        py-referrers --index 0x7f3c5a2d1e80
+
+    to build an index of references of all containers first. Building the
+    index takes longer than a single scan, but the index is kept until the
+    process is resumed, so that subsequent queries are answered instantly.
+    """
+
+    command = "py-referrers"
+
+    @property
+    def argument_parser(self):
+        parser = super(PyReferrers, self).argument_parser
+
+        parser.add_argument(
+            "address",
+            type=lambda x: int(x, 0),
+            help="address of the object (e.g. 0x7f3c5a2d1e80)",
+        )
+        parser.add_argument(
+            "--index",
+            action="store_true",
+            help="build (or reuse) an index of references of all containers",
+        )
+        parser.add_argument(
+            "--max",
+            type=int,
+            default=100,
+            help="the maximum number of referrers to print (default: 100)",
+        )
+
+        return parser
+
+    def execute(self, debugger, args, result):
+        target = debugger.GetSelectedTarget()
+        heap = GCHeap.from_target(target)
+
+        if args.index:
+            process = target.GetProcess()
+            stop_id, index = _referrers_indexes.get(process.GetUniqueID(), (None, None))
+            if stop_id != process.GetStopID():
+                index = heap.referrers_index()
+                _store_per_process(
+                    _referrers_indexes, process, (process.GetStopID(), index)
+                )
+
+            # only the found containers are scanned again to describe the slots
+            referrers = heap.referrers(
+                args.address, candidates=index.get(args.address, [])
+            )
+        else:
+            referrers = heap.referrers(args.address)
+
+        found = 0
+        for referrer, ob_type, slot, position in referrers:
+            found += 1
+            if found > args.max:
+                continue
+
+            write_line(
+                result,
+                "{:#x} {} {}".format(
+                    referrer,
+                    heap.type_info(ob_type).name,
+                    heap.describe_slot(referrer, ob_type, slot, position),
+                ),
+            )
+
+        if found > args.max:
+            write_line(result, "... ({} more)".format(found - args.max))
+        write_line(result, "Found {} reference(s)".format(found))
+
+
+class PyObjgraph(Command):
+    """Export the graph of objects reachable from the given object.
+
+    Use
+
+        py-objgraph 0x7f3c5a2d1e80 --depth 4 --max-nodes 5000 --output graph.dot
+
+    to traverse objects referenced by the given one breadth-first (items of
+    lists, tuples, dicts, sets, cells and frames, as well as instance dicts)
+    and write the nodes and edges to a file in the DOT format, which can be
+    rendered by Graphviz. Pass --format json to write one JSON object per
+    node or edge instead.
+
+    The traversal stops at the given depth or when the maximum number of
+    nodes is reached. At most --max-referents items are followed per object.
+    """
+
+    command = "py-objgraph"
+
+    @property
+    def argument_parser(self):
+        parser = super(PyObjgraph, self).argument_parser
+
+        parser.add_argument(
+            "address",
+            type=lambda x: int(x, 0),
+            help="address of the object (e.g. 0x7f3c5a2d1e80)",
+        )
+        parser.add_argument(
+            "--depth",
+            type=int,
+            default=4,
+            help="the maximum distance from the given object (default: 4)",
+        )
+        parser.add_argument(
+            "--max-nodes",
+            type=int,
+            default=5000,
+            help="the maximum number of objects to visit (default: 5000)",
+        )
+        parser.add_argument(
+            "--max-referents",
+            type=int,
+            default=1000,
+            help="the maximum number of items followed per object (default: 1000)",
+        )
+        parser.add_argument("--format", choices=("dot", "json"), default="dot")
+        parser.add_argument(
+            "--output", help="path to the output file (default: print the graph)"
+        )
+
+        return parser
+
+    def execute(self, debugger, args, result):
+        reader = object_reader(debugger.GetSelectedTarget())
+        events = reader.graph(
+            args.address, args.depth, args.max_nodes, args.max_referents
+        )
+
+        if args.output:
+            with io.open(args.output, "wt", encoding="utf-8") as f:
+                nodes, edges, skipped = self._write(events, f, args.format)
+            write_line(
+                result,
+                "Wrote {} nodes and {} edges to {}".format(nodes, edges, args.output),
+            )
+        else:
+            _, _, skipped = self._write(events, result, args.format)
+
+        if skipped:
+            write_line(
+                result, "Skipped {} references because of the limits".format(skipped)
+            )
+
+    @staticmethod
+    def _write(events, out, format):
+        """Write the graph and return the numbers of nodes, edges and skipped edges."""
+
+        nodes = edges = skipped = 0
+        if format == "dot":
+            write_line(out, "digraph objgraph {")
+            write_line(out, "  node [shape=box];")
+
+        for event in events:
+            if event[0] == "skipped":
+                skipped = event[1]
+            elif event[0] == "node":
+                _, addr, type_name, depth = event
+                nodes += 1
+                if format == "dot":
+                    write_line(
+                        out,
+                        '  "{:#x}" [label={}];'.format(
+                            addr,
+                            json.dumps(
+                                "{}\n{:#x}".format(type_name, addr), ensure_ascii=False
+                            ),
+                        ),
+                    )
+                else:
+                    write_line(
+                        out,
+                        json.dumps(
+                            {
+                                "node": "{:#x}".format(addr),
+                                "type": type_name,
+                                "depth": depth,
+                            }
+                        ),
+                    )
+            else:
+                _, source, target, label = event
+                edges += 1
+                if format == "dot":
+                    write_line(
+                        out,
+                        '  "{:#x}" -> "{:#x}" [label={}];'.format(
+                            source, target, json.dumps(label, ensure_ascii=False)
+                        ),
+                    )
+                else:
+                    write_line(
+                        out,
+                        json.dumps(
+                            {
+                                "edge": [
+                                    "{:#x}".format(source),
+                                    "{:#x}".format(target),
+                                ],
+                                "label": label,
+                            }
+                        ),
+                    )
+
+        if format == "dot":
+            write_line(out, "}")
+
+        return nodes, edges, skipped
+
+
+class PySizeof(Command):
+    """Print the size of an object in bytes, optionally including referenced objects.
+
+    Use
+
+        py-sizeof cache
+
+    to print the size of an object given by a name of a variable visible in
+    the selected Python frame, an address or an LLDB expression. The size is
+    calculated similarly to sys.getsizeof(), i.e. it includes memory that is
+    allocated separately for the built-in types (such as the capacity of a
+    list or the hash table of a dict), but not the referenced objects.
+
+
+    Use
+
+        py-sizeof cache --deep --depth 3
+
+    to also print the total size of all objects reachable from the given one
+    (items of containers and instance dicts). Objects referenced more than
+    once are counted once; modules, types and functions are not counted.
+    """
+
+    command = "py-sizeof"
+
+    @property
+    def argument_parser(self):
+        parser = super(PySizeof, self).argument_parser
+
+        parser.add_argument(
+            "expression", help="a variable name, an address or an LLDB expression"
+        )
+        parser.add_argument(
+            "--deep",
+            action="store_true",
+            help="also print the total size of objects reachable from the given one",
+        )
+        parser.add_argument(
+            "--depth",
+            type=int,
+            default=None,
+            help="the maximum distance from the given object (default: unlimited)",
+        )
+        parser.add_argument(
+            "--max-nodes",
+            type=int,
+            default=1000000,
+            help="the maximum number of objects to visit (default: 1000000)",
+        )
+
+        return parser
+
+    def execute(self, debugger, args, result):
+        addr = object_address(debugger, args.expression)
+        reader = object_reader(debugger.GetSelectedTarget())
+
+        write_line(result, "Shallow size: {} bytes".format(reader.sizeof(addr)))
+        if args.deep:
+            size, count, skipped = reader.deep_sizeof(addr, args.depth, args.max_nodes)
+            write_line(result, "Deep size: {} bytes in {} objects".format(size, count))
+            if skipped:
+                write_line(
+                    result, "Skipped {} objects because of the limits".format(skipped)
+                )
+
+
+class PyPymalloc(Command):
+    """Print statistics of the pymalloc allocator to analyze memory fragmentation.
+
+    Use
+
+        py-pymalloc
+
+    to print the number of pools, used and free blocks per size class, as
+    well as the number of arenas and pools, similarly to what
+    sys._debugmallocstats() prints, but w/o running any code in the process.
+
+    A high share of free blocks in used pools or of arena memory not used by
+    objects means that the memory is fragmented: arenas can only be returned
+    to the OS when all of their pools are empty.
+    """
+
+    command = "py-pymalloc"
+
+    def execute(self, debugger, args, result):
+        stats = Pymalloc.from_target(debugger.GetSelectedTarget()).stats()
+
+        write_line(
+            result,
+            "{:>6} {:>6} {:>8} {:>12} {:>12}".format(
+                "Class", "Size", "Pools", "Used blocks", "Free blocks"
+            ),
+        )
+        for size_class in stats.size_classes:
+            write_line(result, "{:>6} {:>6} {:>8} {:>12} {:>12}".format(*size_class))
+
+        used_pools = sum(c.pools for c in stats.size_classes)
+        used_bytes = sum(c.used_blocks * c.block_size for c in stats.size_classes)
+        free_bytes = sum(c.free_blocks * c.block_size for c in stats.size_classes)
+        arena_bytes = stats.arenas * stats.arena_size
+
+        write_line(
+            result,
+            "Arenas: {} x {} bytes{}".format(
+                stats.arenas,
+                stats.arena_size,
+                " (highwater: {}, allocated in total: {})".format(
+                    stats.counters["narenas_highwater"],
+                    stats.counters["ntimes_arena_allocated"],
+                )
+                if "narenas_highwater" in stats.counters
+                else "",
+            ),
+        )
+        write_line(
+            result,
+            "Pools: {} in use, {} empty, {} never used ({} bytes each)".format(
+                used_pools, stats.free_pools, stats.untouched_pools, stats.pool_size
+            ),
+        )
+        write_line(
+            result,
+            "Blocks: {} bytes in use, {} bytes free in used pools".format(
+                used_bytes, free_bytes
+            ),
+        )
+        write_line(
+            result,
+            "Fragmentation: {:.1f}% of used pools is free, {:.1f}% of arenas is "
+            "not used by blocks".format(
+                100.0 * free_bytes / (used_bytes + free_bytes)
+                if used_bytes + free_bytes
+                else 0.0,
+                100.0 * (arena_bytes - used_bytes) / arena_bytes
+                if arena_bytes
+                else 0.0,
+            ),
+        )
+
+
+class PyFindType(Command):
+    """Find objects of the given type by scanning the memory of the process.
+
+    Use
+
+        py-find-type str
+
+    to find objects of the given type, including those not tracked by the
+    garbage collector (e.g. str, bytes, int or float), by scanning memory
+    regions for pointers to the type object. The type is given either by its
+    name (a built-in type or a class defined in Python code) or by the name of
+    the C symbol of the type object (e.g. PyUnicode_Type).
+
+    By default, only the regions, where objects are dynamically allocated,
+    are scanned. Use --region all to scan all readable regions, including the
+    data sections of loaded modules.
+    """
+
+    command = "py-find-type"
+
+    @property
+    def argument_parser(self):
+        parser = super(PyFindType, self).argument_parser
+
+        parser.add_argument("type", help="type name or C symbol of the type object")
+        parser.add_argument(
+            "--region",
+            choices=("heap", "all"),
+            default="heap",
+            help="memory regions to scan (default: heap)",
+        )
+        parser.add_argument(
+            "--max",
+            type=int,
+            default=100,
+            help="the maximum number of objects to print (default: 100)",
+        )
+
+        return parser
+
+    def execute(self, debugger, args, result):
+        target = debugger.GetSelectedTarget()
+        ob_types = find_type_addresses(target, args.type)
+        if not ob_types:
+            write_line(result, "Failed to find type {}".format(args.type))
+            return
+
+        regions = address_map(target.GetProcess()).regions
+        if args.region == "heap":
+            regions = heap_regions(regions)
+
+        reader = object_reader(target)
+        started_at = time.perf_counter()
+        found = 0
+        for addr, ob_type in reader.scan(regions, ob_types):
+            found += 1
+            if found <= args.max:
+                write_line(result, self._describe(reader, addr, ob_type))
+            elif found == args.max + 1:
+                write_line(result, "...")
+
+        write_line(
+            result,
+            "Found {} object(s) of type {}; scanned {} bytes in {} regions "
+            "in {:.2f} s".format(
+                found,
+                args.type,
+                sum(r.end - r.start for r in regions),
+                len(regions),
+                time.perf_counter() - started_at,
+            ),
+        )
+
+    @staticmethod
+    def _describe(reader, addr, ob_type):
+        builtin = reader.builtin_type(ob_type)
+        try:
+            if builtin == "str":
+                return "{:#x} {!r}".format(addr, reader.read_str(addr)[:80])
+            elif builtin == "bytes":
+                return "{:#x} {!r}".format(addr, reader.read_bytes(addr)[:80])
+        except (MemoryReadError, UnicodeDecodeError):
+            pass
+
+        return "{:#x}".format(addr)
+
+
+class PyGrep(Command):
+    """Find str and bytes objects with values matching a regular expression.
+
+    Use
+
+        py-grep 'request-[0-9a-f]{8}'
+
+    to find where a particular value (e.g. a request id, a URL or a token)
+    ended up in the memory of the process. Objects are found by scanning
+    memory regions like py-find-type does, and matches are printed as soon as
+    they are found. Only the objects, which contain the literal part of the
+    pattern, are decoded, so the search is about as fast as the scan itself.
+    """
+
+    command = "py-grep"
+
+    @property
+    def argument_parser(self):
+        parser = super(PyGrep, self).argument_parser
+
+        parser.add_argument("pattern", help="regular expression to search for")
+        parser.add_argument(
+            "--type",
+            choices=("str", "bytes"),
+            action="append",
+            help="types of objects to search (default: str and bytes)",
+        )
+        parser.add_argument(
+            "-i",
+            "--ignore-case",
+            action="store_true",
+            help="perform case-insensitive matching",
+        )
+        parser.add_argument(
+            "--region",
+            choices=("heap", "all"),
+            default="heap",
+            help="memory regions to scan (default: heap)",
+        )
+        parser.add_argument(
+            "--max",
+            type=int,
+            default=100,
+            help="the maximum number of matches to print (default: 100)",
+        )
+
+        return parser
+
+    def execute(self, debugger, args, result):
+        target = debugger.GetSelectedTarget()
+        types = args.type or ["str", "bytes"]
+        ob_types = [
+            addr for name in types for addr in find_type_addresses(target, name)
+        ]
+        if not ob_types:
+            write_line(result, "Failed to find type objects for {}".format(types))
+            return
+
+        regions = address_map(target.GetProcess()).regions
+        if args.region == "heap":
+            regions = heap_regions(regions)
+
+        # print matches as soon as they are found, as the scan can take a while
+        try:
+            result.SetImmediateOutputFile(debugger.GetOutputFile())
+        except (AttributeError, TypeError):
+            pass
+
+        reader = object_reader(target)
+        flags = re.IGNORECASE if args.ignore_case else 0
+        started_at = time.perf_counter()
+        found = 0
+        for addr, value, match in reader.grep(regions, ob_types, args.pattern, flags):
+            found += 1
+            write_line(
+                result,
+                "{:#x} {} {}".format(
+                    addr, type(value).__name__, self._excerpt(value, match)
+                ),
+            )
+            if found == args.max:
+                break
+
+        write_line(
+            result,
+            "Found {} match(es); scanned {} bytes in {} regions in {:.2f} s".format(
+                found,
+                sum(r.end - r.start for r in regions),
+                len(regions),
+                time.perf_counter() - started_at,
+            ),
+        )
+
+    @staticmethod
+    def _excerpt(value, match, context=40):
+        """Return the repr of the part of value around the match."""
+
+        start = max(match.start() - context, 0)
+        end = min(match.end() + context, len(value))
+        return "{}{!r}{}".format(
+            "..." if start else "",
+            value[start:end],
+            "..." if end < len(value) else "",
+        )
+
+
+class PyHeapDiff(Command):
+    """Compare two heap snapshots saved by py-heap --save.
+
+    Use
+
+        py-heap-diff before.bin after.bin
+
+    to print the types, whose total size of instances grew the most between
+    the two snapshots (e.g. taken from two core files of the same service).
+    Pass --sort count to sort types by the growth of the number of instances.
+    """
+
+    command = "py-heap-diff"
+
+    @property
+    def argument_parser(self):
+        parser = super(PyHeapDiff, self).argument_parser
+
+        parser.add_argument("old", help="path to the older snapshot")
+        parser.add_argument("new", help="path to the newer snapshot")
+        parser.add_argument(
+            "--top",
+            type=int,
+            default=20,
+            help="the number of types to print (default: 20)",
+        )
+        parser.add_argument(
+            "--sort",
+            choices=("size", "count"),
+            default="size",
+            help="sort types by the growth of the total size or of the object count",
+        )
+
+        return parser
+
+    def execute(self, debugger, args, result):
+        print_heap_diff(
+            HeapSnapshot(args.old).histogram(),
+            HeapSnapshot(args.new).histogram(),
+            result,
+            top=args.top,
+            sort=args.sort,
+        )
+
+
+class PyMemoryCache(Command):
+    """Print statistics of the memory cache or change its settings.
+
+    The memory of the process under debug is read in aligned blocks (pages),
+    which are cached until the process is resumed. When consecutive pages are
+    read, a few more pages are read ahead.
+
+
+    Use
+
+        py-memory-cache
+
+    to print the number of cache hits and misses.
+
+
+    Use
+
+        py-memory-cache --page-size 64KiB --readahead 8
+
+    to change the size of a page (a power of 2 from 4KiB to 64KiB) or the
+    number of pages read ahead. Use --disable / --enable to turn the cache off
+    and on, and --reset to drop the cached pages and reset the counters.
+
+
+    Use
+
+        py-memory-cache --flush
+
+    to drop the cached pages (but keep the counters) after the memory of the
+    stopped process was modified, e.g. by `memory write` or by evaluating an
+    expression; otherwise, stale data is shown until the process is resumed.
+    """
+
+    command = "py-memory-cache"
+
+    @property
+    def argument_parser(self):
+        parser = super(PyMemoryCache, self).argument_parser
+
+        parser.add_argument("--page-size", type=parse_size)
+        parser.add_argument("--readahead", type=int)
+        parser.add_argument("--enable", action="store_true")
+        parser.add_argument("--disable", action="store_true")
+        parser.add_argument("--reset", action="store_true")
+        parser.add_argument("--flush", action="store_true")
+
+        return parser
+
+    def execute(self, debugger, args, result):
+        # all arguments are validated before any of the settings is changed
+        if args.page_size is not None:
+            if not 4 * 1024 <= args.page_size <= 64 * 1024:
+                raise ValueError("page size must be between 4KiB and 64KiB")
+            if args.page_size & (args.page_size - 1):
+                raise ValueError("page size must be a power of 2")
+        if args.readahead is not None and args.readahead < 0:
+            raise ValueError("read-ahead must not be negative")
+        if args.enable and args.disable:
+            raise ValueError("--enable and --disable are mutually exclusive")
+
+        if args.page_size is not None:
+            MEMORY_CACHE_SETTINGS["page_size"] = args.page_size
+        if args.readahead is not None:
+            MEMORY_CACHE_SETTINGS["readahead"] = args.readahead
+        if args.enable or args.disable:
+            MEMORY_CACHE_SETTINGS["enabled"] = args.enable
+
+        process = debugger.GetSelectedTarget().GetProcess()
+        changed = (
+            args.page_size is not None
+            or args.readahead is not None
+            or args.enable
+            or args.disable
+        )
+        if changed or args.reset:
+            # new settings will be picked up by newly created readers
+            flush_memory_caches(process)
+            _memory_readers.pop(process.GetUniqueID(), None)
+        elif args.flush:
+            flush_memory_caches(process)
+
+        write_line(
+            result,
+            "Memory cache: {}, page size: {} bytes, read-ahead: {} pages".format(
+                "enabled" if MEMORY_CACHE_SETTINGS["enabled"] else "disabled",
+                MEMORY_CACHE_SETTINGS["page_size"],
+                MEMORY_CACHE_SETTINGS["readahead"],
+            ),
+        )
+
+        reader = memory_reader(process) if process.IsValid() else None
+        if isinstance(reader, CoreFileMemoryReader):
+            write_line(
+                result, "Memory is read directly from the memory mapped core file"
+            )
+        elif isinstance(reader, CachingMemoryReader):
+            stats = reader.stats
+            lookups = stats["hits"] + stats["misses"]
+            write_line(
+                result,
+                "Hits: {}, misses: {} ({:.1f}% hit ratio), bypassed: {}, "
+                "errors: {}".format(
+                    stats["hits"],
+                    stats["misses"],
+                    100.0 * stats["hits"] / lookups if lookups else 0.0,
+                    stats["bypassed"],
+                    stats["errors"],
+                ),
+            )
+            write_line(
+                result,
+                "Fetched {} bytes in {} reads, {} pages cached".format(
+                    stats["bytes"], stats["reads"], reader.cached_pages
+                ),
+            )
+
+
+# Helpers
+
+
+class Direction(object):
+    DOWN = -1
+    UP = 1
+
+
+def print_frame_summary(result, frame):
+    """Print a short summary of a given Python frame: module and the line being executed."""
+
+    write_line(result, "  " + frame.to_pythonlike_string())
+    write_line(result, "    " + frame.line.strip())
+
+
+def select_closest_python_frame(debugger, direction=Direction.UP):
+    """Select and return the closest Python frame (or do nothing if the current frame is a Python frame)."""
+
+    target = debugger.GetSelectedTarget()
+    thread = target.GetProcess().GetSelectedThread()
+    frame = thread.GetSelectedFrame()
+
+    python_frame = PyFrameObject.from_frame(frame)
+    if python_frame is None:
+        return move_python_frame(debugger, direction)
+
+    return python_frame
+
+
+Region = collections.namedtuple("Region", "start end name writable")
+
+
+def memory_regions(process):
+    """Return a sorted list of readable memory regions of a process."""
+
+    regions = []
+    infos = process.GetMemoryRegions()
+    info = lldb.SBMemoryRegionInfo()
+    for i in range(infos.GetSize()):
+        if not infos.GetMemoryRegionAtIndex(i, info):
+            continue
+
+        if info.IsMapped() and info.IsReadable():
+            regions.append(
+                Region(
+                    info.GetRegionBase(),
+                    info.GetRegionEnd(),
+                    info.GetName() or "",
+                    info.IsWritable(),
+                )
+            )
+
+    return sorted(regions)
+
+
+def object_reader(target):
+    """Return an ObjectReader for an LLDB target.
+
+    The reader is created once per stop of the process, so that the cached
+    information about types is shared by all values displayed at a stop.
+    """
+
+    process = target.GetProcess()
+    stop_id, result = _object_readers.get(process.GetUniqueID(), (None, None))
+    if stop_id != process.GetStopID():
+        result = ObjectReader.from_target(target)
+        _store_per_process(_object_readers, process, (process.GetStopID(), result))
+
+    return result
+
+
+def address_map(process):
+    """Return the AddressMap of readable memory of a process.
+
+    The map is built once per stop of the process and is shared by all
+    commands.
+    """
+
+    stop_id, result = _address_maps.get(process.GetUniqueID(), (None, None))
+    if stop_id != process.GetStopID():
+        result = AddressMap(memory_regions(process))
+        _store_per_process(_address_maps, process, (process.GetStopID(), result))
+
+    return result
+
+
+def is_readable(process, addr, size=1):
+    """Check if the given range of memory of a process can be read.
+
+    Memory regions rarely go away, so an address range found in the map built
+    on one of the previous stops is assumed to be readable (if it is not, the
+    read itself fails, just slower). Otherwise, the map is rebuilt once per
+    stop. When memory regions can not be queried (e.g. the remote stub does
+    not support that), all addresses are considered readable.
+    """
+
+    cached = _address_maps.get(process.GetUniqueID())
+    if cached is not None and cached[1].contains(addr, size):
+        return True
+
+    current = address_map(process)
+    return not current or current.contains(addr, size)
+
+
+def heap_regions(regions):
+    """Filter memory regions that can contain dynamically allocated objects.
+
+    Those are the regions of the heap managed by malloc(), as well as the
+    anonymous writable mappings, which is where pymalloc arenas and large
+    allocations live.
+    """
+
+    return [r for r in regions if r.writable and r.name in ("", "[heap]")]
+
+
+# names of built-in types -> names of C symbols of the corresponding type objects
+BUILTIN_TYPE_SYMBOLS = {
+    "bool": "PyBool_Type",
+    "bytearray": "PyByteArray_Type",
+    "bytes": "PyBytes_Type",
+    "cell": "PyCell_Type",
+    "code": "PyCode_Type",
+    "complex": "PyComplex_Type",
+    "dict": "PyDict_Type",
+    "float": "PyFloat_Type",
+    "frame": "PyFrame_Type",
+    "frozenset": "PyFrozenSet_Type",
+    "function": "PyFunction_Type",
+    "int": "PyLong_Type",
+    "list": "PyList_Type",
+    "memoryview": "PyMemoryView_Type",
+    "module": "PyModule_Type",
+    "set": "PySet_Type",
+    "str": "PyUnicode_Type",
+    "tuple": "PyTuple_Type",
+    "type": "PyType_Type",
+}
+
+
+def siphash(k0, k1, data, c_rounds=2, d_rounds=4):
+    """Return the SipHash-c-d of bytes as an unsigned 64-bit integer.
+
+    This is a port of the implementation used by CPython (Python/pyhash.c).
+    """
+
+    mask = (1 << 64) - 1
+
+    def rotate(x, b):
+        return ((x << b) | (x >> (64 - b))) & mask
+
+    v0 = k0 ^ 0x736F6D6570736575
+    v1 = k1 ^ 0x646F72616E646F6D
+    v2 = k0 ^ 0x6C7967656E657261
+    v3 = k1 ^ 0x7465646279746573
+
+    def rounds(count, v0, v1, v2, v3):
+        for _ in range(count):
+            v0 = (v0 + v1) & mask
+            v1 = rotate(v1, 13) ^ v0
+            v0 = rotate(v0, 32)
+            v2 = (v2 + v3) & mask
+            v3 = rotate(v3, 16) ^ v2
+            v0 = (v0 + v3) & mask
+            v3 = rotate(v3, 21) ^ v0
+            v2 = (v2 + v1) & mask
+            v1 = rotate(v1, 17) ^ v2
+            v2 = rotate(v2, 32)
+
+        return v0, v1, v2, v3
+
+    tail = len(data) & ~7
+    for offset in range(0, tail, 8):
+        m = int.from_bytes(data[offset : offset + 8], "little")
+        v3 ^= m
+        v0, v1, v2, v3 = rounds(c_rounds, v0, v1, v2, v3)
+        v0 ^= m
+
+    b = ((len(data) & 0xFF) << 56) | int.from_bytes(data[tail:], "little")
+    v3 ^= b
+    v0, v1, v2, v3 = rounds(c_rounds, v0, v1, v2, v3)
+    v0 ^= b
+    v2 ^= 0xFF
+    v0, v1, v2, v3 = rounds(d_rounds, v0, v1, v2, v3)
+
+    return v0 ^ v1 ^ v2 ^ v3
+
+
+# the number of hex digits following escapes of characters by their code
+REGEX_ESCAPE_DIGITS = {"x": 2, "u": 4, "U": 8}
+# see sre_parse: \0 is followed by up to 2 octal digits, 3 octal digits are
+# an octal escape, otherwise 1 or 2 digits are a reference to a group
+REGEX_NUMERIC_ESCAPE_RE = re.compile(r"0[0-7]{0,2}|[0-7]{3}|[0-9]{1,2}")
+# {m}, {m,}, {,n} or {m,n} (the opening brace is already consumed)
+REGEX_REPEAT_RE = re.compile(r"(?=[0-9,])([0-9]*)(?:,[0-9]*)?\}")
+
+
+def regex_literal(pattern):
+    """Return the longest string that every match of a regular expression contains.
+
+    Only runs of literal characters outside of groups and character classes
+    are considered, and characters followed by a quantifier that allows zero
+    repetitions are excluded. Returns an empty string if the pattern does not
+    have a required literal part (e.g. it is an alternation).
+    """
+
+    runs, current = [], []
+    depth = 0
+    i = 0
+    while i < len(pattern):
+        c = pattern[i]
+        i += 1
+        if c == "\\":
+            escaped = pattern[i : i + 1]
+            i += 1
+            if escaped and not escaped.isalnum():
+                if not depth:
+                    current.append(escaped)
+                continue
+            # a character class (e.g. \d), an anchor (e.g. \b) or an escape
+            # of a character (e.g. \n or \x41): skip it along with its
+            # arguments, if any
+            if escaped in REGEX_ESCAPE_DIGITS:
+                i += REGEX_ESCAPE_DIGITS[escaped]
+            elif escaped == "N":
+                i = pattern.find("}", i) + 1 or len(pattern)
+            elif escaped.isdigit():
+                # an octal escape or a reference to a group
+                i = REGEX_NUMERIC_ESCAPE_RE.match(pattern, i - 1).end()
+        elif c == "[":
+            # skip the character class, a leading ] is a literal character
+            if pattern[i : i + 1] == "^":
+                i += 1
+            if pattern[i : i + 1] == "]":
+                i += 1
+            while i < len(pattern) and pattern[i] != "]":
+                i += 2 if pattern[i] == "\\" else 1
+            i += 1
+        elif c in "*?":
+            if current:
+                current.pop()
+        elif c == "{":
+            match = REGEX_REPEAT_RE.match(pattern, i)
+            if match is None:
+                # not a quantifier, but a literal {
+                if not depth:
+                    current.append(c)
+                continue
+
+            i = match.end()
+            # the preceding character is only optional if the minimum is 0
+            if not int(match.group(1) or 0) and current:
+                current.pop()
+        elif c == "|":
+            if not depth:
+                return ""
+        elif c == "(":
+            depth += 1
+        elif c == ")":
+            depth -= 1
+        elif c not in "+.^$" and not depth:
+            current.append(c)
+            continue
+
+        runs.append("".join(current))
+        current = []
+
+    runs.append("".join(current))
+    return max(runs, key=len)
+
+
+def object_pointer(target, addr, name="value"):
+    """Return an LLDB value of type PyObject* pointing to addr w/o reading memory."""
+
+    if target.GetAddressByteSize() == 8:
+        create_data = lldb.SBData.CreateDataFromUInt64Array
+    else:
+        create_data = lldb.SBData.CreateDataFromUInt32Array
+    data = create_data(target.GetByteOrder(), target.GetAddressByteSize(), [addr])
+
+    return target.CreateValueFromData(
+        name, data, target.FindFirstType("PyObject").GetPointerType()
+    )
+
+
+def data_symbol_addresses(target, name):
+    """Return a sorted list of load addresses of data symbols with the given name."""
+
+    symbols = target.FindSymbols(name)
+    addresses = {
+        symbol.GetStartAddress().GetLoadAddress(target)
+        for symbol in (
+            symbols.GetContextAtIndex(i).GetSymbol() for i in range(symbols.GetSize())
+        )
+        if symbol.GetType() == lldb.eSymbolTypeData
+    }
+    addresses.discard(lldb.LLDB_INVALID_ADDRESS)
+
+    return sorted(addresses)
+
+
+def registered_type_addresses(target):
+    """Return a dict of type object address -> decoder registered by a C symbol name.
+
+    Static type objects never move, so symbols are only resolved again when
+    modules are loaded or unloaded (e.g. an extension module is imported).
+    """
+
+    process = target.GetProcess()
+    modules, table = _registered_types.get(process.GetUniqueID(), (None, None))
+    if modules != target.GetNumModules():
+        table = {
+            addr: decoder
+            for name, decoder in _decoders.items()
+            for addr in data_symbol_addresses(target, name)
+        }
+        _store_per_process(_registered_types, process, (target.GetNumModules(), table))
+
+    return table
+
+
+def immortal_objects(target):
+    """Return a dict of address -> (type name, value) of objects with fixed addresses.
+
+    None, True, False, Ellipsis, small ints, the empty tuple, as well as the
+    empty and single-character str and bytes objects are statically allocated
+    by the interpreter, so they can be recognized by pointer equality without
+    reading any memory. The table is built once per process.
+    """
+
+    process = target.GetProcess()
+    table = _immortal_objects.get(process.GetUniqueID())
+    if table is None:
+        table = _store_per_process(
+            _immortal_objects, process, _find_immortal_objects(target)
+        )
+
+    return table
+
+
+def _find_immortal_objects(target):
+    table = {}
+
+    for symbol, typename, value in (
+        ("_Py_NoneStruct", "NoneType", None),
+        ("_Py_TrueStruct", "bool", True),
+        ("_Py_FalseStruct", "bool", False),
+        ("_Py_EllipsisObject", "ellipsis", Ellipsis),
+    ):
+        for addr in data_symbol_addresses(target, symbol):
+            table[addr] = (typename, value)
+
+    def add_array(array, typename, values):
+        if not array.IsValid() or not array.GetType().IsArrayType():
+            return
+
+        base = array.GetLoadAddress()
+        if base == lldb.LLDB_INVALID_ADDRESS:
+            return
+
+        stride = array.GetType().GetArrayElementType().GetByteSize()
+        for i, value in enumerate(values):
+            table[base + i * stride] = (typename, value)
+
+    def add_object(sbvalue, typename, value):
+        addr = sbvalue.GetLoadAddress() if sbvalue.IsValid() else None
+        if addr not in (None, lldb.LLDB_INVALID_ADDRESS):
+            table[addr] = (typename, value)
+
+    runtime = target.FindFirstGlobalVariable("_PyRuntime")
+    for path in (".static_objects.singletons", ".global_objects.singletons"):
+        singletons = runtime.GetValueForExpressionPath(path)
+        if singletons.IsValid():
+            # CPython 3.11+ keeps all of them in _PyRuntime
+            small_ints = singletons.GetChildMemberWithName("small_ints")
+            add_array(small_ints, "int", range(-5, small_ints.GetNumChildren() - 5))
+            add_object(singletons.GetChildMemberWithName("tuple_empty"), "tuple", ())
+            add_object(singletons.GetChildMemberWithName("bytes_empty"), "bytes", b"")
+            add_array(
+                singletons.GetChildMemberWithName("bytes_characters"),
+                "bytes",
+                (bytes([i]) for i in range(256)),
+            )
+
+            strings = singletons.GetChildMemberWithName("strings")
+            add_array(
+                strings.GetChildMemberWithName("ascii"),
+                "str",
+                (chr(i) for i in range(128)),
+            )
+            add_array(
+                strings.GetChildMemberWithName("latin1"),
+                "str",
+                (chr(i) for i in range(128, 256)),
+            )
+            for name in ("_py_empty", "_empty"):
+                add_object(
+                    strings.GetValueForExpressionPath(".literals." + name), "str", ""
+                )
+            break
+    else:
+        # before CPython 3.9, small ints are allocated statically too. In 3.9
+        # and 3.10 they are allocated per interpreter, and so are the other
+        # singletons, so those are not included
+        small_ints = target.FindFirstGlobalVariable("small_ints")
+        add_array(small_ints, "int", range(-5, small_ints.GetNumChildren() - 5))
+
+    return table
+
+
+def find_type_addresses(target, name):
+    """Return the addresses of type objects given a type name or a C symbol name.
+
+    Built-in types and static types defined in extension modules are found
+    by the names of their symbols (e.g. "PyUnicode_Type"); classes defined in
+    Python code are found by walking the objects tracked by the GC, so
+    there can be more than one with the same name.
+    """
+
+    addresses = data_symbol_addresses(target, BUILTIN_TYPE_SYMBOLS.get(name, name))
+    if addresses:
+        return addresses
+
+    heap = GCHeap.from_target(target)
+    return [
+        addr
+        for addr, ob_type, _ in heap.headers()
+        if heap.builtin_type(ob_type) == "type" and heap.type_info(addr).name == name
+    ]
+
+
+def object_address(debugger, expression):
+    """Return the address of a Python object given by an expression.
+
+    The expression is either an address, a name of a variable visible in the
+    selected Python frame (local variables take precedence over globals), or
+    an arbitrary LLDB expression evaluated in the selected native frame.
+    """
+
+    try:
+        return int(expression, 0)
+    except ValueError:
+        pass
+
+    frame = select_closest_python_frame(debugger, direction=Direction.UP)
+    if frame is not None:
+        for name, value in frame.fast_locals():
+            if name == expression and value is not None:
+                return value.unsigned
+
+        for namespace in ("f_locals", "f_globals"):
+            mapping = frame.child(namespace)
+            if mapping.unsigned == 0:
+                continue
+
+            for k, v in PyDictObject(mapping).entries():
+                if PyObject.from_value(k).value == expression:
+                    return v.unsigned
+
+    target = debugger.GetSelectedTarget()
+    value = (
+        target.GetProcess()
+        .GetSelectedThread()
+        .GetSelectedFrame()
+        .EvaluateExpression(expression)
+    )
+    if not value.GetError().Success():
+        raise ValueError(
+            "Failed to resolve {}: {}".format(expression, value.GetError().GetCString())
+        )
+
+    return value.GetValueAsUnsigned()
+
+
+def move_python_frame(debugger, direction):
+    """Select the next Python frame up or down the call stack."""
+
+    target = debugger.GetSelectedTarget()
+    thread = target.GetProcess().GetSelectedThread()
+
+    current_frame = thread.GetSelectedFrame()
+    if direction == Direction.UP:
+        index_range = range(current_frame.idx + 1, thread.num_frames)
+    else:
+        index_range = reversed(range(0, current_frame.idx))
 
-        Subclasses are expected to override this property in order to add
-        additional commands to the provided ArgumentParser instance.
-        """
+    for index in index_range:
+        python_frame = PyFrameObject.from_frame(thread.GetFrameAtIndex(index))
+        if python_frame is not None:
+            thread.SetSelectedFrame(index)
+            return python_frame
 
-        return argparse.ArgumentParser(
-            prog=self.command,
-            description=self.get_long_help(),
-            formatter_class=argparse.RawDescriptionHelpFormatter,
-        )
 
-    @property
-    @abc.abstractmethod
-    def command(self):
-        """Command name.
+def collapse_repeated(items, cutoff=RECURSIVE_CUTOFF):
+    """Collapse runs of equal consecutive items.
 
-        This name will be used by LLDB in order to uniquely identify an
-        implementation that should be executed when a command is run
-        in the REPL.
-        """
+    Yields (item, repeated) pairs, where the first `cutoff` items of a run are
+    yielded as is, and the number of the remaining items of the run is
+    reported as `repeated` of the last one that was yielded.
+    """
 
-    @abc.abstractmethod
-    def execute(self, debugger, args, result):
-        """Implementation of the command.
+    for item, group in itertools.groupby(items):
+        count = sum(1 for _ in group)
+        shown = min(count, cutoff)
+        for i in range(shown):
+            yield item, (count - shown if i == shown - 1 else 0)
 
-        Subclasses override this method to implement the logic of a given
-        command, e.g. printing a stacktrace. The command output should be
-        communicated back via the provided result object, so that it's
-        properly routed to LLDB frontend. Any unhandled exception will be
-        automatically transformed into proper errors.
 
-        Args:
-            debugger: lldb.SBDebugger: the primary interface to LLDB scripting
-            args: argparse.Namespace: an object holding parsed command arguments
-            result: lldb.SBCommandReturnObject: a container which holds the
-                    result from command execution
-        """
+def parse_duration(string):
+    """Convert a duration like 10ms, 1.5s or 2m to a number of seconds."""
 
+    match = re.match(r"^\s*(\d+(?:\.\d*)?)\s*(us|ms|s|m)?\s*$", string)
+    if match is None:
+        raise argparse.ArgumentTypeError("invalid duration: {}".format(string))
 
-class PyBt(Command):
-    """Print a Python-level call trace of the selected thread."""
+    number, unit = match.groups()
+    return float(number) * {"us": 1e-6, "ms": 1e-3, "s": 1, "m": 60}[unit or "s"]
 
-    command = "py-bt"
 
-    def execute(self, debugger, args, result):
-        target = debugger.GetSelectedTarget()
-        thread = target.GetProcess().GetSelectedThread()
+def memory_reader(process):
+    """Return a MemoryReader for an LLDB process.
 
-        pystack = PyFrameObject.get_pystack(thread)
+    Readers are reused across commands; unless disabled, memory reads are
+    cached until the process is resumed.
+    """
 
-        lines = []
-        for pyframe in reversed(pystack):
-            lines.append("  " + pyframe.to_pythonlike_string())
-            lines.append("    " + pyframe.line.strip())
+    reader = _memory_readers.get(process.GetUniqueID())
+    if reader is None:
+        reader = LLDBMemoryReader(process)
+
+        core_file = _core_file_path(process)
+        if core_file is not None:
+            # reading a memory mapped file is faster than any caching
+            try:
+                reader = CoreFileMemoryReader(core_file, fallback=reader)
+            except (IOError, ValueError):
+                pass
+        if isinstance(reader, LLDBMemoryReader) and MEMORY_CACHE_SETTINGS["enabled"]:
+            reader = CachingMemoryReader(
+                reader,
+                page_size=MEMORY_CACHE_SETTINGS["page_size"],
+                readahead=MEMORY_CACHE_SETTINGS["readahead"],
+                max_pages=MEMORY_CACHE_SETTINGS["max_pages"],
+                generation=process.GetStopID,
+            )
 
-        if lines:
-            write_line(result, "Traceback (most recent call last):")
-            write_line(result, "\n".join(lines))
-        else:
-            write_line(result, "No Python traceback found")
+        _store_per_process(_memory_readers, process, reader)
 
+    return reader
 
-class PyList(Command):
-    """List the source code of the Python module that is currently being executed.
 
-    Use
+def flush_memory_caches(process):
+    """Drop everything read from the memory of a process at the current stop.
 
-        py-list
+    Caches are normally dropped when the process is resumed. This is needed
+    when memory is modified while the process is stopped, e.g. by
+    `memory write` or by evaluating an expression.
+    """
 
-    to list the source code around (5 lines before and after) the line that is
-    currently being executed.
+    key = process.GetUniqueID()
+    reader = _memory_readers.get(key)
+    if isinstance(reader, CachingMemoryReader):
+        reader.clear()
 
+    for cache in (_object_readers, _address_maps, _referrers_indexes):
+        cache.pop(key, None)
 
-    Use
 
-        py-list start
+def _store_per_process(cache, process, value):
+    """Store a value in a cache keyed by LLDB process unique id.
 
-    to list the source code starting at a different line number.
+    When a new process is added, the entries of processes that have exited or
+    have been replaced (e.g. when a target is re-launched) are dropped, so that
+    their cached memory is not kept around for the lifetime of LLDB.
+    """
 
+    key = process.GetUniqueID()
+    if key not in cache:
+        live = _live_process_ids(process)
+        for stale in [k for k in cache if k not in live]:
+            entry = cache.pop(stale)
+            if isinstance(entry, MemoryReader):
+                entry.close()
 
-    Use
+    cache[key] = value
+    return value
 
-        py-list start end
 
-    to list the source code within a specific range of lines.
-    """
+def _live_process_ids(process):
+    """Return the unique ids of the processes of all targets of a debugger."""
 
-    command = "py-list"
+    debugger = process.GetTarget().GetDebugger()
+    rv = {process.GetUniqueID()}
+    for i in range(debugger.GetNumTargets()):
+        other = debugger.GetTargetAtIndex(i).GetProcess()
+        if other.IsValid() and other.GetState() not in (
+            lldb.eStateDetached,
+            lldb.eStateExited,
+        ):
+            rv.add(other.GetUniqueID())
 
-    @property
-    def argument_parser(self):
-        parser = super(PyList, self).argument_parser
+    return rv
 
-        parser.add_argument("linenum", nargs="*", type=int, default=[0, 0])
 
-        return parser
+def _core_file_path(process):
+    """Return the path to the ELF core file the process was loaded from (or None)."""
 
-    @staticmethod
-    def linenum_range(current_line_num, specified_range):
-        if len(specified_range) == 2:
-            start, end = specified_range
-        elif len(specified_range) == 1:
-            start = specified_range[0]
-            end = start + 10
-        else:
-            start = None
-            end = None
+    if process.GetPluginName() != "elf-core":
+        return None
 
-        start = start or max(current_line_num - 5, 1)
-        end = end or (current_line_num + 5)
+    # SBProcess.GetCoreFile() is only available in newer versions of LLDB
+    get_core_file = getattr(process, "GetCoreFile", None)
+    if get_core_file is None:
+        return None
 
-        return start, end
+    core_file = get_core_file()
+    return core_file.fullpath if core_file.IsValid() else None
 
-    def execute(self, debugger, args, result):
-        # optional arguments allow to list the source code within a specific range
-        # of lines instead of the context around the line that is being executed
-        linenum_range = args.linenum
-        if len(linenum_range) > 2:
-            write_line(result, "Usage: py-list [start [end]]")
-            return
 
-        # find the most recent Python frame in the callstack of the selected thread
-        current_frame = select_closest_python_frame(debugger)
-        if current_frame is None:
-            write_line(result, "<source code is not available>")
-            return
+# settings of the CachingMemoryReader of each process (can be changed via the
+# py-memory-cache command)
+MEMORY_CACHE_SETTINGS = {
+    "enabled": True,
+    "page_size": 16 * 1024,
+    "readahead": 4,
+    "max_pages": 4096,
+}
 
-        # determine the location of the module and the exact line that is currently
-        # being executed
-        filename = current_frame.filename
-        current_line_num = current_frame.line_number
 
-        # default to showing the context around the current line, unless overridden
-        start, end = PyList.linenum_range(current_line_num, linenum_range)
-        try:
-            encoding = source_file_encoding(filename)
-            lines = source_file_lines(filename, start, end + 1, encoding=encoding)
-            for i, line in enumerate(lines, start):
-                # highlight the current line
-                if i == current_line_num:
-                    prefix = ">{}".format(i)
-                else:
-                    prefix = "{}".format(i)
+# Per-process caches below are filled via _store_per_process(), which drops the
+# entries of processes that are gone.
 
-                write_line(result, "{:>5}    {}".format(prefix, line.rstrip()))
-        except IOError:
-            write_line(result, "<source code is not available>")
 
+# LLDB process unique id -> (stop id, index built by GCHeap.referrers_index)
+_referrers_indexes = {}
 
-class PyUp(Command):
-    """Select an older Python stack frame."""
 
-    command = "py-up"
+# LLDB process unique id -> MemoryReader
+_memory_readers = {}
 
-    def execute(self, debugger, args, result):
-        select_closest_python_frame(debugger, direction=Direction.UP)
 
-        new_frame = move_python_frame(debugger, direction=Direction.UP)
-        if new_frame is None:
-            write_line(result, "*** Oldest frame")
-        else:
-            print_frame_summary(result, new_frame)
+# LLDB process unique id -> (stop id, AddressMap)
+_address_maps = {}
 
 
-class PyDown(Command):
-    """Select a newer Python stack frame."""
+# LLDB process unique id -> (stop id, ObjectReader) built by object_reader()
+_object_readers = {}
 
-    command = "py-down"
 
-    def execute(self, debugger, args, result):
-        select_closest_python_frame(debugger, direction=Direction.DOWN)
+# LLDB process unique id -> {address: (type name, value)} built by immortal_objects()
+_immortal_objects = {}
 
-        new_frame = move_python_frame(debugger, direction=Direction.DOWN)
-        if new_frame is None:
-            write_line(result, "*** Newest frame")
-        else:
-            print_frame_summary(result, new_frame)
 
+# type name or C symbol name -> decoder registered by register_decoder()
+_decoders = {}
 
-class PyLocals(Command):
-    """Print the values of local variables in the selected Python frame."""
 
-    command = "py-locals"
+# LLDB process unique id -> (number of modules, {type object address: decoder})
+# built by registered_type_addresses()
+_registered_types = {}
 
-    def execute(self, debugger, args, result):
-        current_frame = select_closest_python_frame(debugger, direction=Direction.UP)
-        if current_frame is None:
-            write_line(result, "No locals found (symbols might be missing!)")
-            return
 
-        # merge logic is based on the implementation of PyFrame_LocalsToFast()
-        merged_locals = {}
+def parse_size(string):
+    """Convert a size like 4096, 16K or 64KiB to a number of bytes."""
 
-        # f_locals contains top-level declarations (e.g. functions or classes)
-        # of a frame executing a Python module, rather than a function
-        f_locals = current_frame.child("f_locals")
-        if f_locals.unsigned != 0:
-            for k, v in PyDictObject(f_locals).value.items():
-                merged_locals[k.value] = v
+    match = re.match(r"^\s*(\d+)\s*(?:([KMG])(?:i?B)?)?\s*$", string, re.IGNORECASE)
+    if match is None:
+        raise argparse.ArgumentTypeError("invalid size: {}".format(string))
 
-        # f_localsplus stores local variables and arguments of function frames
-        fast_locals = current_frame.child("f_localsplus")
-        f_code = PyCodeObject(current_frame.child("f_code"))
-        varnames = PyTupleObject(f_code.child("co_varnames"))
-        for i, name in enumerate(varnames.value):
-            value = fast_locals.GetChildAtIndex(i, 0, True)
-            if value.unsigned != 0:
-                merged_locals[name.value] = PyObject.from_value(value).value
-            else:
-                merged_locals.pop(name, None)
+    number, unit = match.groups()
+    return int(number) * 1024 ** ("KMG".index(unit.upper()) + 1 if unit else 0)
 
-        for name in sorted(merged_locals.keys()):
-            write_line(result, "{} = {}".format(name, repr(merged_locals[name])))
 
+def add_budget_arguments(parser):
+    """Add the options controlling the Budget of decoding a single value."""
 
-# Helpers
+    parser.add_argument(
+        "--max-items",
+        type=int,
+        default=1000,
+        help="the maximum number of items of containers to decode (default: 1000)",
+    )
+    parser.add_argument(
+        "--max-bytes",
+        type=int,
+        default=64 * 1024,
+        help="the maximum number of bytes of strings to decode (default: 65536)",
+    )
 
 
-class Direction(object):
-    DOWN = -1
-    UP = 1
+def add_paging_arguments(parser):
+    """Add the options for filtering and paging long listings of names."""
 
+    parser.add_argument(
+        "--filter",
+        action="append",
+        default=[],
+        metavar="GLOB",
+        help="only list the names matching the glob pattern (can be repeated)",
+    )
+    parser.add_argument(
+        "--page", type=int, default=1, help="the page to list (default: 1)"
+    )
+    parser.add_argument(
+        "--page-size",
+        type=int,
+        default=100,
+        help="the number of names per page (default: 100)",
+    )
 
-def print_frame_summary(result, frame):
-    """Print a short summary of a given Python frame: module and the line being executed."""
 
-    write_line(result, "  " + frame.to_pythonlike_string())
-    write_line(result, "    " + frame.line.strip())
+def select_page(names, args):
+    """Return a tuple of (names on the page, number of pages, number of names).
 
+    Names are filtered using the --filter patterns and sorted before paging.
+    """
 
-def select_closest_python_frame(debugger, direction=Direction.UP):
-    """Select and return the closest Python frame (or do nothing if the current frame is a Python frame)."""
+    if args.page < 1 or args.page_size < 1:
+        raise ValueError("--page and --page-size must be positive")
 
-    target = debugger.GetSelectedTarget()
-    thread = target.GetProcess().GetSelectedThread()
-    frame = thread.GetSelectedFrame()
+    names = sorted(
+        name
+        for name in names
+        if not args.filter
+        or any(fnmatch.fnmatchcase(name, pattern) for pattern in args.filter)
+    )
+    pages = max(1, -(-len(names) // args.page_size))
+    start = (args.page - 1) * args.page_size
 
-    python_frame = PyFrameObject.from_frame(frame)
-    if python_frame is None:
-        return move_python_frame(debugger, direction)
+    return names[start : start + args.page_size], pages, len(names)
 
-    return python_frame
 
+def write_line(result, string):
+    result.write(string + "\n")
 
-def move_python_frame(debugger, direction):
-    """Select the next Python frame up or down the call stack."""
 
-    target = debugger.GetSelectedTarget()
-    thread = target.GetProcess().GetSelectedThread()
+def print_heap_histogram(histogram, out, top=20, sort="size"):
+    """Print a table of types with the largest total size or number of objects."""
 
-    current_frame = thread.GetSelectedFrame()
-    if direction == Direction.UP:
-        index_range = range(current_frame.idx + 1, thread.num_frames)
-    else:
-        index_range = reversed(range(0, current_frame.idx))
+    key = 1 if sort == "size" else 0
+    rows = sorted(histogram.items(), key=lambda item: item[1][key], reverse=True)
 
-    for index in index_range:
-        python_frame = PyFrameObject.from_frame(thread.GetFrameAtIndex(index))
-        if python_frame is not None:
-            thread.SetSelectedFrame(index)
-            return python_frame
+    write_line(out, "{:>10} {:>12}  {}".format("Count", "Size", "Type"))
+    for name, (count, size) in rows[:top]:
+        write_line(out, "{:>10} {:>12}  {}".format(count, size, name))
+    write_line(
+        out,
+        "Total: {} objects, {} bytes in {} types".format(
+            sum(count for count, _ in histogram.values()),
+            sum(size for _, size in histogram.values()),
+            len(histogram),
+        ),
+    )
 
 
-def write_line(result, string):
-    result.write(string + "\n")
+def print_heap_diff(old, new, out, top=20, sort="size"):
+    """Print a table of types that grew the most between two heap histograms."""
+
+    diff = {}
+    for name in set(old) | set(new):
+        old_count, old_size = old.get(name, (0, 0))
+        new_count, new_size = new.get(name, (0, 0))
+        if (old_count, old_size) != (new_count, new_size):
+            diff[name] = (new_count - old_count, new_size - old_size)
+
+    key = 1 if sort == "size" else 0
+    rows = sorted(diff.items(), key=lambda item: item[1][key], reverse=True)
+
+    write_line(out, "{:>10} {:>12}  {}".format("Count", "Size", "Type"))
+    for name, (count, size) in rows[:top]:
+        write_line(out, "{:>+10} {:>+12}  {}".format(count, size, name))
+    write_line(
+        out,
+        "Total: {:+} objects, {:+} bytes".format(
+            sum(count for count, _ in new.values())
+            - sum(count for count, _ in old.values()),
+            sum(size for _, size in new.values())
+            - sum(size for _, size in old.values()),
+        ),
+    )
 
 
 def source_file_encoding(filename):
@@ -1180,7 +7101,182 @@ def pretty_printer(value, internal_dict):
         type_name = value.type.name
 
     v = pretty_printer._cpython_structs.get(type_name, PyObject.from_value)(value)
-    return repr(v)
+    # summaries are computed for every value shown in an IDE, so huge containers
+    # are truncated. Their items can be browsed as synthetic children instead
+    with Budget():
+        return repr(v)
+
+
+class PyObjectChildrenProvider(object):
+    """Provide synthetic children of Python containers and instances to LLDB.
+
+    This allows for expanding the items of lists, tuples, dicts, sets and
+    deques, as well as the attributes of instances, e.g. in IDEs. The number
+    of children is read from the object header, and each child is only
+    created when LLDB asks for it, so that browsing a huge container only
+    reads the memory of the items that are displayed.
+    """
+
+    # the number of items of dicts, sets and deques to read at once
+    CHUNK_SIZE = 256
+
+    def __init__(self, valobj, internal_dict):
+        self.valobj = valobj
+        self.update()
+
+    def update(self):
+        self.kind = None
+        self.count = 0
+        # items read so far as (name, address) pairs; all of them for instances
+        self._rows = []
+        # the row of the hash table of a dict or a set to continue reading at
+        self._next_row = 0
+
+        try:
+            self._update()
+        except Exception:
+            # e.g. a pointer to freed memory or an uninitialized variable
+            self.kind = None
+            self.count = 0
+
+        # the state is not reused across stops
+        return False
+
+    def _update(self):
+        valobj = self.valobj
+        if valobj.TypeIsPointerType():
+            self.addr = valobj.unsigned
+        else:
+            self.addr = valobj.GetLoadAddress()
+
+        process = valobj.GetProcess()
+        if not self.addr or not is_readable(process, self.addr):
+            return
+
+        self.target = valobj.GetTarget()
+        self.reader = reader = object_reader(self.target)
+        ob_type = reader.type_of(self.addr)
+        if not is_readable(process, ob_type):
+            return
+
+        builtin = reader.builtin_type(ob_type)
+        if builtin in ("list", "tuple"):
+            self.kind = "sequence"
+            self.count = reader.slots(self.addr, ob_type)[0][1]
+        elif builtin == "dict" and reader.layout.has("PyDictObject.ma_used"):
+            self.kind = "dict"
+            self.count = reader._int(self.addr, "PyDictObject.ma_used", signed=True)
+        elif builtin in ("set", "frozenset") and reader.layout.has("PySetObject.used"):
+            self.kind = "set"
+            self.count = reader._int(self.addr, "PySetObject.used", signed=True)
+        elif builtin == "collections.deque" and reader.layout.has("block.data"):
+            self.kind = "deque"
+            self.count = reader._int(self.addr, "PyVarObject.ob_size", signed=True)
+        elif builtin is None:
+            self.kind = "instance"
+            self._rows = reader.instance_attributes(self.addr)
+            self.count = len(self._rows)
+
+    def has_children(self):
+        return self.count > 0
+
+    def num_children(self, max_children=None):
+        return self.count
+
+    def get_child_index(self, name):
+        if self.kind == "sequence":
+            match = re.match(r"^\[(\d+)\]$", name)
+            return int(match.group(1)) if match else -1
+
+        for index, (row_name, _) in enumerate(self._rows):
+            if row_name == name:
+                return index
+
+        return -1
+
+    def get_child_at_index(self, index):
+        if not 0 <= index < self.count:
+            return None
+
+        try:
+            if self.kind == "sequence":
+                base, _, stride = self.reader.slots(
+                    self.addr, self.reader.type_of(self.addr)
+                )[0]
+                return self.valobj.CreateValueFromAddress(
+                    "[{}]".format(index),
+                    base + index * stride,
+                    self.target.FindFirstType("PyObject").GetPointerType(),
+                )
+
+            while len(self._rows) <= index and self._read_rows():
+                pass
+            name, addr = self._rows[index]
+            return object_pointer(self.target, addr, name)
+        except Exception:
+            return None
+
+    def _read_rows(self):
+        """Read the next chunk of items; return False if there are no more."""
+
+        offset = len(self._rows)
+        if self.kind in ("dict", "set"):
+            # items are found by table rows, as the tables have holes
+            read = (
+                self.reader.dict_rows if self.kind == "dict" else self.reader.set_rows
+            )
+            entries = read(self.addr, self._next_row, self.CHUNK_SIZE)
+            if entries:
+                # the next chunk starts after the row of the last item
+                self._next_row = entries[-1][0] + 1
+
+        if self.kind == "dict":
+            rows = []
+            for _, (key, value) in entries:
+                with Budget(max_items=10, max_bytes=256):
+                    key = repr(PyObject.from_value(object_pointer(self.target, key)))
+                rows.append(("[{}]".format(key), value))
+        elif self.kind == "set":
+            rows = [
+                ("[{}]".format(offset + i), key) for i, (_, key) in enumerate(entries)
+            ]
+        elif self.kind == "deque":
+            rows = [
+                ("[{}]".format(offset + i), item)
+                for i, item in enumerate(
+                    self.reader.deque_items(self.addr, offset, self.CHUNK_SIZE)
+                )
+            ]
+        else:
+            rows = []
+
+        self._rows.extend(rows)
+        return bool(rows)
+
+
+def register_decoder(type_name, decoder):
+    """Register a function that decodes the objects of a type for display.
+
+    type_name is either the tp_name of the type (e.g. "ringbuf.RingBuffer")
+    or the name of the C symbol of a static type object (e.g.
+    "RingBuffer_Type"). decoder is called with a PyObject and returns a value,
+    whose repr is displayed. It can use the same facilities as the built-in
+    decoders: obj.memory (cached bulk reads), obj.reader (an ObjectReader),
+    obj.decode(addr) for the objects referenced by the decoded one, and
+    Budget.take_items() / Budget.take_bytes() to limit the size of the value.
+
+    Registered decoders take precedence over the built-in ones. Instances of
+    subclasses of the registered type are not affected. Passing None as the
+    decoder removes the one registered for type_name, if any.
+    """
+
+    if decoder is None:
+        _decoders.pop(type_name, None)
+    else:
+        _decoders[type_name] = decoder
+    # type objects are resolved again on next use
+    _registered_types.clear()
+    _object_readers.clear()
 
 
 def register_summaries(debugger):
@@ -1207,6 +7303,115 @@ def register_summaries(debugger):
     pretty_printer._cpython_structs = cpython_structs
 
 
+def register_synthetic_providers(debugger):
+    # only the generic PyObject type and the structs of containers are covered,
+    # so that members of other structs (e.g. frames) are still displayed as is
+    debugger.HandleCommand(
+        "type synthetic add -l cpython_lldb.PyObjectChildrenProvider "
+        "PyObject _object PyListObject PyTupleObject PyDictObject PySetObject "
+        "dequeobject"
+    )
+
+
 def __lldb_init_module(debugger, internal_dict):
     register_summaries(debugger)
+    register_synthetic_providers(debugger)
     register_commands(debugger)
+
+
+# Standalone mode
+
+
+def dump_stacks(reader, out):
+    """Print Python call stacks of all threads, similarly to py-bt."""
+
+    for tstate in reader.thread_states():
+        out.write(
+            "Thread {:#x} (most recent call last):\n".format(reader.thread_id(tstate))
+        )
+        try:
+            frames = list(reader.frames(reader.current_frame(tstate)))
+            for frame in reversed(frames):
+                out.write(
+                    '  File "{}", line {}, in {}\n'.format(
+                        *reader.frame_location(frame)
+                    )
+                )
+        except MemoryReadError as e:
+            out.write("  <failed to read the call stack: {}>\n".format(e))
+        out.write("\n")
+
+
+def main(argv=None):
+    """Entry point of the standalone mode: python -m cpython_lldb <command>."""
+
+    parser = argparse.ArgumentParser(
+        prog="python -m cpython_lldb",
+        description="Inspect the state of CPython processes w/o LLDB.",
+    )
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    dump_parser = subparsers.add_parser(
+        "dump",
+        help="print Python call stacks of all threads of a live process or a core file",
+    )
+    dump_parser.add_argument("target", help="a pid or a path to an ELF core file")
+    dump_parser.add_argument(
+        "--layout",
+        help=(
+            "a layout file produced by the layout command. If not specified, "
+            "the layout is extracted from the debugging symbols (requires LLDB)"
+        ),
+    )
+
+    layout_parser = subparsers.add_parser(
+        "layout",
+        help="save the layout of CPython structs extracted from debugging symbols",
+    )
+    layout_parser.add_argument("executable", help="path to a CPython executable")
+    layout_parser.add_argument("output", help="path to the layout file")
+
+    diff_parser = subparsers.add_parser(
+        "heap-diff",
+        help="compare two heap snapshots saved by py-heap --save",
+    )
+    diff_parser.add_argument("old", help="path to the older snapshot")
+    diff_parser.add_argument("new", help="path to the newer snapshot")
+    diff_parser.add_argument(
+        "--top", type=int, default=20, help="the number of types to print"
+    )
+    diff_parser.add_argument("--sort", choices=("size", "count"), default="size")
+
+    args = parser.parse_args(argv)
+    try:
+        if args.command == "layout":
+            Layout.from_executable(args.executable).save(args.output)
+        elif args.command == "heap-diff":
+            print_heap_diff(
+                HeapSnapshot(args.old).histogram(),
+                HeapSnapshot(args.new).histogram(),
+                sys.stdout,
+                top=args.top,
+                sort=args.sort,
+            )
+        elif args.command == "dump":
+            layout = Layout.load(args.layout) if args.layout else None
+            if args.target.isdigit():
+                memory = ProcessMemoryReader(int(args.target))
+                executable = os.readlink("/proc/{}/exe".format(args.target))
+            else:
+                memory = CoreFileMemoryReader(args.target)
+                # the executable is always the first mapped file
+                executable = memory.mapped_files()[0][3]
+
+            with memory:
+                if layout is None:
+                    layout = Layout.from_executable(executable)
+
+                dump_stacks(PyStackReader.from_memory(memory, layout), sys.stdout)
+    except (IOError, IndexError, MemoryReadError, RuntimeError, ValueError) as e:
+        parser.exit(1, "{}: error: {}\n".format(parser.prog, e))
+
+
+if __name__ == "__main__":
+    main()
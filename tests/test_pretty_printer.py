@@ -120,6 +120,41 @@ def test_tuple(lldb):
     )
 
 
+def test_immortal_objects(lldb):
+    value = (None, True, False, -5, 0, 256, "", "a", "\xe9", b"", b"x", ())
+    assert_lldb_repr(lldb, value, re.escape(repr(value)))
+
+    code = """
+import io
+import sys
+
+objects = [(None, "NoneType"), (True, "bool"), (False, "bool"), (Ellipsis, "ellipsis")]
+if sys.version_info >= (3, 11):
+    objects += [(-5, "int"), (256, "int"), ((), "tuple"), ("a", "str"), (b"", "bytes")]
+elif sys.version_info < (3, 9):
+    objects += [(-5, "int"), (256, "int")]
+
+with io.open("objects.txt", "w") as f:
+    for obj, typename in objects:
+        f.write("{} {} {!r}\\n".format(hex(id(obj)), typename, obj))
+abs(1)
+"""
+    response = run_lldb(
+        lldb,
+        code=code,
+        breakpoint="builtin_abs",
+        commands=[
+            "script import cpython_lldb",
+            "script table = cpython_lldb.immortal_objects(lldb.target)",
+            "script print(all(table.get(int(addr, 16)) == (typename, eval(value)) "
+            "for addr, typename, value in (line.split(' ', 2) "
+            "for line in open('objects.txt').read().splitlines())))",
+        ],
+    )[-1]
+
+    assert response.strip() == "True"
+
+
 def test_set(lldb):
     assert_lldb_repr(lldb, set(), r"set\(\[\]\)")
     assert_lldb_repr(lldb, set([1, 2, 3]), r"set\(\[1, 2, 3\]\)")
@@ -287,6 +322,74 @@ def test_counter(lldb):
     )
 
 
+def test_bytearray(lldb):
+    assert_lldb_repr(lldb, bytearray(b"spam"), r"bytearray\(b'spam'\)")
+    assert_lldb_repr(
+        lldb,
+        None,
+        r"bytearray\(b'eggs'\)",
+        code_value="(lambda b: (b.__delitem__(slice(0, 2)), b)[1])(bytearray(b'--eggs'))",
+    )
+
+
+def test_array(lldb):
+    assert_lldb_repr(
+        lldb,
+        None,
+        r"array\('d', \[1\.5, 2\.0, -3\.25\]\)",
+        code_value="__import__('array').array('d', [1.5, 2.0, -3.25])",
+    )
+    assert_lldb_repr(
+        lldb,
+        None,
+        r"array\('H', \[1, 65535\]\)",
+        code_value="__import__('array').array('H', [1, 65535])",
+    )
+    assert_lldb_repr(
+        lldb, None, r"array\('b'\)", code_value="__import__('array').array('b')"
+    )
+    # lone surrogates can be stored in arrays of characters
+    assert_lldb_repr(
+        lldb,
+        None,
+        r"array\('u', 'a\\ud800b'\)",
+        code_value="__import__('array').array('u', 'a\\ud800b')",
+    )
+
+
+def test_memoryview(lldb):
+    assert_lldb_repr(
+        lldb,
+        None,
+        r"memoryview\(b'bcd'\)",
+        code_value="memoryview(b'abcdef')[1:4]",
+    )
+    # the items of strided views are not adjacent in memory
+    assert_lldb_repr(
+        lldb,
+        None,
+        r"memoryview\(b'fdb'\)",
+        code_value="memoryview(b'abcdef')[::-2]",
+    )
+    # multi-dimensional strided views are not decoded
+    assert_lldb_repr(
+        lldb,
+        None,
+        "'0x[0-9a-f]+'",
+        code_value="memoryview(b'abcdefghijkl').cast('B', (3, 4))[::2]",
+    )
+
+
+def test_deque(lldb):
+    assert_lldb_repr(lldb, None, r"deque\(\[1, 2, 3\]\)", code_value="deque([1, 2, 3])")
+    assert_lldb_repr(
+        lldb,
+        None,
+        r"deque\(\[98, 99\], maxlen=2\)",
+        code_value="deque(range(100), maxlen=2)",
+    )
+
+
 def test_unsupported(lldb):
     assert_lldb_repr(
         lldb, object(), "('0x[0-9a-f]+')|('No value')", code_value="object()"
@@ -334,3 +437,145 @@ def test_locals_c_extension(lldb):
     )
 
     assert actual == expected
+
+
+def test_user_defined_instances(lldb):
+    assert_lldb_repr(
+        lldb,
+        None,
+        r"Point\(x=1, y='two'\)",
+        code_value=(
+            "type('Point', (), "
+            "{'__init__': lambda self: self.__dict__.update(x=1, y='two')})()"
+        ),
+    )
+    assert_lldb_repr(
+        lldb,
+        None,
+        r"Pair\(a=1\)",
+        code_value=(
+            "(lambda p: (setattr(p, 'a', 1), p)[1])"
+            "(type('Pair', (), {'__slots__': ('a', 'b')})())"
+        ),
+    )
+    assert_lldb_repr(
+        lldb,
+        None,
+        r"Node\(parent=Node\(\.\.\.\)\)",
+        code_value="(lambda n: (setattr(n, 'parent', n), n)[1])(type('Node', (), {})())",
+    )
+    # the attributes are stored w/o creating the instance __dict__ (CPython >= 3.11)
+    assert_lldb_repr(
+        lldb,
+        None,
+        r"Vector\(x=1, y='two'\)",
+        code_value=(
+            "(lambda ns: (exec('class Vector:\\n def __init__(self):\\n"
+            "  self.x = 1\\n  self.y = \"two\"', ns), ns['Vector']())[1])({})"
+        ),
+    )
+    # C types created by PyType_FromSpec() are not decoded as instances
+    assert_lldb_repr(
+        lldb, None, "'0x[0-9a-f]+'", code_value="__import__('struct').Struct('i')"
+    )
+
+
+def test_synthetic_children(lldb):
+    code = """
+        import collections
+
+        import test_extension
+
+
+        class Point:
+            def __init__(self):
+                self.x = 1
+                self.y = 'two'
+
+
+        test_extension.identity(
+            [Point(), {'a': 1, 'b': [2]}, collections.deque([3, 4]), {5}, 42]
+        )
+    """
+    children = "[c.GetName() + '=' + c.GetSummary() for c in v.GetChildAtIndex({})]"
+    response = run_lldb(
+        lldb,
+        code=textwrap.dedent(code),
+        breakpoint="_identity",
+        commands=[
+            "script v = lldb.frame.FindVariable('v')",
+            "script print(v.GetNumChildren())",
+            "script print({})".format(children.format(0)),
+            "script print({})".format(children.format(1)),
+            "script print({})".format(children.format(2)),
+            "script print({})".format(children.format(3)),
+            "script print(v.GetChildAtIndex(4).GetNumChildren())",
+            "script print(v.GetChildAtIndex(0).GetNumChildren())",
+        ],
+    )
+    actual = [line.strip() for line in response[1:]]
+
+    assert actual == [
+        "5",
+        "['x=1', \"y='two'\"]",
+        "[\"['a']=1\", \"['b']=[2]\"]",
+        "['[0]=3', '[1]=4']",
+        "['[0]=5']",
+        "0",
+        "2",
+    ]
+
+
+def test_registered_decoders(lldb):
+    code = """
+        import test_extension
+
+
+        class Celsius:
+            def __init__(self):
+                self.degrees = 21
+
+
+        test_extension.identity([range(1, 10, 2), Celsius()])
+    """
+    # range objects store pointers to start, stop and step after the header
+    decode_range = (
+        "lambda obj: 'range({}, {}, {})'.format(*(obj.decode(p) for p in "
+        "obj.memory.read_pointers(obj.address + 16, 3)))"
+    )
+    decode_celsius = (
+        "lambda obj: '{}C'.format(obj.decode(obj.reader.attribute(obj.address, "
+        "'degrees')))"
+    )
+    try:
+        response = run_lldb(
+            lldb,
+            code=textwrap.dedent(code),
+            breakpoint="_identity",
+            commands=[
+                "script import cpython_lldb",
+                "script cpython_lldb.register_decoder('PyRange_Type', {})".format(
+                    decode_range
+                ),
+                "script cpython_lldb.register_decoder('Celsius', {})".format(
+                    decode_celsius
+                ),
+                "frame info",
+            ],
+        )[-1]
+    finally:
+        # the LLDB session is shared with the other tests
+        run_lldb(
+            lldb,
+            code="abs(1)",
+            breakpoint="builtin_abs",
+            commands=[
+                "script import cpython_lldb",
+                "script cpython_lldb.register_decoder('PyRange_Type', None)",
+                "script cpython_lldb.register_decoder('Celsius', None)",
+            ],
+        )
+
+    actual = [line for line in response.splitlines() if "frame #0" in line][-1]
+    match = re.search(r"v=(.*)\) at", actual)
+    assert match.group(1) == "[range(1, 10, 2), 21C]"
@@ -294,3 +294,77 @@ Traceback (most recent call last):
     )[-1]
     actual = response.rstrip()
     assert actual == backtrace
+
+
+RECURSION_CODE = """
+def f(n):
+    if n:
+        return f(n - 1)
+    return abs(n)
+
+f(10)
+""".lstrip()
+
+
+def test_recursion(lldb):
+    backtrace = """
+Traceback (most recent call last):
+  File "test.py", line 6, in <module>
+    f(10)
+  File "test.py", line 3, in f
+    return f(n - 1)
+  File "test.py", line 3, in f
+    return f(n - 1)
+  File "test.py", line 3, in f
+    return f(n - 1)
+  [Previous line repeated 7 more times]
+  File "test.py", line 4, in f
+    return abs(n)
+""".strip()
+
+    response = run_lldb(
+        lldb,
+        code=RECURSION_CODE,
+        breakpoint="builtin_abs",
+        commands=["py-bt"],
+    )[-1]
+    actual = response.rstrip()
+    assert actual == backtrace
+
+
+def test_limit(lldb):
+    backtrace = """
+Traceback (most recent call last):
+  File "test.py", line 3, in f
+    return f(n - 1)
+  File "test.py", line 4, in f
+    return abs(n)
+""".strip()
+
+    response = run_lldb(
+        lldb,
+        code=RECURSION_CODE,
+        breakpoint="builtin_abs",
+        commands=["py-bt -n 2"],
+    )[-1]
+    actual = response.rstrip()
+    assert actual == backtrace
+
+
+def test_skip(lldb):
+    backtrace = """
+Traceback (most recent call last):
+  File "test.py", line 6, in <module>
+    f(10)
+  File "test.py", line 3, in f
+    return f(n - 1)
+""".strip()
+
+    response = run_lldb(
+        lldb,
+        code=RECURSION_CODE,
+        breakpoint="builtin_abs",
+        commands=["py-bt --skip 10"],
+    )[-1]
+    actual = response.rstrip()
+    assert actual == backtrace
@@ -0,0 +1,82 @@
+import re
+
+from .conftest import run_lldb
+
+
+CODE = """
+class Marker(object):
+    __slots__ = ()
+
+
+markers = ["marker-%d" % i for i in range(1000)]
+instances = [Marker() for _ in range(10)]
+abs(1)
+""".lstrip()
+
+
+def found(response):
+    match = re.search(r"Found (\d+) object\(s\) of type", response)
+    return int(match.group(1))
+
+
+def test_builtin_type(lldb):
+    response = run_lldb(
+        lldb,
+        code=CODE,
+        breakpoint="builtin_abs",
+        commands=["py-find-type str --max 100000"],
+    )[-1]
+
+    assert found(response) >= 1000
+    values = set(re.findall(r"^0x[0-9a-f]+ '(marker-\d+)'$", response, re.MULTILINE))
+    assert values == {"marker-%d" % i for i in range(1000)}
+
+
+def test_symbol(lldb):
+    response = run_lldb(
+        lldb,
+        code=CODE,
+        breakpoint="builtin_abs",
+        commands=["py-find-type PyUnicode_Type --max 0"],
+    )[-1]
+
+    assert found(response) >= 1000
+    assert "'marker-" not in response
+
+
+def test_user_defined_type(lldb):
+    code = CODE.replace(
+        "abs(1)",
+        """
+with open("addresses.txt", "w") as f:
+    f.write(" ".join(hex(id(i)) for i in instances))
+
+abs(1)
+""".lstrip(),
+    )
+    response, addresses = run_lldb(
+        lldb,
+        code=code,
+        breakpoint="builtin_abs",
+        commands=["py-find-type Marker", "script print(open('addresses.txt').read())"],
+    )
+
+    printed = set(re.findall(r"^(0x[0-9a-f]+)$", response, re.MULTILINE))
+    instances = set(addresses.split())
+    assert len(instances) == 10
+    assert instances <= printed
+    # the only other match is the MRO tuple (Marker, object): its ob_size of 2
+    # looks like a reference count followed by a pointer to the type
+    assert len(printed - instances) <= 1
+    assert found(response) == len(printed)
+
+
+def test_unknown_type(lldb):
+    response = run_lldb(
+        lldb,
+        code=CODE,
+        breakpoint="builtin_abs",
+        commands=["py-find-type NoSuchType"],
+    )[-1]
+
+    assert "Failed to find type NoSuchType" in response
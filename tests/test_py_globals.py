@@ -0,0 +1,87 @@
+from .conftest import run_lldb
+
+
+CODE = """\
+import json
+
+SOME_CONST = 42
+SOME_NAME = 'spam'
+OTHER = [1, 2, 3]
+
+
+def fa():
+    abs(1)
+
+
+fa()
+""".lstrip()
+
+
+def test_names(lldb):
+    response = run_lldb(
+        lldb,
+        code=CODE,
+        breakpoint="builtin_abs",
+        commands=["py-globals"],
+    )[-1]
+    actual = set(response.split())
+
+    assert {"json", "SOME_CONST", "SOME_NAME", "OTHER", "fa", "__name__"} <= actual
+    # values are not printed by default
+    assert "42" not in actual
+
+
+def test_filter_and_values(lldb):
+    response = run_lldb(
+        lldb,
+        code=CODE,
+        breakpoint="builtin_abs",
+        commands=[
+            "py-globals --filter 'SOME_*' --filter OTHER --values",
+        ],
+    )[-1]
+    actual = response.rstrip()
+
+    assert actual == "OTHER = [1, 2, 3]\nSOME_CONST = 42\nSOME_NAME = 'spam'"
+
+
+def test_paging(lldb):
+    response = run_lldb(
+        lldb,
+        code=CODE,
+        breakpoint="builtin_abs",
+        commands=[
+            "py-globals --filter 'SOME_*' --filter OTHER --page-size 2 --page 2",
+        ],
+    )[-1]
+    actual = response.rstrip()
+
+    assert actual == "SOME_NAME\nPage 2 of 2 (3 names)"
+
+
+def test_builtins(lldb):
+    response = run_lldb(
+        lldb,
+        code=CODE,
+        breakpoint="builtin_abs",
+        commands=["py-globals --builtins --filter 'abs' --filter 'len'"],
+    )[-1]
+    actual = response.rstrip()
+
+    assert actual == "abs\nlen"
+
+
+def test_modules(lldb):
+    response = run_lldb(
+        lldb,
+        code=CODE,
+        breakpoint="builtin_abs",
+        commands=["py-modules", "py-modules --filter 'json.*' --filter sys"],
+    )
+    all_modules = set(response[0].split())
+    json_modules = response[1].split()
+
+    assert {"builtins", "sys", "json", "json.decoder"} <= all_modules
+    assert json_modules == sorted(json_modules)
+    assert {"sys", "json.decoder", "json.encoder"} <= set(json_modules)
+    assert "json" not in json_modules
@@ -0,0 +1,92 @@
+import re
+
+from .conftest import run_lldb
+
+
+CODE = """
+ids = ["request-%08x" % (i * 7919) for i in range(1000)]
+unicode_ids = ["ünïcode request-%08x" % i for i in range(10)]
+payloads = [b"payload request-%08x" % i for i in range(10)]
+abs(1)
+""".lstrip()
+
+
+def matches(response, type_):
+    pattern = r"^0x[0-9a-f]+ {} (?:\.\.\.)?b?'(.*)'(?:\.\.\.)?$".format(type_)
+    return set(re.findall(pattern, response, re.MULTILINE))
+
+
+def test_str(lldb):
+    response = run_lldb(
+        lldb,
+        code=CODE,
+        breakpoint="builtin_abs",
+        commands=["py-grep '^request-[0-9a-f]{8}$' --type str --max 100000"],
+    )[-1]
+
+    assert matches(response, "str") == {
+        "request-%08x" % (i * 7919) for i in range(1000)
+    }
+    assert re.search(r"^Found \d+ match\(es\); scanned \d+ bytes", response, re.M)
+
+
+def test_unicode(lldb):
+    response = run_lldb(
+        lldb,
+        code=CODE,
+        breakpoint="builtin_abs",
+        commands=["py-grep 'ünïcode request-0000000[0-9]'"],
+    )[-1]
+
+    assert {"ünïcode request-%08x" % i for i in range(10)} <= matches(response, "str")
+
+
+def test_bytes(lldb):
+    response = run_lldb(
+        lldb,
+        code=CODE,
+        breakpoint="builtin_abs",
+        commands=["py-grep 'PAYLOAD request' --type bytes -i"],
+    )[-1]
+
+    assert {"payload request-%08x" % i for i in range(10)} <= matches(response, "bytes")
+    assert not matches(response, "str")
+
+
+def test_max(lldb):
+    response = run_lldb(
+        lldb,
+        code=CODE,
+        breakpoint="builtin_abs",
+        commands=["py-grep 'request-' --max 5"],
+    )[-1]
+
+    assert "Found 5 match(es)" in response
+
+
+def test_literal(lldb):
+    patterns = {
+        r"\bfoo\b": "foo",
+        r"\nabc": "abc",
+        r"\x41bcd": "bcd",
+        r"\N{EM DASH}abc": "abc",
+        r"(a)\1bcd": "bcd",
+        "ab{2}c": "ab",
+        "ab{0,2}c": "a",
+        "a{x}b": "a{x}b",
+        "request-[0-9a-f]{8}$": "request-",
+        "foo|bar": "",
+    }
+
+    responses = run_lldb(
+        lldb,
+        code="abs(1)",
+        breakpoint="builtin_abs",
+        commands=["script import cpython_lldb"]
+        + [
+            "script print(repr(cpython_lldb.regex_literal({!r})))".format(pattern)
+            for pattern in patterns
+        ],
+    )
+
+    assert [r.strip() for r in responses[1:]] == [repr(v) for v in patterns.values()]
@@ -0,0 +1,168 @@
+import re
+import subprocess
+import sys
+
+from .conftest import run_lldb
+
+
+CODE = """
+class Node:
+    pass
+
+
+nodes = [Node() for _ in range(10000)]
+abs(1)
+""".lstrip()
+
+
+def test_histogram(lldb):
+    response = run_lldb(
+        lldb,
+        code=CODE,
+        breakpoint="builtin_abs",
+        commands=["py-heap --top 100"],
+    )[-1]
+    lines = response.strip().splitlines()
+
+    assert lines[0].split() == ["Count", "Size", "Type"]
+    assert re.match(r"Total: \d+ objects, \d+ bytes in \d+ types", lines[-1])
+
+    match = re.search(r"^\s+(\d+)\s+\d+  Node$", response, re.MULTILINE)
+    assert match is not None
+    assert int(match.group(1)) == 10000
+
+
+def test_sort_by_count(lldb):
+    response = run_lldb(
+        lldb,
+        code=CODE,
+        breakpoint="builtin_abs",
+        commands=["py-heap --sort count --top 1"],
+    )[-1]
+    lines = response.strip().splitlines()
+
+    assert len(lines) == 3
+    assert lines[1].split()[-1] == "Node"
+
+
+def test_snapshot_diff(lldb, tmpdir):
+    before = tmpdir.join("before.bin").strpath
+    after = tmpdir.join("after.bin").strpath
+
+    responses = run_lldb(
+        lldb,
+        code="""
+class Node:
+    pass
+
+
+abs(1)
+nodes = [Node() for _ in range(10000)]
+abs(2)
+""".lstrip(),
+        breakpoint="builtin_abs",
+        commands=[
+            "py-heap --save {}".format(before),
+            "continue",
+            "py-heap --save {} --referents".format(after),
+            "py-heap-diff {} {} --sort count --top 1".format(before, after),
+        ],
+    )
+
+    assert re.match(r"Saved \d+ objects to .*before\.bin", responses[0])
+    assert re.match(r"Saved \d+ objects to .*after\.bin", responses[2])
+
+    lines = responses[-1].strip().splitlines()
+    assert lines[1].split() == ["+10000", lines[1].split()[1], "Node"]
+    assert re.match(r"Total: \+\d+ objects, \+\d+ bytes", lines[-1])
+
+
+def test_snapshot_diff_standalone(lldb, tmpdir):
+    snapshot = tmpdir.join("snapshot.bin").strpath
+    run_lldb(
+        lldb,
+        code=CODE,
+        breakpoint="builtin_abs",
+        commands=["py-heap --save {}".format(snapshot)],
+    )
+
+    output = subprocess.check_output(
+        [sys.executable, "-m", "cpython_lldb", "heap-diff", snapshot, snapshot],
+        encoding="utf-8",
+    )
+
+    assert output.strip().splitlines() == [
+        "     Count         Size  Type",
+        "Total: +0 objects, +0 bytes",
+    ]
+
+
+REFERRERS_CODE = """
+class Node:
+    pass
+
+
+leaked = Node()
+holder = [1, leaked]
+mapping = {"key": leaked}
+
+with open("address.txt", "w") as f:
+    f.write(hex(id(leaked)))
+
+abs(1)
+""".lstrip()
+
+
+def test_referrers(lldb):
+    for flags in ("", "--index "):
+        response = run_lldb(
+            lldb,
+            code=REFERRERS_CODE,
+            breakpoint="builtin_abs",
+            commands=[
+                "script lldb.debugger.HandleCommand("
+                "'py-referrers {}' + open('address.txt').read())".format(flags)
+            ],
+        )[-1]
+
+        assert re.search(r"^0x[0-9a-f]+ list \[1\]$", response, re.MULTILINE)
+        assert re.search(
+            r"^0x[0-9a-f]+ dict value of key 'key'$", response, re.MULTILINE
+        )
+        assert re.search(
+            r"^0x[0-9a-f]+ dict value of key 'leaked'$", response, re.MULTILINE
+        )
+
+
+def test_referrers_stale_stack_slots(lldb):
+    code = """
+class Node:
+    pass
+
+
+keep = [Node()]
+with open("address.txt", "w") as f:
+    f.write(hex(id(keep[0])))
+
+
+def f():
+    # leaves a stale pointer above the top of the value stack
+    len([0, 0, 0, keep[0]])
+    abs(1)
+
+
+f()
+""".lstrip()
+
+    response = run_lldb(
+        lldb,
+        code=code,
+        breakpoint="builtin_abs",
+        commands=[
+            "script lldb.debugger.HandleCommand("
+            "'py-referrers ' + open('address.txt').read())"
+        ],
+    )[-1]
+
+    assert re.search(r"^0x[0-9a-f]+ list \[0\]$", response, re.MULTILINE)
+    assert " frame " not in response
@@ -82,3 +82,138 @@ def test_no_locals(lldb):
     actual = response.rstrip()
 
     assert actual == ""
+
+
+def test_filter(lldb):
+    expected = """\
+a = 42
+e = {'a': -1}
+eggs = 42
+spam = 'foobar'
+""".rstrip()
+    response = run_lldb(
+        lldb,
+        code=CODE,
+        breakpoint="builtin_abs",
+        commands=["py-up", "py-locals a 'e*' spam missing"],
+    )[-1]
+    actual = response.rstrip()
+
+    assert actual == expected
+
+
+def test_names_only(lldb):
+    response = run_lldb(
+        lldb,
+        code=CODE,
+        breakpoint="builtin_abs",
+        commands=["py-up", "py-locals --names-only"],
+    )[-1]
+    actual = response.rstrip()
+
+    assert actual.split("\n") == [
+        "a",
+        "args",
+        "b",
+        "c",
+        "d",
+        "e",
+        "eggs",
+        "kwargs",
+        "spam",
+    ]
+
+
+def test_budget(lldb):
+    code = """\
+def f():
+    big = list(range(100000))
+    text = 'x' * 1000
+    small = [1, 2, 3]
+    mapping = {i: i for i in range(10)}
+    numbers = set(range(10))
+    abs(1)
+
+
+f()
+""".lstrip()
+
+    expected = """\
+big = [0, 1, 2, 3, 4, ...<99995 more>]
+mapping = {0: 0, 1: 1, 2: 2, 3: 3, 4: 4, ...<5 more>}
+numbers = {0, 1, 2, 3, 4, ...<5 more>}
+small = [1, 2, 3]
+text = 'xxxxxxxxxx'...<990 more>
+""".rstrip()
+    response = run_lldb(
+        lldb,
+        code=code,
+        breakpoint="builtin_abs",
+        commands=["py-up", "py-locals --max-items 5 --max-bytes 10"],
+    )[-1]
+    actual = response.rstrip()
+
+    assert actual == expected
+
+
+def test_zero_budget(lldb):
+    code = """
+import array
+import collections
+
+
+def f():
+    a = array.array('d', [1.0, 2.0])
+    ba = bytearray(b'spam!')
+    d = collections.deque([1, 2, 3])
+    mv = memoryview(b'eggs')
+    abs(1)
+
+
+f()
+""".lstrip()
+
+    # only the number of elements is reported
+    expected = """\
+a = array('d', [...<2 more>])
+ba = bytearray(b''...<5 more>)
+d = deque([...<3 more>])
+mv = memoryview(b''...<4 more>)
+""".rstrip()
+    response = run_lldb(
+        lldb,
+        code=code,
+        breakpoint="builtin_abs",
+        commands=["py-up", "py-locals --max-items 0 --max-bytes 0"],
+    )[-1]
+    actual = response.rstrip()
+
+    assert actual == expected
+
+
+def test_cell_and_free_variables(lldb):
+    code = """\
+def outer():
+    x = 1
+    y = [2]
+
+    def inner(z):
+        abs(x + len(y) + z)
+
+    inner(3)
+
+
+outer()
+""".lstrip()
+
+    responses = run_lldb(
+        lldb,
+        code=code,
+        breakpoint="builtin_abs",
+        commands=["py-up", "py-locals", "py-up", "py-locals x y"],
+    )
+
+    # free variables of the inner function
+    assert responses[1].rstrip() == "x = 1\ny = [2]\nz = 3"
+    # cell variables of the outer function
+    assert responses[3].rstrip() == "x = 1\ny = [2]"
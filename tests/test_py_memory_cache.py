@@ -0,0 +1,137 @@
+import re
+
+from .conftest import run_lldb
+
+
+CODE = """
+def f(a, b):
+    c = [a] * 10
+    abs(1)
+
+
+f('hello', {'world': 42})
+""".lstrip()
+
+
+def test_stats(lldb):
+    response = run_lldb(
+        lldb,
+        code=CODE,
+        breakpoint="builtin_abs",
+        commands=["py-memory-cache --reset", "py-up", "py-locals", "py-memory-cache"],
+    )[-1]
+
+    match = re.search(r"Hits: (\d+), misses: (\d+)", response)
+    assert match is not None
+    assert int(match.group(1)) > 0
+    assert int(match.group(2)) > 0
+
+
+def test_settings(lldb):
+    responses = run_lldb(
+        lldb,
+        code=CODE,
+        breakpoint="builtin_abs",
+        commands=[
+            "py-memory-cache --page-size 64KiB --readahead 8",
+            "py-memory-cache --disable",
+            "py-up",
+            "py-locals",
+            "py-memory-cache --enable --page-size 32KiB --readahead 2",
+            # restore the defaults for the other tests sharing the session
+            "py-memory-cache --page-size 16KiB --readahead 4",
+        ],
+    )
+
+    assert responses[0].startswith(
+        "Memory cache: enabled, page size: 65536 bytes, read-ahead: 8 pages"
+    )
+    assert responses[1].strip() == (
+        "Memory cache: disabled, page size: 65536 bytes, read-ahead: 8 pages"
+    )
+    assert "c = ['hello', 'hello'" in responses[3]
+    assert responses[4].startswith(
+        "Memory cache: enabled, page size: 32768 bytes, read-ahead: 2 pages"
+    )
+    assert responses[5].startswith(
+        "Memory cache: enabled, page size: 16384 bytes, read-ahead: 4 pages"
+    )
+
+
+def test_invalid_page_size(lldb):
+    responses = run_lldb(
+        lldb,
+        code=CODE,
+        breakpoint="builtin_abs",
+        commands=[
+            "py-memory-cache --page-size 1MiB",
+            "py-memory-cache --page-size 48KiB",
+            "py-memory-cache --readahead -1",
+            "py-memory-cache --enable --disable",
+            "py-memory-cache",
+        ],
+    )
+
+    assert "page size must be between 4KiB and 64KiB" in responses[0]
+    assert "page size must be a power of 2" in responses[1]
+    assert "read-ahead must not be negative" in responses[2]
+    assert "--enable and --disable are mutually exclusive" in responses[3]
+    # invalid arguments do not change any of the settings
+    assert responses[4].startswith(
+        "Memory cache: enabled, page size: 16384 bytes, read-ahead: 4 pages"
+    )
+
+
+def test_address_map(lldb):
+    code = """
+import io
+value = object()
+with io.open("address.txt", "w") as f:
+    f.write(hex(id(value)))
+abs(1)
+""".lstrip()
+
+    responses = run_lldb(
+        lldb,
+        code=code,
+        breakpoint="builtin_abs",
+        commands=[
+            "script import cpython_lldb",
+            "script print(cpython_lldb.is_readable(lldb.process, "
+            "int(open('address.txt').read(), 16)))",
+            "script print(cpython_lldb.is_readable(lldb.process, 16))",
+            "script cpython_lldb.memory_reader(lldb.process).read(16, 8)",
+        ],
+    )
+
+    assert responses[1].strip() == "True"
+    assert responses[2].strip() == "False"
+    assert "not in a readable memory region" in responses[3]
+
+
+def test_flush(lldb):
+    code = """
+import io
+value = b'spam' * 2
+with io.open("address.txt", "w") as f:
+    # the payload of bytes objects follows the header and the cached hash
+    f.write(hex(id(value) + 32))
+abs(1)
+""".lstrip()
+
+    responses = run_lldb(
+        lldb,
+        code=code,
+        breakpoint="builtin_abs",
+        commands=[
+            "py-up",
+            "py-locals value",
+            "script lldb.process.WriteMemory("
+            "int(open('address.txt').read(), 16), b'eggs', lldb.SBError())",
+            "py-memory-cache --flush",
+            "py-locals value",
+        ],
+    )
+
+    assert responses[1].strip() == "value = b'spamspam'"
+    assert responses[-1].strip() == "value = b'eggsspam'"
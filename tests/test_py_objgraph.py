@@ -0,0 +1,98 @@
+import json
+import re
+
+from .conftest import run_lldb
+
+
+CODE = """
+class Node:
+    pass
+
+
+node = Node()
+node.attr = "value"
+holder = [1, node]
+
+with open("address.txt", "w") as f:
+    f.write(hex(id(holder)))
+
+abs(1)
+""".lstrip()
+
+
+def run_objgraph(lldb, flags):
+    return run_lldb(
+        lldb,
+        code=CODE,
+        breakpoint="builtin_abs",
+        commands=[
+            "script lldb.debugger.HandleCommand("
+            "'py-objgraph {} ' + open('address.txt').read())".format(flags)
+        ],
+    )[-1]
+
+
+def test_dot(lldb):
+    response = run_objgraph(lldb, "--depth 2")
+
+    assert response.lstrip().startswith("digraph objgraph {")
+    assert re.search(r'"0x[0-9a-f]+" \[label="list\\n0x[0-9a-f]+"\];', response)
+    assert re.search(r'"0x[0-9a-f]+" -> "0x[0-9a-f]+" \[label="\[1\]"\];', response)
+    assert re.search(r'\[label="Node\\n0x[0-9a-f]+"\];', response)
+    assert re.search(r'"0x[0-9a-f]+" -> "0x[0-9a-f]+" \[label="__dict__"\];', response)
+
+
+def test_json(lldb):
+    response = run_objgraph(lldb, "--depth 1 --format json")
+
+    records = [
+        json.loads(line) for line in response.splitlines() if line.startswith("{")
+    ]
+    nodes = {r["node"]: r for r in records if "node" in r}
+    edges = [r for r in records if "edge" in r]
+
+    assert sorted(r["type"] for r in nodes.values()) == ["Node", "int", "list"]
+    assert sorted(e["label"] for e in edges) == ["[0]", "[1]"]
+    assert all(
+        source in nodes and target in nodes
+        for source, target in (e["edge"] for e in edges)
+    )
+
+
+def test_max_nodes(lldb):
+    response = run_objgraph(lldb, "--depth 4 --max-nodes 2 --format json")
+
+    nodes = [line for line in response.splitlines() if line.startswith('{"node"')]
+    assert len(nodes) == 2
+    assert re.search(r"Skipped \d+ references because of the limits", response)
+
+
+def test_set_with_deleted_items(lldb):
+    code = """
+items = {"a", "b", "c"}
+items.discard("b")
+
+with open("address.txt", "w") as f:
+    f.write(hex(id(items)))
+
+abs(1)
+""".lstrip()
+    response = run_lldb(
+        lldb,
+        code=code,
+        breakpoint="builtin_abs",
+        commands=[
+            "script lldb.debugger.HandleCommand("
+            "'py-objgraph --depth 1 --format json ' + open('address.txt').read())"
+        ],
+    )[-1]
+
+    records = [
+        json.loads(line) for line in response.splitlines() if line.startswith("{")
+    ]
+    nodes = [r for r in records if "node" in r]
+    edges = [r for r in records if "edge" in r]
+
+    # the 'dummy' entry of the deleted item is not a reference
+    assert sorted(r["type"] for r in nodes) == ["set", "str", "str"]
+    assert len(edges) == 2
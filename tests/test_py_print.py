@@ -0,0 +1,167 @@
+from .conftest import run_lldb
+
+
+CODE = """\
+import sys
+
+
+class Slotted:
+    __slots__ = ('name', 'unset')
+
+    kind = 'slotted'
+
+
+class Node:
+    def __init__(self, value, children=()):
+        self.value = value
+        self.children = list(children)
+        self.tags = {'color': 'red', 42: 'answer'}
+
+
+def fa(node):
+    slotted = Slotted()
+    slotted.name = 'spam'
+    abs(1)
+
+
+fa(Node(1, [Node(2), Node(3, [Node(4)])]))
+""".lstrip()
+
+
+def test_attributes_and_items(lldb):
+    response = run_lldb(
+        lldb,
+        code=CODE,
+        breakpoint="builtin_abs",
+        commands=[
+            "py-print node.value",
+            "py-print node.children[1].children[0].value",
+            "py-print \"node.children[-1].tags['color']\"",
+            "py-print node.tags[42]",
+        ],
+    )
+    actual = [line.rstrip() for line in response]
+
+    assert actual == [
+        "node.value = 1",
+        "node.children[1].children[0].value = 4",
+        "node.children[-1].tags['color'] = 'red'",
+        "node.tags[42] = 'answer'",
+    ]
+
+
+def test_slots_and_class_attributes(lldb):
+    response = run_lldb(
+        lldb,
+        code=CODE,
+        breakpoint="builtin_abs",
+        commands=[
+            "py-print slotted.name",
+            "py-print slotted.kind",
+            "py-print Slotted.kind",
+        ],
+    )
+    actual = [line.rstrip() for line in response]
+
+    assert actual == [
+        "slotted.name = 'spam'",
+        "slotted.kind = 'slotted'",
+        "Slotted.kind = 'slotted'",
+    ]
+
+
+def test_module_attributes(lldb):
+    response = run_lldb(
+        lldb,
+        code=CODE,
+        breakpoint="builtin_abs",
+        commands=["py-print sys.maxsize"],
+    )[-1]
+    actual = response.rstrip()
+
+    assert actual == "sys.maxsize = {}".format(2**63 - 1)
+
+
+def test_errors(lldb):
+    response = run_lldb(
+        lldb,
+        code=CODE,
+        breakpoint="builtin_abs",
+        commands=[
+            "py-print missing",
+            "py-print slotted.unset",
+            "py-print node.children[5]",
+            "py-print \"node.tags['missing']\"",
+        ],
+    )
+
+    assert "name 'missing' is not defined" in response[-4]
+    assert "'Slotted' object has no attribute 'unset'" in response[-3]
+    assert "list index 5 out of range" in response[-2]
+    assert "Key 'missing' not found" in response[-1]
+
+
+def test_large_dict(lldb):
+    code = """\
+cache = {'key%d' % i: i for i in range(100000)}
+cache.update((i, -i) for i in range(100000, 200000))
+abs(1)
+"""
+    response = run_lldb(
+        lldb,
+        code=code,
+        breakpoint="builtin_abs",
+        commands=[
+            "py-print \"cache['key99999']\"",
+            "py-print cache[150000]",
+            "py-print \"cache['missing']\"",
+        ],
+    )
+
+    assert response[0].rstrip() == "cache['key99999'] = 99999"
+    assert response[1].rstrip() == "cache[150000] = -150000"
+    assert "Key 'missing' not found" in response[2]
+
+
+def test_slices_and_paging(lldb):
+    code = """\
+items = list(range(1000000))
+pairs = tuple(range(10))
+cache = {'key%d' % i: i for i in range(100000)}
+for i in range(0, 100, 2):
+    del cache['key%d' % i]
+numbers = set(range(10))
+abs(1)
+"""
+    response = run_lldb(
+        lldb,
+        code=code,
+        breakpoint="builtin_abs",
+        commands=[
+            "py-print items[500000:500003]",
+            "py-print items[-2:]",
+            "py-print pairs[::-4]",
+            "py-print items --offset 10 --limit 2",
+            "py-print cache --offset 2 --limit 2",
+            "py-print numbers --offset 8",
+            "py-print items[1:3].real",
+            "py-print items --offset 999990 --max-items 3",
+            "py-print cache --offset 10 --max-items 2",
+        ],
+    )
+    actual = [line.rstrip() for line in response]
+
+    assert actual[:6] == [
+        "items[500000:500003] = [500000, 500001, 500002]",
+        "items[-2:] = [999998, 999999]",
+        "pairs[::-4] = (9, 5, 1)",
+        "items = [10, 11]",
+        "cache = {'key5': 5, 'key7': 7}",
+        "numbers = {8, 9}",
+    ]
+    assert "Slices are only supported at the end of a path" in actual[6]
+    # only the items within --max-items are read, the rest are counted
+    assert actual[7:] == [
+        "items = [999990, 999991, 999992, ...<7 more>]",
+        "cache = {'key21': 21, 'key23': 23, ...<99938 more>}",
+    ]
@@ -0,0 +1,69 @@
+import re
+
+from .conftest import run_lldb
+
+
+CODE = """
+junk = [str(i) * 3 for i in range(100000)]
+del junk[::2]
+abs(1)
+""".lstrip()
+
+
+def test_stats(lldb):
+    response = run_lldb(
+        lldb,
+        code=CODE,
+        breakpoint="builtin_abs",
+        commands=["py-pymalloc"],
+    )[-1]
+    lines = response.strip().splitlines()
+
+    assert lines[0].split() == "Class Size Pools Used blocks Free blocks".split()
+    classes = [
+        [int(x) for x in line.split()] for line in lines if re.match(r"\s*\d", line)
+    ]
+    assert classes
+    alignment = classes[0][1] // (classes[0][0] + 1)
+    assert all(size == (index + 1) * alignment for index, size, *_ in classes)
+    assert all(pools > 0 and used > 0 for _, _, pools, used, _ in classes)
+
+    assert re.search(r"^Arenas: [1-9]\d* x \d+ bytes", response, re.MULTILINE)
+    assert re.search(
+        r"^Pools: \d+ in use, \d+ empty, \d+ never used", response, re.MULTILINE
+    )
+    assert re.search(
+        r"^Fragmentation: \d+\.\d% of used pools is free, \d+\.\d% of arenas",
+        response,
+        re.MULTILINE,
+    )
+
+
+def test_matches_debugmallocstats(lldb):
+    code = """
+import os
+import sys
+
+junk = [str(i) * 3 for i in range(100000)]
+del junk[::2]
+
+# sys._debugmallocstats() writes to the C level stderr
+with open("mallocstats.txt", "w") as f:
+    os.dup2(f.fileno(), 2)
+sys._debugmallocstats()
+abs(1)
+""".lstrip()
+
+    response, stats = run_lldb(
+        lldb,
+        code=code,
+        breakpoint="builtin_abs",
+        commands=["py-pymalloc", "script print(open('mallocstats.txt').read())"],
+    )
+
+    # class, size, pools, used and free blocks are printed in the same order
+    row = re.compile(r"^\s*(\d+)\s+(\d+)\s+(\d+)\s+(\d+)\s+(\d+)\s*$", re.MULTILINE)
+    expected = row.findall(stats)
+
+    assert expected
+    assert row.findall(response) == expected
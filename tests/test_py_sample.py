@@ -0,0 +1,50 @@
+import re
+
+from .conftest import run_lldb
+
+
+CODE = """
+def spin():
+    while True:
+        abs(1)
+
+
+spin()
+""".lstrip()
+
+
+def test_sample(lldb):
+    response = run_lldb(
+        lldb,
+        code=CODE,
+        breakpoint="builtin_abs",
+        commands=[
+            "breakpoint delete --force",
+            "py-sample --interval 10ms --duration 1s --top 2",
+        ],
+    )[-1]
+    lines = response.strip().splitlines()
+
+    assert re.match(r"Collected \d+ samples, \d+ stacks; pause per sample", lines[0])
+    assert lines[1].split() == ["Own", "Total", "Function"]
+    assert re.match(r"\s*\d+\.\d% +\d+\.\d%  spin \(.*test\.py:\d\)", lines[2])
+
+
+def test_sample_output(lldb):
+    response = run_lldb(
+        lldb,
+        code=CODE,
+        breakpoint="builtin_abs",
+        commands=[
+            "breakpoint delete --force",
+            "py-sample --interval 10ms --duration 200ms --output stacks.txt",
+            "script print(open('stacks.txt').read())",
+        ],
+    )[-1]
+
+    stacks = re.findall(r"^(.*) (\d+)$", response, re.MULTILINE)
+    assert stacks
+    assert all(
+        re.match(r"<module> \(.*test\.py:6\);spin \(.*test\.py:\d\)", stack)
+        for stack, _ in stacks
+    )
@@ -0,0 +1,68 @@
+import re
+import sys
+
+from .conftest import run_lldb
+
+
+CODE = """
+cache = {str(i): [i] * 10 for i in range(100)}
+
+
+def f(items):
+    abs(1)
+
+
+f([1, 2, 3] + [None] * 10)
+""".lstrip()
+
+
+def shallow_size(response):
+    return int(re.search(r"Shallow size: (\d+) bytes", response).group(1))
+
+
+def test_shallow(lldb):
+    responses = run_lldb(
+        lldb,
+        code=CODE,
+        breakpoint="builtin_abs",
+        commands=["py-sizeof items", "py-sizeof cache"],
+    )
+
+    assert shallow_size(responses[0]) == sys.getsizeof([1, 2, 3] + [None] * 10)
+    assert shallow_size(responses[1]) == sys.getsizeof(
+        {str(i): [i] * 10 for i in range(100)}
+    )
+
+
+def test_deep(lldb):
+    response = run_lldb(
+        lldb,
+        code=CODE,
+        breakpoint="builtin_abs",
+        commands=["py-sizeof cache --deep"],
+    )[-1]
+
+    cache = {str(i): [i] * 10 for i in range(100)}
+    objects = [cache]
+    objects.extend(cache.keys())
+    objects.extend(cache.values())
+    objects.extend(range(100))
+    expected = sum(sys.getsizeof(o) for o in objects)
+
+    match = re.search(r"Deep size: (\d+) bytes in (\d+) objects", response)
+    assert match is not None
+    assert int(match.group(1)) == expected
+    assert int(match.group(2)) == len(objects)
+
+
+def test_depth(lldb):
+    response = run_lldb(
+        lldb,
+        code=CODE,
+        breakpoint="builtin_abs",
+        commands=["py-sizeof cache --deep --depth 1"],
+    )[-1]
+
+    match = re.search(r"Deep size: \d+ bytes in (\d+) objects", response)
+    assert match is not None
+    assert int(match.group(1)) == 1 + 100 + 100
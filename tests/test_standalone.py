@@ -0,0 +1,153 @@
+import os
+import re
+import subprocess
+import sys
+
+import pytest
+
+from .conftest import normalize_stacktrace, run_lldb
+
+
+CODE = """
+import sys
+import time
+
+
+def f():
+    sys.stdout.write("ready\\n")
+    sys.stdout.flush()
+    time.sleep(60)
+
+
+f()
+""".lstrip()
+
+
+def save_layout(lldb_manager, path):
+    run_lldb(
+        lldb_manager,
+        code="abs(1)",
+        breakpoint="builtin_abs",
+        commands=[
+            "script import cpython_lldb; "
+            "cpython_lldb.Layout.from_target(lldb.target).save({!r})".format(path)
+        ],
+    )
+
+
+def test_dump(lldb, tmpdir):
+    layout = tmpdir.join("layout.json").strpath
+    save_layout(lldb, layout)
+
+    process = subprocess.Popen(
+        [sys.executable, "-c", CODE], stdout=subprocess.PIPE, encoding="utf-8"
+    )
+    try:
+        assert process.stdout.readline() == "ready\n"
+
+        output = subprocess.check_output(
+            [
+                sys.executable,
+                "-m",
+                "cpython_lldb",
+                "dump",
+                "--layout",
+                layout,
+                str(process.pid),
+            ],
+            encoding="utf-8",
+        )
+    finally:
+        process.kill()
+        process.wait()
+
+    expected = """\
+  File "<string>", line 11, in <module>
+  File "<string>", line 8, in f
+"""
+    assert re.match(r"Thread 0x[0-9a-f]+ \(most recent call last\):\n", output)
+    assert output.split("\n", 1)[1].rstrip() == expected.rstrip()
+
+
+def test_dump_missing_layout(tmpdir):
+    rv = subprocess.run(
+        [
+            sys.executable,
+            "-m",
+            "cpython_lldb",
+            "dump",
+            "--layout",
+            tmpdir.join("missing.json").strpath,
+            "1",
+        ],
+        stderr=subprocess.PIPE,
+        encoding="utf-8",
+    )
+
+    assert rv.returncode == 1
+    assert "No such file or directory" in rv.stderr
+
+
+def test_dump_not_a_core_file(lldb, tmpdir):
+    layout = tmpdir.join("layout.json").strpath
+    save_layout(lldb, layout)
+
+    rv = subprocess.run(
+        [sys.executable, "-m", "cpython_lldb", "dump", "--layout", layout, __file__],
+        stderr=subprocess.PIPE,
+        encoding="utf-8",
+    )
+
+    assert rv.returncode == 1
+    assert "is not an ELF file" in rv.stderr
+
+
+CRASH_CODE = """
+import os
+import resource
+
+
+def f():
+    resource.setrlimit(resource.RLIMIT_CORE, (-1, -1))
+    os.abort()
+
+
+f()
+""".lstrip()
+
+
+def test_dump_core_file(lldb, tmpdir):
+    with open("/proc/sys/kernel/core_pattern") as f:
+        if f.read().startswith("|"):
+            pytest.skip("core files are passed to a handler instead of being saved")
+
+    layout = tmpdir.join("layout.json").strpath
+    save_layout(lldb, layout)
+
+    script = tmpdir.join("test.py")
+    script.write(CRASH_CODE)
+    subprocess.run([sys.executable, script.strpath], cwd=tmpdir.strpath)
+    cores = [p for p in os.listdir(tmpdir.strpath) if p.startswith("core")]
+    if not cores:
+        pytest.skip("no core file was saved by the kernel")
+
+    # the core file is memory mapped and read w/o LLDB
+    output = subprocess.check_output(
+        [
+            sys.executable,
+            "-m",
+            "cpython_lldb",
+            "dump",
+            "--layout",
+            layout,
+            tmpdir.join(cores[0]).strpath,
+        ],
+        encoding="utf-8",
+    )
+
+    expected = """\
+  File "test.py", line 10, in <module>
+  File "test.py", line 7, in f
+"""
+    assert re.match(r"Thread 0x[0-9a-f]+ \(most recent call last\):\n", output)
+    assert normalize_stacktrace(output.split("\n", 1)[1]).rstrip() == expected.rstrip()